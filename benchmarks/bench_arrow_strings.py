@@ -0,0 +1,139 @@
+# bench_arrow_strings.py for comparing the 02-cleaning functions on 'object' columns and on Arrow-backed columns:
+# same cleaned values, then load and cleaning time, frame memory and peak RSS of each backend in a fresh process
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_arrow_strings --rows 4000000
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.synthetic_data import MEMBER, write_synthetic_zip
+import src
+
+FLAG_COLUMNS = ['scholarship', 'hipertension', 'diabetes', 'alcoholism', 'handcap', 'sms_received']
+
+# Reader kwargs per backend: the C parser into 'object' columns, pyarrow into Arrow columns (the dates come out
+# as timestamps), and the C parser converted to Arrow (the dates stay strings, parsed by the cleaning)
+BACKENDS = {'object': {},
+            'arrow': {'arrow': True},
+            'arrow-strings': {'arrow': True, 'engine': 'c'}}
+
+def load(zip_path, backend):
+
+    df = src.load_dataset_from_zip(zip_path, MEMBER, sep='|', keep_default_na=False, **BACKENDS[backend])
+    df.columns = src.normalize_headers_string_format(df.columns)
+
+    return df
+
+# Function for the cleaning cells of 02-cleaning
+def clean(df):
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        src.check_existing_missing_values(df)
+        df = src.replace_missing_values(df)
+        df = src.normalize_df_string_format(df)
+        df = src.standardize_gender_values(df, include=['gender'])
+        df = src.replace_string_values_datetime(df, include=['scheduled_day', 'appointment_day'], frmt="%Y_%m_%dT%H_%M_%SZ")
+        df = src.convert_integer_to_boolean(df, include=FLAG_COLUMNS[:4] + FLAG_COLUMNS[5:])
+
+    return df
+
+# Values in a form every backend agrees on: Arrow timestamps as datetime64[ns, UTC], missing values as None
+def comparable(df):
+
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.ArrowDtype) and series.dtype.kind == 'M':
+            series = series.astype('datetime64[ns, UTC]')
+        columns[column] = series.astype(object).where(series.notna(), None)
+
+    return pd.DataFrame(columns)
+
+# Peak resident memory of this process, VmHWM is reset by exec unlike ru_maxrss (Linux only)
+def peak_rss_mb():
+
+    with open('/proc/self/status') as file:
+        for line in file:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+
+    return float('nan')
+
+def run_child(zip_path, backend):
+
+    start = time.perf_counter()
+    df = load(zip_path, backend)
+    load_seconds = time.perf_counter() - start
+    loaded_mb = df.memory_usage(deep=True).sum() / 2**20
+
+    start = time.perf_counter()
+    df = clean(df)
+    clean_seconds = time.perf_counter() - start
+
+    print(json.dumps({'rows': len(df), 'load_seconds': load_seconds, 'clean_seconds': clean_seconds, 'loaded_mb': loaded_mb,
+                      'cleaned_mb': df.memory_usage(deep=True).sum() / 2**20,
+                      'peak_rss_mb': peak_rss_mb()}))
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=4_000_000)
+    parser.add_argument('--check-rows', type=int, default=300_000)
+    parser.add_argument('--child', nargs=2, metavar=('ZIP_PATH', 'BACKEND'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(*args.child)
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        zip_path = os.path.join(tmp, 'patients.zip')
+        write_synthetic_zip(zip_path, args.rows)
+
+        # Same cleaned values whatever the backend
+        check_path = os.path.join(tmp, 'check.zip')
+        write_synthetic_zip(check_path, args.check_rows, seed=1)
+        expected = comparable(clean(load(check_path, 'object')))
+        for backend in BACKENDS:
+            if not comparable(clean(load(check_path, backend))).equals(expected):
+                raise SystemExit(f"*** Error ***   > The '{backend}' backend cleans to other values than 'object'")
+        print(f"> {args.check_rows} rows cleaned to the same values by every backend")
+
+        # Same data quality profile for the same columns as Arrow strings
+        profiles = [src.profile_data_quality(load(check_path, backend)).to_frame().drop(columns='dtype')
+                    for backend in ('object', 'arrow-strings')]
+        if not profiles[0].equals(profiles[1]):
+            raise SystemExit("*** Error ***   > The data quality profile of Arrow strings differs from the 'object' one")
+        print("> Same data quality profile for 'object' and Arrow string columns")
+
+        print(f"> {args.rows} rows")
+        print(f"{'backend':>14} {'load s':>7} {'clean s':>8} {'loaded MB':>10} {'cleaned MB':>11} {'peak RSS MB':>12}")
+
+        for backend in BACKENDS:
+
+            result = subprocess.run([sys.executable, '-m', 'benchmarks.bench_arrow_strings', '--child', zip_path, backend],
+                                    cwd=project_root, capture_output=True, text=True)
+            if result.returncode:
+                raise SystemExit(f"*** Error ***   > The '{backend}' run failed:\n{result.stderr}")
+
+            stats = json.loads(result.stdout.strip().split('\n')[-1])
+            print(f"{backend:>14} {stats['load_seconds']:>7.2f} {stats['clean_seconds']:>8.2f} {stats['loaded_mb']:>10.0f} "
+                  f"{stats['cleaned_mb']:>11.0f} {stats['peak_rss_mb']:>12.0f}")
+
+if __name__ == '__main__':
+    main()
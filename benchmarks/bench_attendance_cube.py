@@ -0,0 +1,81 @@
+# bench_attendance_cube.py for checking the attendance cube breakdowns against pandas and timing them as rows grow
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_attendance_cube --scales 1 10 100
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from src import (load_dataset_from_zip, normalize_headers_string_format, CleaningPipeline, convert_integer_to_boolean,
+                 build_attendance_cube)
+from src.features import FLAG_COLUMNS
+from src.scoring import SCORING_STEPS
+
+def load_clean(zip_path):
+
+    df = load_dataset_from_zip(zip_path, 'KaggleV2-May-2016.csv', sep='|', keep_default_na=False)
+    df.columns = normalize_headers_string_format(df.columns)
+    df = CleaningPipeline(SCORING_STEPS).run(df)
+
+    return convert_integer_to_boolean(df, include=FLAG_COLUMNS[:4] + FLAG_COLUMNS[5:])
+
+# The breakdowns of 01-eda and the report: (dimensions, filters) for the cube and the equivalent pandas scan
+BREAKDOWNS = [
+    (['no_show', 'age'], {'age': range(0, 18)}, lambda df: df[(df['age'] >= 0) & (df['age'] < 18)].groupby(['no_show', 'age']).size()),
+    (['gender'], {}, lambda df: df.groupby('gender').size()),
+    (['no_show'], {}, lambda df: df.groupby('no_show').size()),
+    (['no_show'], {'gender': 'female'}, lambda df: df.loc[df['gender'] == 'female'].groupby('no_show').size()),
+    (['no_show'], {'gender': 'male'}, lambda df: df.loc[df['gender'] == 'male'].groupby('no_show').size()),
+    (['no_show'], {'age': lambda age: age >= 18}, lambda df: df.loc[df['age'] >= 18].groupby('no_show').size()),
+    (['neighbourhood', 'no_show'], {}, lambda df: df.groupby(['neighbourhood', 'no_show']).size()),
+    (['sms_received', 'no_show'], {}, lambda df: df.groupby(['sms_received', 'no_show']).size()),
+    (['appointment_weekday', 'no_show'], {'scholarship': True},
+     lambda df: df[df['scholarship']].groupby([df['appointment_day'].dt.weekday.rename('appointment_weekday'), 'no_show']).size()),
+]
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--zip', default=str(project_root / 'data' / 'raw' / 'KaggleV2-May-2016.zip'))
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 50])
+    args = parser.parse_args()
+
+    base = load_clean(args.zip)
+
+    print(f"{'rows':>10} {'cells':>7} {'build (s)':>10} {'pandas scans (s)':>17} {'cube lookups (s)':>17}")
+    for scale in args.scales:
+
+        df = base if scale == 1 else pd.concat([base] * scale, ignore_index=True)
+
+        start = time.perf_counter()
+        cube = build_attendance_cube(df)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = [scan(df) for _, _, scan in BREAKDOWNS]
+        pandas_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = [cube.counts(dimensions, **filters) for dimensions, filters, _ in BREAKDOWNS]
+        cube_time = time.perf_counter() - start
+
+        for (dimensions, filters, _), result, reference in zip(BREAKDOWNS, results, expected):
+            try:
+                pd.testing.assert_series_equal(result, reference, check_names=False, check_index_type=False)
+            except AssertionError as error:
+                raise SystemExit(f"*** Error ***   > Breakdown {dimensions} {filters} differs from pandas:\n{error}")
+
+        print(f"{len(df):>10} {len(cube.cell_counts):>7} {build_time:>10.3f} {pandas_time:>17.3f} {cube_time:>17.4f}")
+
+    print(f"> {len(BREAKDOWNS)} breakdowns equal to the pandas scans at every scale")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# bench_datetime_parsing.py for comparing replace_string_values_datetime against row by row parsing
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_datetime_parsing --rows 1000000
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from src import replace_string_values_datetime, clear_datetime_cache
+
+FORMAT = '%Y_%m_%dT%H_%M_%SZ'
+
+# Former implementation: every row goes through pd.to_datetime and the timezone is applied to the whole column
+def replace_string_values_datetime_reference(df, frmt=None, time_zone='UTC'):
+
+    for column in df.columns:
+        df[column] = pd.to_datetime(df[column], format=frmt, errors='coerce')
+        try:
+            df[column] = df[column].dt.tz_localize(time_zone)
+        except TypeError:
+            df[column] = df[column].dt.tz_convert(time_zone)
+
+    return df
+
+# Normalized timestamps as they come out of normalize_df_string_format
+def make_frame(rows, seed=0):
+
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2016-04-29')
+    days = rng.integers(0, 40, rows)
+
+    appointment_day = (start + pd.to_timedelta(days, 'D')).strftime('%Y_%m_%dt00_00_00z')
+    scheduled_day = (start - pd.to_timedelta(rng.integers(0, 180 * 86400, rows), 's')).strftime('%Y_%m_%dt%H_%M_%Sz')
+    # Scheduling happens during opening hours on a fixed minute grid, which bounds the distinct values
+    scheduled_hour = (start - pd.to_timedelta(rng.integers(0, 180, rows), 'D')
+                      + pd.to_timedelta(rng.integers(7 * 12, 19 * 12, rows) * 5, 'min')).strftime('%Y_%m_%dt%H_%M_%Sz')
+
+    return pd.DataFrame({'appointment_day': np.asarray(appointment_day, dtype=object),
+                         'scheduled_day': np.asarray(scheduled_day, dtype=object),
+                         'scheduled_slot': np.asarray(scheduled_hour, dtype=object)})
+
+def timed(func, df):
+
+    start = time.perf_counter()
+    result = func(df)
+
+    return result, time.perf_counter() - start
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--time-zone', default='UTC')
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+
+    print(f"{'column':>16} {'distinct':>9} {'row by row (s)':>15} {'cold cache (s)':>15} {'warm cache (s)':>15}")
+    for column in df.columns:
+        frame = df[[column]]
+        reference, reference_time = timed(lambda f: replace_string_values_datetime_reference(f, FORMAT, args.time_zone), frame.copy())
+        clear_datetime_cache()
+        cold, cold_time = timed(lambda f: replace_string_values_datetime(f, frmt=FORMAT, time_zone=args.time_zone), frame.copy())
+        warm, warm_time = timed(lambda f: replace_string_values_datetime(f, frmt=FORMAT, time_zone=args.time_zone), frame.copy())
+        pd.testing.assert_frame_equal(reference, cold)
+        pd.testing.assert_frame_equal(reference, warm)
+        print(f"{column:>16} {frame[column].nunique():>9} {reference_time:>15.2f} {cold_time:>15.2f} {warm_time:>15.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# bench_duplicate_index.py for checking DuplicateIndex against pandas' duplicated() over every extract, and timing
+# each monthly batch against the history kept in memory
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_duplicate_index --months 12 --rows-per-month 200000
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.synthetic_data import generate_block
+from src import DuplicateIndex, normalize_headers_string_format
+
+# Function for monthly extracts overlapping the previous month: rows delivered again as is, rows delivered
+# again with another sms_received, and rows repeated inside the extract
+def make_extracts(months, rows, seed=0, overlap=0.3, changed=0.1, repeated=0.01):
+
+    rng = np.random.default_rng(seed)
+    extracts, previous = [], None
+
+    for month in range(months):
+
+        df = pd.DataFrame(generate_block(rng, month * rows, rows, months * rows))
+        df.columns = normalize_headers_string_format(df.columns)
+
+        if previous is not None:
+            again = previous.sample(frac=overlap, random_state=month)
+            flip = rng.random(len(again)) < changed
+            again.loc[flip, 'sms_received'] = 1 - again.loc[flip, 'sms_received']
+            df = pd.concat([df, again, df.sample(frac=repeated, random_state=month)], ignore_index=True)
+
+        extracts.append(df.sample(frac=1, random_state=month).reset_index(drop=True))
+        previous = extracts[-1]
+
+    return extracts
+
+# Function for the reference statuses: duplicated() over every extract kept in memory
+def reference_statuses(history, df):
+
+    stacked = pd.concat([*history, df], ignore_index=True)
+    duplicate = stacked.duplicated().to_numpy()[-len(df):]
+    seen_key = stacked['appointment_id'].duplicated().to_numpy()[-len(df):]
+
+    return np.where(duplicate, 'duplicate', np.where(seen_key, 'changed', 'new'))
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--rows-per-month', type=int, default=200_000)
+    args = parser.parse_args()
+
+    extracts = make_extracts(args.months, args.rows_per_month)
+    print(f"> {len(extracts)} extracts, {sum(len(df) for df in extracts)} rows")
+    print(f"{'month':>5} {'rows':>8} {'new':>8} {'duplicate':>9} {'changed':>8} "
+          f"{'index s':>8} {'index MB':>8} {'pandas s':>8} {'pandas MB':>9}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        path = os.path.join(tmp, 'duplicate_index')
+        index = DuplicateIndex(path)
+
+        for month, df in enumerate(extracts):
+
+            # Reopened halfway, the runs on disk are all it needs
+            if month == len(extracts) // 2:
+                report = index.report
+                index = DuplicateIndex(path)
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            status = index.update(df)
+            index_seconds = time.perf_counter() - start
+            index_peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            expected = reference_statuses(extracts[:month], df)
+            pandas_seconds = time.perf_counter() - start
+            pandas_peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+
+            if not np.array_equal(status.astype(str).to_numpy(), expected):
+                raise SystemExit(f"*** Error ***   > Month {month}: statuses differ from duplicated() on the extracts")
+
+            counts = status.value_counts()
+            print(f"{month:>5} {len(df):>8} {counts['new']:>8} {counts['duplicate']:>9} {counts['changed']:>8} "
+                  f"{index_seconds:>8.2f} {index_peak:>8.1f} {pandas_seconds:>8.2f} {pandas_peak:>9.1f}")
+
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        runs = len([name for name in os.listdir(path) if name.startswith('rows_')])
+        print(f"> {len(index)} fingerprints in {runs} runs, {size / 2**20:.1f} MB on disk, "
+              f"{len(report) + len(index.report)} batches reported")
+        print("> Every status is the one of duplicated() over all the extracts")
+
+if __name__ == '__main__':
+    main()
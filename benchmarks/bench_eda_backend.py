@@ -0,0 +1,100 @@
+# bench_eda_backend.py for checking the pre-binned eda aggregates and timing the plots as rows grow
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_eda_backend --rows 100000 1000000 10000000 --raw-max-rows 1000000
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib import pyplot as plt
+from scipy.stats import gaussian_kde
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from src import summarize_distribution, plot_histogram, plot_frequency_density, plot_hue_histogram
+from src.eda import _bin_by_hue
+
+# The plots close their figure instead of showing it
+plt.show = lambda: plt.close('all')
+
+def make_ages(rows, seed=0):
+
+    rng = np.random.default_rng(seed)
+    ages = np.minimum(rng.gamma(2.0, 18.0, rows).astype(np.int64), 115)
+
+    return pd.DataFrame({'age': ages, 'no_show': rng.choice(np.array(['no', 'yes'], dtype=object), rows, p=[0.8, 0.2])})
+
+def check(df):
+
+    bins = np.arange(0, 120, 5)
+    for ds in (df['age'], df['age'].astype(float) + 0.5):
+
+        summary = summarize_distribution(ds, bins=bins, kde=True)
+        np.testing.assert_array_equal(summary['counts'], np.histogram(ds, bins=bins)[0])
+        np.testing.assert_allclose([summary['mean'], summary['median']], [ds.mean(), ds.median()], rtol=1e-12)
+
+        grid, density = summary['kde']
+        reference = gaussian_kde(ds.to_numpy()[:200_000] if len(ds) <= 200_000 else ds.to_numpy())(grid[::16])
+        error = np.abs(density[::16] - reference).max() / reference.max()
+        if error > 1e-3:
+            raise SystemExit(f"*** Error ***   > KDE differs from scipy by {error:.2e} of the peak")
+
+    binned, edges = _bin_by_hue(df['age'], df['no_show'], 18)
+    for level, group in df.groupby('no_show'):
+        np.testing.assert_array_equal(binned.loc[binned['no_show'] == level, 'count'], np.histogram(group['age'], bins=edges)[0])
+
+def timed(function):
+
+    start = time.perf_counter()
+    function()
+
+    return time.perf_counter() - start
+
+def raw_seaborn(df, bins):
+
+    # What the plots did before: seaborn on every raw value
+    plt.figure(figsize=(15, 7))
+    sns.histplot(df['age'], bins=bins, stat='density')
+    sns.kdeplot(df['age'])
+    plt.close('all')
+    plt.figure(figsize=(15, 7))
+    sns.histplot(data=df, x='age', hue='no_show', multiple='stack', bins=bins)
+    plt.close('all')
+
+def pre_binned(df, bins):
+
+    plot_frequency_density(df['age'], bins=bins, xticks_range=(0, 120, 10))
+    plot_hue_histogram(df, x_col='age', hue_col='no_show', bins=bins, legend_labels=['Show', 'No show'])
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--raw-max-rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    check(make_ages(100_000))
+    print("> Bin counts, mean, median and hue counts match NumPy/pandas, KDE within 1e-3 of scipy")
+
+    print(f"{'rows':>10} {'seaborn raw (s)':>16} {'pre-binned (s)':>15} {'plot_histogram (s)':>19}")
+    for rows in args.rows:
+
+        df = make_ages(rows)
+        raw_time = timed(lambda: raw_seaborn(df, 18)) if rows <= args.raw_max_rows else np.nan
+        binned_time = timed(lambda: pre_binned(df, 18))
+        histogram_time = timed(lambda: plot_histogram(df['age'], bins=18, xticks_range=(0, 120, 10)))
+
+        print(f"{rows:>10} {raw_time:>16.2f} {binned_time:>15.2f} {histogram_time:>19.2f}")
+
+if __name__ == '__main__':
+    main()
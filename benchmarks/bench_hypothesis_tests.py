@@ -0,0 +1,137 @@
+# bench_hypothesis_tests.py for checking run_hypothesis_tests against scipy test by test, and timing the battery
+# against a loop of pd.crosstab and scipy.stats.chi2_contingency
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_hypothesis_tests --rows 2000000 --workers 1 4
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2_contingency, false_discovery_control
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.synthetic_data import generate_block
+from src import normalize_headers_string_format, run_hypothesis_tests
+from src.hypothesis_tests import NO_SHOW_FACTORS, WAITING_TIME_BINS
+
+def make_patients(rows, seed=0):
+
+    df = pd.DataFrame(generate_block(np.random.default_rng(seed), 0, rows, rows, quirks=False))
+    df.columns = normalize_headers_string_format(df.columns)
+    df['no_show'] = df['no_show'] == 'Yes'
+
+    days = (df['appointment_day'].dt.floor('D') - df['scheduled_day'].dt.floor('D')).dt.days
+    df['waiting_time'] = pd.cut(days, [*WAITING_TIME_BINS, np.inf], right=False).cat.codes
+
+    return df
+
+# Function for the battery one test at a time: a crosstab of the rows of the test, then scipy
+def reference_tests(df, by='neighbourhood'):
+
+    def test(factor, rows):
+        table = pd.crosstab(rows[factor], rows['no_show']).to_numpy()
+        table = table[table.sum(1) > 0][:, table.sum(0) > 0]
+        if min(table.shape) < 2:
+            return np.nan, np.nan
+        chi2, p_value, _, _ = chi2_contingency(table, correction=False)
+        return chi2, p_value
+
+    results = []
+    for factor in NO_SHOW_FACTORS:
+        results.append(test(factor, df))
+        for _, rows in df.groupby(by, sort=True):
+            results.append(test(factor, rows))
+
+    results.append(test(by, df))
+    for group in np.sort(df[by].unique()):
+        results.append(test('in_group', df.assign(in_group=df[by] == group)))
+
+    return np.array(results)
+
+# Function for the rate difference interval of a row level bootstrap, and the p-value of a row level permutation
+def row_level_resampling(df, factor, n_resamples, seed=0):
+
+    rng = np.random.default_rng(seed)
+    level = df[factor].to_numpy().astype(bool)
+    no_show = df['no_show'].to_numpy()
+    first, second = no_show[~level], no_show[level]
+
+    differences = [rng.choice(second, len(second)).mean() - rng.choice(first, len(first)).mean() for _ in range(n_resamples)]
+    observed = abs(second.mean() - first.mean())
+    exceeding = sum(abs(shuffled[level].mean() - shuffled[~level].mean()) >= observed - 1e-12
+                    for shuffled in (rng.permutation(no_show) for _ in range(n_resamples)))
+
+    return np.quantile(differences, [0.025, 0.975]), (exceeding + 1) / (n_resamples + 1)
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--check-rows', type=int, default=200_000)
+    parser.add_argument('--resamples', type=int, default=1000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+
+    # Every chi-square and p-value of the battery, and the corrections
+    df = make_patients(args.check_rows, seed=1)
+    tests = run_hypothesis_tests(df, n_resamples=0)
+    expected = reference_tests(df)
+    if not np.allclose(tests[['chi2', 'p_value']].to_numpy(), expected, rtol=1e-9, atol=1e-12, equal_nan=True):
+        raise SystemExit("*** Error ***   > chi2 or p-values differ from scipy.stats.chi2_contingency")
+
+    p_values = tests['p_value'].to_numpy()
+    tested = ~np.isnan(p_values)
+    if not np.allclose(tests['p_bh'].to_numpy()[tested], false_discovery_control(p_values[tested])):
+        raise SystemExit("*** Error ***   > Benjamini-Hochberg differs from scipy.stats.false_discovery_control")
+    print(f"> {len(tests)} tests on {args.check_rows} rows: chi2, p-values and BH identical to scipy")
+
+    # The binomial and hypergeometric draws against resampling the rows, on a small neighbourhood
+    group = df['neighbourhood'].value_counts().index[-1]
+    rows = df[df['neighbourhood'] == group]
+    resampled = run_hypothesis_tests(rows, factors=['sms_received'], by=None, n_resamples=4000)
+    interval, p_value = row_level_resampling(rows, 'sms_received', 4000)
+    engine_interval = resampled.loc[0, ['rate_difference_low', 'rate_difference_high']].to_numpy(dtype=float)
+    if np.abs(engine_interval - interval).max() > 0.006 or abs(resampled.loc[0, 'permutation_p_value'] - p_value) > 0.02:
+        raise SystemExit(f"*** Error ***   > Resampling differs from the row level one: {engine_interval} {interval}, "
+                         f"p {resampled.loc[0, 'permutation_p_value']:.4f} {p_value:.4f}")
+    print(f"> sms_received in {group} ({len(rows)} rows): interval {np.round(engine_interval, 4)} vs row level "
+          f"{np.round(interval, 4)}, permutation p {resampled.loc[0, 'permutation_p_value']:.4f} vs {p_value:.4f}")
+
+    # Timings on the full frame
+    df = make_patients(args.rows)
+    print(f"> {args.rows} rows on {os.cpu_count()} cores")
+
+    start = time.perf_counter()
+    reference_tests(df)
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tests = run_hypothesis_tests(df, n_resamples=0)
+    engine_seconds = time.perf_counter() - start
+    print(f"> {len(tests)} chi-square tests: crosstab + scipy loop {loop_seconds:.2f} s, "
+          f"run_hypothesis_tests {engine_seconds:.2f} s ({loop_seconds / engine_seconds:.0f}x)")
+
+    print(f"{'workers':>8} {'resamples':>10} {'seconds':>8}")
+    baseline = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        resampled = run_hypothesis_tests(df, n_resamples=args.resamples, n_jobs=workers)
+        print(f"{workers:>8} {args.resamples:>10} {time.perf_counter() - start:>8.2f}")
+
+        # Same resamples whatever the number of workers
+        if baseline is not None and not resampled.equals(baseline):
+            raise SystemExit(f"*** Error ***   > {workers} workers resampled differently")
+        baseline = resampled
+
+    print(f"> {int(baseline['significant'].sum())} of {len(baseline)} tests significant at a 5% false discovery rate")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# bench_import_time.py for failing when 'import src' plus a cleaning call gets slower or loads the plotting/modeling stack
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_import_time --runs 7 --budget-ms 150
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+
+# Dependencies a cleaning job must not import
+HEAVY_MODULES = ['matplotlib', 'seaborn', 'sklearn', 'scipy']
+
+BASELINE = """
+import time
+start = time.perf_counter()
+import numpy, pandas
+print(time.perf_counter() - start)
+"""
+
+CLEANING_JOB = """
+import sys, time
+start = time.perf_counter()
+import src
+import pandas as pd
+df = pd.DataFrame({{'gender': ['F', 'M', 'f'], 'neighbourhood': ['JARDIM DA PENHA', 'CENTRO', 'Centro ']}})
+src.normalize_df_string_format(df)
+src.standardize_gender_values(df, include=['gender'])
+print(time.perf_counter() - start)
+print(','.join(module for module in {heavy} if module in sys.modules))
+"""
+
+FULL_IMPORT = """
+import time
+start = time.perf_counter()
+from src import *
+print(time.perf_counter() - start)
+"""
+
+def run(code):
+
+    result = subprocess.run([sys.executable, '-c', code], cwd=project_root, capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(f"*** Error ***   > The timed script failed:\n{result.stderr}")
+
+    return result.stdout.split('\n')
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--budget-ms', type=float, default=150.0, help="Allowed time over importing numpy and pandas")
+    args = parser.parse_args()
+
+    # Best of several fresh interpreters, the first runs also warm the file system cache
+    baseline = min(float(run(BASELINE)[0]) for _ in range(args.runs)) * 1000
+    outputs = [run(CLEANING_JOB.format(heavy=HEAVY_MODULES)) for _ in range(args.runs)]
+    cleaning = min(float(output[0]) for output in outputs) * 1000
+    full = min(float(run(FULL_IMPORT)[0]) for _ in range(args.runs)) * 1000
+    loaded = sorted({module for output in outputs for module in output[1].split(',') if module})
+
+    print(f"> numpy + pandas import: {baseline:.0f} ms")
+    print(f"> import src + cleaning call: {cleaning:.0f} ms ({cleaning - baseline:.0f} ms over numpy + pandas, budget {args.budget_ms:.0f} ms)")
+    print(f"> from src import * (every submodule): {full:.0f} ms")
+
+    if loaded:
+        raise SystemExit(f"*** Error ***   > The cleaning job imported {loaded}")
+    if cleaning - baseline > args.budget_ms:
+        raise SystemExit(f"*** Error ***   > Import time regression: {cleaning - baseline:.0f} ms over numpy + pandas "
+                         f"(budget {args.budget_ms:.0f} ms)")
+
+if __name__ == '__main__':
+    main()
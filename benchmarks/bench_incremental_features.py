@@ -0,0 +1,58 @@
+# bench_incremental_features.py for checking the incremental patient features against a full recompute
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_incremental_features --rows 2000000 --days 30
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.synthetic_data import make_appointments
+from src import (compute_no_show_features, build_patient_feature_state, update_patient_feature_state,
+                 save_patient_feature_state, load_patient_feature_state)
+from src.features import HISTORY_COLUMNS
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--patients', type=int, default=200_000)
+    args = parser.parse_args()
+
+    df = make_appointments(args.rows, args.days, args.patients)
+    last_day = df['appointment_day'].max()
+    history, batch = df[df['appointment_day'] < last_day], df[df['appointment_day'] == last_day]
+
+    start = time.perf_counter()
+    full = compute_no_show_features(df).loc[batch.index, HISTORY_COLUMNS]
+    full_time = time.perf_counter() - start
+
+    state = build_patient_feature_state(history)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'patient_state.npz')
+        save_patient_feature_state(state, path)
+        state = load_patient_feature_state(path)
+
+        start = time.perf_counter()
+        state, incremental = update_patient_feature_state(state, batch)
+        incremental_time = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(full, incremental)
+    pd.testing.assert_frame_equal(state, build_patient_feature_state(df).loc[state.index])
+
+    print(f"> History rows: {len(history)}, new day rows: {len(batch)}, patients in state: {len(state)}")
+    print(f"> Full recompute: {full_time:.3f} s, incremental update: {incremental_time:.3f} s")
+    print("> Incremental features and state match the full recompute")
+
+if __name__ == '__main__':
+    main()
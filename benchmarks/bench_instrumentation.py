@@ -0,0 +1,104 @@
+# bench_instrumentation.py for tracing the 02-cleaning sequence and checking the cost of the instrumentation when it is off
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_instrumentation --runs 5 --trace reports/traces/02-cleaning.json
+#   python -m benchmarks.bench_instrumentation --rows 1000000 --memory
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.synthetic_data import MEMBER, write_synthetic_zip
+from src import (InstrumentationTrace, load_dataset_from_zip, check_existing_missing_values, normalize_headers_string_format,
+                 normalize_df_string_format, detect_implicit_duplicates, convert_integer_to_boolean,
+                 standardize_gender_values, convert_ndtype_to_numeric, replace_string_values_datetime, clear_datetime_cache)
+
+# The cleaning cells of 02-cleaning, in order
+def run_cleaning_sequence(zip_path):
+
+    clear_datetime_cache()
+
+    df_patients = load_dataset_from_zip(zip_path, MEMBER, sep='|', header='infer', keep_default_na=False)
+    check_existing_missing_values(df_patients, "Data set Patients")
+    df_patients.columns = normalize_headers_string_format(df_patients.columns)
+    normalize_df_string_format(df_patients)
+    detect_implicit_duplicates(df_patients)
+    convert_integer_to_boolean(df_patients, include=['scholarship', 'hipertension', 'diabetes', 'alcoholism', 'handcap', 'sms_received'])
+    standardize_gender_values(df_patients, include=['gender'])
+    convert_ndtype_to_numeric(df_patients, include=['patient_id'], type='integer')
+    replace_string_values_datetime(df_patients, include=['scheduled_day', 'appointment_day'], frmt="%Y_%m_%dT%H_%M_%SZ")
+
+    return df_patients
+
+def best_time(runs, func):
+
+    seconds = []
+    for _ in range(runs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            seconds.append(time.perf_counter() - start)
+
+    return min(seconds)
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--zip', default=str(project_root / 'data' / 'raw' / 'KaggleV2-May-2016.zip'))
+    parser.add_argument('--rows', type=int, help="Trace a synthetic dataset of this size instead of --zip")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--memory', action='store_true', help="Also record the peak memory per call")
+    parser.add_argument('--trace', help="JSON file for the trace of the last run")
+    parser.add_argument('--budget-ns', type=float, default=1000, help="Allowed cost per call when the instrumentation is off")
+    args = parser.parse_args()
+
+    # Cost of one call of a decorated function with no active trace, against the undecorated function
+    header = ['Patient Id', 'Appointment ID', 'Gender']
+    calls = 200_000
+    decorated = min(timeit.repeat(lambda: normalize_headers_string_format(header), number=calls, repeat=5)) / calls
+    undecorated = min(timeit.repeat(lambda: normalize_headers_string_format.__wrapped__(header), number=calls, repeat=5)) / calls
+    overhead_ns = (decorated - undecorated) * 1e9
+    print(f"> Instrumentation off: {overhead_ns:.0f} ns per call ({undecorated * 1e9:.0f} ns for the call itself)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        zip_path = args.zip
+        if args.rows:
+            zip_path = os.path.join(tmp, 'patients.zip')
+            write_synthetic_zip(zip_path, args.rows)
+
+        off = best_time(args.runs, lambda: run_cleaning_sequence(zip_path))
+
+        traces = []
+        def traced():
+            with InstrumentationTrace('02-cleaning', memory=args.memory) as trace:
+                run_cleaning_sequence(zip_path)
+            traces.append(trace)
+
+        on = best_time(args.runs, traced)
+
+    trace = traces[-1]
+    print(f"> 02-cleaning sequence: {off:.3f} s off, {on:.3f} s traced{' with memory' if args.memory else ''} "
+          f"(x{on / off:.2f}), {len(trace.events)} instrumented calls\n")
+    print(trace.summary(top=10).to_string(float_format=lambda value: f"{value:.4f}"))
+
+    if args.trace:
+        Path(args.trace).parent.mkdir(parents=True, exist_ok=True)
+        print(f"\n> Trace saved to {trace.save(args.trace)}")
+
+    if overhead_ns > args.budget_ns:
+        raise SystemExit(f"*** Error ***   > The instrumentation costs {overhead_ns:.0f} ns per call when off "
+                         f"(budget {args.budget_ns:.0f} ns)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# bench_model_training.py for measuring how cross-validation throughput scales with worker processes
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_model_training --rows 10000000 --workers 1 2 4 8
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from src import cross_validate_no_show_models
+from src.features import FEATURE_COLUMNS
+
+def make_matrix(rows, seed=0):
+
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((rows, len(FEATURE_COLUMNS)), dtype=np.float32)
+    logits = X[:, 0] * 0.8 - X[:, 12] * 0.5 - 1.3
+    y = (rng.random(rows) < 1 / (1 + np.exp(-logits))).astype(np.int8)
+
+    return X, y
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--splits', type=int, default=4)
+    args = parser.parse_args()
+
+    X, y = make_matrix(args.rows)
+    candidates = {'gradient_boosting': (HistGradientBoostingClassifier(max_iter=50, random_state=0),
+                                        {'learning_rate': [0.05, 0.1]})}
+
+    baseline = None
+    print(f"{'workers':>8} {'wall (s)':>9} {'fits/s':>7} {'speedup':>8} {'max fold RSS (MB)':>20}")
+    for workers in args.workers:
+        start = time.perf_counter()
+        results, _ = cross_validate_no_show_models(X, y, candidates, n_splits=args.splits, n_jobs=workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>9.2f} {len(results) / elapsed:>7.2f} {baseline / elapsed:>7.2f}x "
+              f"{results['fold_peak_rss_mb'].max():>20.1f}")
+
+if __name__ == '__main__':
+    main()
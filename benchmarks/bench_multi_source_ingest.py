@@ -0,0 +1,115 @@
+# bench_multi_source_ingest.py for checking the concurrent multi-source loader against a serial load and concat, and timing both
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_multi_source_ingest --extracts 120 --rows-per-extract 20000 --jobs 1 4 8
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.synthetic_data import MEMBER, write_synthetic_zip
+from src import load_dataset_from_zip, load_datasets_from_sources, normalize_headers_string_format
+
+READ_KWARGS = {'sep': '|', 'keep_default_na': False}
+
+# One extract per clinic and month, a few of them with the quirks of real deliveries
+def write_extracts(directory, extracts, rows):
+
+    for position in range(extracts):
+        write_synthetic_zip(os.path.join(directory, f'clinic_{position:03d}.zip'), rows, seed=position, block=rows)
+
+    # Two months delivered in one archive
+    with zipfile.ZipFile(os.path.join(directory, 'clinic_000.zip')) as source, \
+         zipfile.ZipFile(os.path.join(directory, 'clinic_two_months.zip'), 'w', zipfile.ZIP_DEFLATED) as target:
+        data = source.read(MEMBER)
+        target.writestr('2016-04/KaggleV2-May-2016.csv', data)
+        target.writestr('2016-05/KaggleV2-May-2016.csv', data)
+
+    # Other header spelling and one column missing, as a plain CSV
+    df = load_dataset_from_zip(os.path.join(directory, 'clinic_001.zip'), MEMBER, **READ_KWARGS)
+    df = df.drop(columns='SMS_received').rename(columns={'Patient Id': 'PatientId ', 'No-show': 'No_Show'})
+    df.rename(columns={'PatientId ': 'Patient-Id'}).to_csv(os.path.join(directory, 'clinic_renamed.csv'), sep='|', index=False)
+
+    # Truncated download
+    with open(os.path.join(directory, 'clinic_002.zip'), 'rb') as file:
+        data = file.read()
+    with open(os.path.join(directory, 'clinic_broken.zip'), 'wb') as file:
+        file.write(data[:len(data) // 2])
+
+# Function for the reference: every source loaded one after the other and stacked with pd.concat,
+# at the end or, like the notebooks grew their frames, after every source
+def load_serially(paths, incremental=False):
+
+    frames = []
+
+    for path in paths:
+        try:
+            if path.endswith('.zip'):
+                with zipfile.ZipFile(path) as z:
+                    members = sorted(name for name in z.namelist() if name.endswith('.csv'))
+                loaded = [load_dataset_from_zip(path, member, **READ_KWARGS) for member in members]
+            else:
+                loaded = [pd.read_csv(path, **READ_KWARGS)]
+        except zipfile.BadZipFile:
+            continue
+        for df in loaded:
+            df.columns = normalize_headers_string_format(df.columns)
+            frames = [pd.concat([*frames, df], ignore_index=True)] if incremental else [*frames, df]
+
+    return pd.concat(frames, ignore_index=True)
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--extracts', type=int, default=120)
+    parser.add_argument('--rows-per-extract', type=int, default=20_000)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        write_extracts(tmp, args.extracts, args.rows_per_extract)
+        sources = [os.path.join(tmp, '*.zip'), os.path.join(tmp, '*.csv')]
+        paths = [str(path) for pattern in ['*.zip', '*.csv'] for path in sorted(Path(tmp).glob(pattern))]
+
+        start = time.perf_counter()
+        expected = load_serially(paths)
+        serial_time = time.perf_counter() - start
+        print(f"> {len(paths)} files, {len(expected)} rows: serial load and one pd.concat {serial_time:.2f} s")
+
+        start = time.perf_counter()
+        pd.testing.assert_frame_equal(load_serially(paths, incremental=True), expected)
+        print(f"> Serial load and pd.concat after every source: {time.perf_counter() - start:.2f} s")
+
+        for n_jobs in args.jobs:
+            for use_processes in (False, True):
+
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    df, report = load_datasets_from_sources(sources, n_jobs=n_jobs, use_processes=use_processes, **READ_KWARGS)
+                elapsed = time.perf_counter() - start
+
+                # Same rows and values as the serial reference, whose files are in the same sorted order
+                pd.testing.assert_frame_equal(df.drop(columns='source'), expected)
+                failed = report.loc[report['status'] == 'failed', 'source'].map(os.path.basename).tolist()
+                if failed != ['clinic_broken.zip']:
+                    raise SystemExit(f"*** Error ***   > Unexpected failed sources: {failed}")
+
+                print(f"> {n_jobs} {'processes' if use_processes else 'threads':<9}: {elapsed:.2f} s "
+                      f"(x{serial_time / elapsed:.2f}), {int((report['status'] == 'loaded').sum())} sources loaded, "
+                      f"1 failure reported, equal to the serial result")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# bench_normalize_strings.py for comparing normalize_df_string_format against the former five-pass version
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_normalize_strings --rows 1000000 10000000
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from src import normalize_df_string_format
+
+NEIGHBOURHOODS = ['JARDIM DA PENHA', 'MATA DA PRAIA', 'PONTAL DE CAMBURI', 'REPÚBLICA', 'GOIABEIRAS',
+                  'ANDORINHAS', 'CONQUISTA', 'NOVA PALESTINA', 'DA PENHA', 'TABUAZEIRO', 'BENTO FERREIRA',
+                  'SÃO PEDRO', 'SANTA MARTHA', 'SÃO CRISTÓVÃO', 'MARUÍPE', 'GRANDE VITÓRIA', 'ILHA DO PRÍNCIPE']
+
+# Former implementation: five full-column .str passes per column
+def normalize_df_string_format_reference(df):
+
+    for column in df.columns:
+        if df[column].dtype != 'object':
+            continue
+        df[column] = df[column].str.replace(r'[^\w\s]', ' ', regex=True)
+        df[column] = df[column].str.replace(r'\s+', '_', regex=True)
+        df[column] = df[column].str.replace(r'__+', '_', regex=True)
+        df[column] = df[column].str.lower()
+        df[column] = df[column].str.strip()
+
+    return df
+
+def make_frame(rows, seed=0):
+
+    rng = np.random.default_rng(seed)
+
+    return pd.DataFrame({'gender': rng.choice(np.array(['F', 'M'], dtype=object), rows),
+                         'neighbourhood': rng.choice(np.array(NEIGHBOURHOODS, dtype=object), rows),
+                         'no_show': rng.choice(np.array(['No', 'Yes'], dtype=object), rows)})
+
+def timed(func, df):
+
+    start = time.perf_counter()
+    result = func(df)
+
+    return result, time.perf_counter() - start
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'five-pass (s)':>14} {'factorized (s)':>15} {'category (s)':>13} {'speedup':>8}")
+    for rows in args.rows:
+        df = make_frame(rows)
+        reference, reference_time = timed(normalize_df_string_format_reference, df.copy())
+        result, factorized_time = timed(normalize_df_string_format, df.copy())
+        _, category_time = timed(lambda frame: normalize_df_string_format(frame, as_category=True), df.copy())
+        pd.testing.assert_frame_equal(reference, result)
+        del reference, result, df
+        print(f"{rows:>12} {reference_time:>14.2f} {factorized_time:>15.2f} {category_time:>13.2f} "
+              f"{reference_time / factorized_time:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
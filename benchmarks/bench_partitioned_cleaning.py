@@ -0,0 +1,92 @@
+# bench_partitioned_cleaning.py for checking CleaningPipeline.run_partitioned against run and timing it per number of workers
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_partitioned_cleaning --rows 2000000 --workers 1 4 8 16
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.synthetic_data import MEMBER, write_synthetic_zip
+from src import CleaningPipeline, load_dataset_from_zip, normalize_headers_string_format
+
+# The cleaning cells of 02-cleaning as pipeline steps
+CLEANING_STEPS = ['normalize_df_string_format',
+                  ('convert_integer_to_boolean', {'include': ['scholarship', 'hipertension', 'diabetes', 'alcoholism',
+                                                              'handcap', 'sms_received']}),
+                  ('standardize_gender_values', {'include': ['gender']}),
+                  ('convert_ndtype_to_numeric', {'include': ['age', 'appointment_id'], 'type': 'integer'}),
+                  ('replace_string_values_datetime', {'include': ['scheduled_day', 'appointment_day'],
+                                                      'frmt': "%Y_%m_%dT%H_%M_%SZ"})]
+
+# Partitions that disagree on the dtype: integer widths and categories from as_category
+def check_dtype_reconciliation():
+
+    df = pd.DataFrame({'count': np.r_[np.arange(50), np.arange(50) * 1000].astype('float64'),
+                       'name': np.where(np.arange(100) % 3, 'Jardim  Camburi', 'CENTRO').astype(object)})
+    df.loc[99, 'name'] = 'Bonfim'
+    steps = [('convert_ndtype_to_numeric', {'include': ['count'], 'type': 'integer'}),
+             ('normalize_df_string_format', {'include': ['name'], 'as_category': True})]
+
+    expected = CleaningPipeline(steps).run(df.copy())
+    result = CleaningPipeline(steps).run_partitioned(df.copy(), n_jobs=2)
+    pd.testing.assert_frame_equal(result, expected)
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    check_dtype_reconciliation()
+    print("> Partitions with different dtypes reassembled like the serial run (int32 over int8, categories)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = os.path.join(tmp, 'patients.zip')
+        write_synthetic_zip(zip_path, args.rows)
+        raw = load_dataset_from_zip(zip_path, MEMBER, sep='|', keep_default_na=False)
+    raw.columns = normalize_headers_string_format(raw.columns)
+
+    pipeline = CleaningPipeline(CLEANING_STEPS)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        expected = pipeline.run(raw.copy())
+        serial = time.perf_counter() - start
+
+    print(f"> {len(raw)} rows on {os.cpu_count()} cores, serial run: {serial:.2f} s")
+    print(f"{'workers':>8} {'partitioning':>13} {'seconds':>8} {'speedup':>8}")
+
+    for workers in args.workers:
+        for partition_by in [None, 'patient_id']:
+
+            df = raw.copy()
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                result = pipeline.run_partitioned(df, n_jobs=workers, partitions=max(workers, 2), partition_by=partition_by)
+                elapsed = time.perf_counter() - start
+
+            try:
+                pd.testing.assert_frame_equal(result, expected)
+            except AssertionError as error:
+                raise SystemExit(f"*** Error ***   > {workers} workers, partition by {partition_by}: differs from run\n{error}")
+
+            print(f"{workers:>8} {partition_by or 'row ranges':>13} {elapsed:>8.2f} {serial / elapsed:>8.2f}")
+
+    print("> Every partitioned run is identical to the serial one")
+
+if __name__ == '__main__':
+    main()
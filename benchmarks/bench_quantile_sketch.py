@@ -0,0 +1,115 @@
+# bench_quantile_sketch.py for checking the quantile sketches and the boxplot statistics against exact computations
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_quantile_sketch --rows 2000000 --chunksize 100000
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+import pandas as pd
+from matplotlib import cbook
+from matplotlib import pyplot as plt
+import seaborn as sns
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.bench_streaming_zip import write_raw_zip
+from src import (QuantileSketch, build_quantile_sketches, find_outliers, iter_dataset_from_zip,
+                 load_dataset_from_zip, plot_boxplots)
+from src.eda import _box_stats
+
+QUANTILES = np.array([0.001, 0.01, 0.25, 0.5, 0.75, 0.99, 0.999])
+
+def check_exact(zip_path):
+
+    # Ages of the raw file: few distinct values, the sketch is exact
+    ages = load_dataset_from_zip(zip_path, 'KaggleV2-May-2016.csv', sep='|', keep_default_na=False)['Age']
+
+    sketch = QuantileSketch().update(ages)
+    np.testing.assert_array_equal(sketch.quantile(QUANTILES), ages.quantile(QUANTILES).to_numpy())
+
+    reference = cbook.boxplot_stats(ages.to_numpy())[0]
+    stats = _box_stats(ages, 'age')
+    for key in ['med', 'q1', 'q3', 'whislo', 'whishi']:
+        if stats[key] != reference[key]:
+            raise SystemExit(f"*** Error ***   > Box statistic '{key}' {stats[key]} differs from matplotlib's {reference[key]}")
+
+    q1, q3 = ages.quantile([0.25, 0.75])
+    expected = ages[(ages < q1 - 1.5 * (q3 - q1)) | (ages > q3 + 1.5 * (q3 - q1))]
+    pd.testing.assert_series_equal(find_outliers(ages), expected)
+    expected = ages[(ages < ages.mean() - 3 * ages.std()) | (ages > ages.mean() + 3 * ages.std())]
+    pd.testing.assert_series_equal(find_outliers(ages, method='sigma'), expected)
+
+def rank_error(sketch, values):
+
+    return np.abs(np.searchsorted(values, sketch.quantile(QUANTILES)) / len(values) - QUANTILES).max()
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--zip', default=str(project_root / 'data' / 'raw' / 'KaggleV2-May-2016.zip'))
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    args = parser.parse_args()
+
+    check_exact(args.zip)
+    print("> Ages: quantiles, box statistics and IQR/3-sigma outliers equal pandas and matplotlib")
+
+    # Continuous values: one streamed sketch and a merge of 16 partial sketches
+    values = np.random.default_rng(0).lognormal(0, 1, args.rows)
+    streamed = QuantileSketch()
+    for chunk in np.array_split(values, max(1, args.rows // args.chunksize)):
+        streamed.update(chunk)
+    merged = QuantileSketch()
+    for part in np.array_split(values, 16):
+        merged.merge(QuantileSketch().update(part))
+    ordered = np.sort(values)
+    print(f"> Lognormal, {args.rows} rows: {len(streamed.means)} centroids, max rank error {rank_error(streamed, ordered):.2e} "
+          f"streamed, {rank_error(merged, ordered):.2e} merged from 16 parts")
+
+    # Per neighbourhood age sketches over a streamed raw file: memory follows the groups, not the rows
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'patients.zip')
+        write_raw_zip(path, args.rows)
+
+        tracemalloc.start()
+        chunks = iter_dataset_from_zip(path, 'KaggleV2-May-2016.csv', chunksize=args.chunksize, sep='|', keep_default_na=False)
+        sketches = build_quantile_sketches(chunks, 'Age', by='Neighbourhood')
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    size = sum(sketch.means.nbytes + sketch.weights.nbytes for sketch in sketches.values()) / 2**10
+    print(f"> Streamed {args.rows} rows into {len(sketches)} neighbourhood sketches of {size:.1f} KB in total, "
+          f"peak traced memory {peak:.1f} MB (the chunks)")
+
+    # Boxplots of 8 series: concatenation with the group label list before, sketches now
+    plt.show = lambda: plt.close('all')
+    series = [pd.Series(values[position::8]) for position in range(8)]
+    labels = [f"part {position}" for position in range(8)]
+
+    start = time.perf_counter()
+    df = pd.DataFrame({'value': pd.concat(series, ignore_index=True), 'group': sum([[label] * len(s) for label, s in zip(labels, series)], [])})
+    plt.figure(figsize=(15, 7))
+    sns.boxplot(x='group', y='value', data=df, color='grey')
+    plt.close('all')
+    seaborn_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    plot_boxplots(series, labels, 'value', 'Boxplots')
+    plot_time = time.perf_counter() - start
+
+    print(f"> Boxplots of {args.rows} values: concatenation and seaborn {seaborn_time:.2f} s, sketch boxplot {plot_time:.2f} s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# bench_render_figures.py for timing headless batch rendering of per-neighbourhood report figures
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_render_figures --workers 1 4 --fmt png
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from src import load_dataset_from_zip, normalize_headers_string_format, CleaningPipeline, render_figures
+from src.scoring import SCORING_STEPS
+
+# Two figures per neighbourhood: attendance bars and the age histogram
+def make_specs(df):
+
+    specs = []
+    for neighbourhood, group in df.groupby('neighbourhood'):
+        specs.append({'name': f"no_show_{neighbourhood}", 'plot': 'plot_horizontal_bar',
+                      'kwargs': {'ds': group['no_show'], 'title': f"Attendance - {neighbourhood}", 'xlabel': 'Appointments'}})
+        specs.append({'name': f"age_{neighbourhood}", 'plot': 'plot_histogram',
+                      'kwargs': {'ds': group['age'], 'bins': 24, 'title': f"Ages - {neighbourhood}", 'xlabel': 'Age',
+                                 'xticks_range': (0, 120, 10)}})
+
+    return specs
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--zip', default=str(project_root / 'data' / 'raw' / 'KaggleV2-May-2016.zip'))
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--fmt', default='png')
+    args = parser.parse_args()
+
+    df = load_dataset_from_zip(args.zip, 'KaggleV2-May-2016.csv', sep='|', keep_default_na=False)
+    df.columns = normalize_headers_string_format(df.columns)
+    df = CleaningPipeline(SCORING_STEPS).run(df)
+    specs = make_specs(df)
+
+    print(f"> {len(specs)} figures")
+    print(f"{'workers':>8} {'render (s)':>11} {'cached rerun (s)':>17}")
+
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as output_dir:
+
+            start = time.perf_counter()
+            report = render_figures(specs, output_dir, fmt=args.fmt, n_jobs=workers)
+            render_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            rerun = render_figures(specs, output_dir, fmt=args.fmt, n_jobs=workers)
+            rerun_time = time.perf_counter() - start
+
+            if (report['status'] != 'rendered').any() or (rerun['status'] != 'cached').any():
+                raise SystemExit("*** Error ***   > Some figures failed or were rendered again")
+            if not all(os.path.getsize(path) > 0 for path in report['path']):
+                raise SystemExit("*** Error ***   > Empty figure files")
+
+        print(f"{workers:>8} {render_time:>11.2f} {rerun_time:>17.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# bench_scoring_server.py for load testing the micro-batching no-show scoring server on localhost
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_scoring_server --requests 20000 --concurrency 64 --batch-sizes 1 64 256 --max-latency-ms 5
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from src import (load_dataset_from_zip, normalize_headers_string_format, CleaningPipeline, build_feature_matrix,
+                 build_patient_feature_state, build_neighbourhood_no_show_rates, NoShowScoringServer)
+from src.scoring import SCORING_STEPS
+
+# History before the last appointment day trains the model, the bookings of the last day are replayed as requests
+def prepare(zip_path):
+
+    raw = load_dataset_from_zip(zip_path, 'KaggleV2-May-2016.csv', sep='|', keep_default_na=False)
+    df = raw.copy()
+    df.columns = normalize_headers_string_format(df.columns)
+    df = CleaningPipeline(SCORING_STEPS).run(df)
+
+    last_day = df['appointment_day'].max()
+    is_history = (df['appointment_day'] < last_day).to_numpy()
+    history = df[is_history]
+
+    X, y, _ = build_feature_matrix(history)
+    model = make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000)).fit(X, y)
+
+    bookings = raw[~is_history].drop(columns='No-show').to_dict('records')
+
+    return model, build_patient_feature_state(history), build_neighbourhood_no_show_rates(history), bookings
+
+def run_server(model, state, rates, batch_size, max_latency_ms, ready):
+
+    async def serve():
+        server = NoShowScoringServer(model, state, rates, max_batch_size=batch_size, max_latency_ms=max_latency_ms)
+        ready.put(await server.start(port=0))
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+async def load_test(address, payloads, requests, concurrency):
+
+    latencies = np.empty(requests)
+    errors = 0
+    next_request = 0
+
+    async def client():
+        nonlocal next_request, errors
+        reader, writer = await asyncio.open_connection(*address)
+        while next_request < requests:
+            position = next_request
+            next_request += 1
+            start = time.perf_counter()
+            writer.write(payloads[position % len(payloads)])
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            latencies[position] = time.perf_counter() - start
+            errors += 'error' in response
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return latencies * 1000, requests / elapsed, errors
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--zip', default=str(project_root / 'data' / 'raw' / 'KaggleV2-May-2016.zip'))
+    parser.add_argument('--requests', type=int, default=10_000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 64, 256])
+    parser.add_argument('--max-latency-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    model, state, rates, bookings = prepare(args.zip)
+    payloads = [json.dumps(booking).encode() + b'\n' for booking in bookings]
+    print(f"> Model trained, replaying {len(payloads)} bookings of the last day")
+
+    print(f"{'batch size':>10} {'p50 (ms)':>9} {'p99 (ms)':>9} {'req/s':>9} {'errors':>7}")
+    for batch_size in args.batch_sizes:
+
+        ready = multiprocessing.Queue()
+        server = multiprocessing.Process(target=run_server, args=(model, state, rates, batch_size, args.max_latency_ms, ready),
+                                         daemon=True)
+        server.start()
+
+        try:
+            address = ready.get(timeout=60)
+            # Warm up the datetime cache and the cleaning plan before measuring
+            asyncio.run(load_test(address, payloads, min(args.concurrency, args.requests), args.concurrency))
+            latencies, throughput, errors = asyncio.run(load_test(address, payloads, args.requests, args.concurrency))
+        finally:
+            server.terminate()
+            server.join()
+
+        if errors:
+            raise SystemExit(f"*** Error ***   > {errors} requests failed with batch size {batch_size}")
+
+        print(f"{batch_size:>10} {np.percentile(latencies, 50):>9.2f} {np.percentile(latencies, 99):>9.2f} "
+              f"{throughput:>9.0f} {errors:>7}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# bench_streaming_zip.py for checking that streamed ZIP loading stays within a memory budget
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_streaming_zip --rows 2000000 --chunksize 20000 --budget-mb 64
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from src import (iter_dataset_from_zip, normalize_headers_string_format,
+                 normalize_df_string_format, standardize_gender_values, convert_integer_to_boolean)
+
+HEADER = ('Patient Id|Appointment ID|Gender|Scheduled Day|Appointment Day|Age|Neighbourhood|Scholarship|'
+          'Hipertension|Diabetes|Alcoholism|Handcap|SMS_received|No-show')
+NEIGHBOURHOODS = np.array(['JARDIM DA PENHA', 'MATA DA PRAIA', 'PONTAL DE CAMBURI', 'REPÚBLICA', 'CENTRO', 'ITARARÉ'])
+
+# Write a raw-schema ZIP member block by block so the generator itself stays small
+def write_raw_zip(path, rows, block=200_000, seed=0):
+
+    rng = np.random.default_rng(seed)
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as z:
+        with z.open('KaggleV2-May-2016.csv', 'w', force_zip64=True) as member:
+            member.write((HEADER + '\n').encode())
+            for start in range(0, rows, block):
+                n = min(block, rows - start)
+                days = rng.integers(0, 60, n)
+                frame = pd.DataFrame({
+                    'patient_id': rng.integers(10**10, 10**15, n),
+                    'appointment_id': np.arange(start, start + n) + 5_000_000,
+                    'gender': rng.choice(['F', 'M'], n),
+                    'scheduled_day': (pd.Timestamp('2016-03-01') + pd.to_timedelta(days, 'D')
+                                      + pd.to_timedelta(rng.integers(0, 86400, n), 's')).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'appointment_day': (pd.Timestamp('2016-03-01') + pd.to_timedelta(days + rng.integers(0, 30, n), 'D')
+                                        ).strftime('%Y-%m-%dT00:00:00Z'),
+                    'age': rng.integers(-1, 116, n),
+                    'neighbourhood': rng.choice(NEIGHBOURHOODS, n),
+                    **{flag: rng.integers(0, 2, n) for flag in ['scholarship', 'hipertension', 'diabetes',
+                                                                'alcoholism', 'handcap', 'sms_received']},
+                    'no_show': rng.choice(['No', 'Yes'], n, p=[0.8, 0.2]),
+                })
+                member.write(frame.to_csv(sep='|', header=False, index=False).encode())
+
+def rename_headers(df):
+
+    df.columns = normalize_headers_string_format(df.columns)
+
+    return df
+
+TRANSFORMS = [rename_headers,
+              (normalize_df_string_format, {}),
+              (convert_integer_to_boolean, {'include': ['scholarship', 'hipertension', 'diabetes',
+                                                        'alcoholism', 'handcap', 'sms_received']}),
+              (standardize_gender_values, {'include': ['gender']})]
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--chunksize', type=int, default=20_000)
+    parser.add_argument('--budget-mb', type=float, default=64,
+                        help="Peak traced memory allowed while streaming, well below the size of the member")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = os.path.join(tmp, 'scaled.zip')
+        write_raw_zip(zip_path, args.rows)
+        with zipfile.ZipFile(zip_path) as z:
+            raw_mb = z.getinfo('KaggleV2-May-2016.csv').file_size / 2**20
+        budget_mb = args.budget_mb
+
+        rows = 0
+        no_show = 0
+        tracemalloc.start()
+        start = time.perf_counter()
+        for chunk in iter_dataset_from_zip(zip_path, 'KaggleV2-May-2016.csv', chunksize=args.chunksize,
+                                           transforms=TRANSFORMS, sep='|', keep_default_na=False):
+            rows += len(chunk)
+            no_show += int((chunk['no_show'] == 'yes').sum())
+        elapsed = time.perf_counter() - start
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+        print(f"> Uncompressed member: {raw_mb:.1f} MB, rows streamed: {rows}, no-shows: {no_show}")
+        print(f"> Streaming time: {elapsed:.2f} s, peak traced memory: {peak_mb:.1f} MB (budget {budget_mb:.1f} MB)")
+
+        if rows != args.rows:
+            raise SystemExit(f"*** Error ***   > Expected {args.rows} rows, streamed {rows}")
+        if peak_mb > budget_mb:
+            raise SystemExit("*** Error ***   > Peak memory exceeded the budget")
+        if raw_mb < 2 * budget_mb:
+            raise SystemExit("*** Error ***   > Member is not several times larger than the budget, increase --rows")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,562 @@
+# bench_suite.py for timing and memory profiling every public function of src on synthetic data at several scales
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_suite --rows 100000 1000000 --save benchmarks/results/baseline.json
+#   python -m benchmarks.bench_suite --rows 100000 1000000 --compare benchmarks/results/baseline.json --tolerance 0.25
+#   python -m benchmarks.bench_suite --rows 100000 --only detect_implicit_duplicates CleaningPipeline
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import socket
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import _thread
+from datetime import datetime, timezone
+from pathlib import Path
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+import src
+from benchmarks.bench_attendance_cube import BREAKDOWNS
+from benchmarks.synthetic_data import MEMBER, write_synthetic_zip
+from src.features import FLAG_COLUMNS
+from src.scoring import SCORING_STEPS
+
+READ_KWARGS = {'sep': '|', 'keep_default_na': False}
+
+DATE_FORMAT = "%Y_%m_%dT%H_%M_%SZ"
+
+# Every case is registered with the public name it covers and an optional cap on its input rows
+CASES = {}
+
+def case(name, max_rows=None):
+
+    def register(prepare):
+        CASES[name] = (prepare, max_rows)
+        return prepare
+
+    return register
+
+# Function for the inputs shared by the cases: the raw file in every format, the cleaned frame and the model inputs
+def build_context(zip_path, work_dir, max_model_rows):
+
+    raw = src.load_dataset_from_zip(zip_path, MEMBER, **READ_KWARGS)
+
+    named = raw.copy()
+    named.columns = src.normalize_headers_string_format(named.columns)
+    normalized = src.normalize_df_string_format(named.copy())
+
+    clean = src.CleaningPipeline(SCORING_STEPS).run(named.copy())
+    clean = src.convert_integer_to_boolean(clean, include=FLAG_COLUMNS[:4] + FLAG_COLUMNS[5:])
+
+    # History up to the last appointment day, its bookings are the new batch
+    last_day = clean['appointment_day'].max()
+    is_history = (clean['appointment_day'] < last_day).to_numpy()
+    history, batch = clean[is_history], clean[~is_history]
+    state = src.build_patient_feature_state(history)
+    rates = src.build_neighbourhood_no_show_rates(history)
+
+    X, y, _ = src.build_feature_matrix(history.head(max_model_rows))
+    model = make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000)).fit(X, y)
+
+    csv_path = os.path.join(work_dir, 'patients.csv')
+    raw.to_csv(csv_path, sep='|', index=False)
+    state_path = os.path.join(work_dir, 'state.npz')
+    src.save_patient_feature_state(state, state_path)
+
+    return {'zip_path': zip_path, 'work_dir': work_dir, 'raw': raw, 'named': named, 'normalized': normalized,
+            'clean': clean, 'history': history, 'batch': batch, 'state': state, 'rates': rates, 'X': X, 'y': y,
+            'model': model, 'bookings': raw[~is_history].drop(columns='No-show').to_dict('records'),
+            'csv_path': csv_path, 'state_path': state_path, 'cube': src.build_attendance_cube(clean)}
+
+# data_loader
+
+@case('load_dataset_from_zip')
+def _(ctx, rows):
+    return lambda: src.load_dataset_from_zip(ctx['zip_path'], MEMBER, **READ_KWARGS)
+
+@case('iter_dataset_from_zip')
+def _(ctx, rows):
+    return lambda: sum(len(chunk) for chunk in src.iter_dataset_from_zip(ctx['zip_path'], MEMBER, chunksize=100_000, **READ_KWARGS))
+
+@case('load_dataset_from_csv')
+def _(ctx, rows):
+    return lambda: src.load_dataset_from_csv(ctx['csv_path'], **READ_KWARGS)
+
+@case('load_dataset_from_excel', max_rows=10_000)
+def _(ctx, rows):
+    path = os.path.join(ctx['work_dir'], f'patients_{rows}.xlsx')
+    if not os.path.exists(path):
+        ctx['raw'].head(rows).to_excel(path, index=False)
+    return lambda: src.load_dataset_from_excel(path, keep_default_na=False)
+
+@case('load_dataset_from_list', max_rows=200_000)
+def _(ctx, rows):
+    records = ctx['raw'].head(rows).to_dict('records')
+    return lambda: src.load_dataset_from_list(records)
+
+@case('load_dataset_from_dict')
+def _(ctx, rows):
+    columns = ctx['raw'].to_dict('list')
+    return lambda: src.load_dataset_from_dict(columns)
+
+@case('clear_dataset_cache')
+def _(ctx, rows):
+    cache_dir = os.path.join(ctx['work_dir'], 'cache')
+    src.load_dataset_from_csv(ctx['csv_path'], cache_dir=cache_dir, **READ_KWARGS)
+    return lambda: src.clear_dataset_cache(cache_dir)
+
+@case('get_dataset_cache_stats')
+def _(ctx, rows):
+    return src.get_dataset_cache_stats
+
+@case('load_datasets_from_sources')
+def _(ctx, rows):
+    return lambda: src.load_datasets_from_sources([ctx['zip_path'], ctx['csv_path']], **READ_KWARGS)
+
+# data_cleaning, every call gets its own copy of the input
+
+@case('check_existing_missing_values')
+def _(ctx, rows):
+    return lambda: src.check_existing_missing_values(ctx['named'])
+
+@case('replace_missing_values')
+def _(ctx, rows):
+    df = ctx['named'].copy()
+    return lambda: src.replace_missing_values(df)
+
+@case('normalize_df_string_format')
+def _(ctx, rows):
+    df = ctx['named'].copy()
+    return lambda: src.normalize_df_string_format(df)
+
+@case('normalize_headers_string_format')
+def _(ctx, rows):
+    return lambda: src.normalize_headers_string_format(list(ctx['raw'].columns))
+
+@case('detect_implicit_duplicates')
+def _(ctx, rows):
+    return lambda: src.detect_implicit_duplicates(ctx['named'], include=['gender', 'neighbourhood'], verbose=False)
+
+@case('replace_string_values_datetime')
+def _(ctx, rows):
+    df = ctx['normalized'].copy()
+    src.clear_datetime_cache()
+    return lambda: src.replace_string_values_datetime(df, include=['scheduled_day', 'appointment_day'], frmt=DATE_FORMAT)
+
+@case('clear_datetime_cache')
+def _(ctx, rows):
+    src.replace_string_values_datetime(ctx['normalized'].copy(), include=['scheduled_day'], frmt=DATE_FORMAT)
+    return src.clear_datetime_cache
+
+@case('find_errors_to_numeric')
+def _(ctx, rows):
+    return lambda: src.find_errors_to_numeric(ctx['named'], 'patient_id')
+
+@case('convert_ndtype_to_numeric')
+def _(ctx, rows):
+    df = ctx['named'].copy()
+    return lambda: src.convert_ndtype_to_numeric(df, type='integer', include=['appointment_id', 'age'])
+
+@case('convert_integer_to_boolean')
+def _(ctx, rows):
+    df = ctx['named'].copy()
+    return lambda: src.convert_integer_to_boolean(df, include=FLAG_COLUMNS)
+
+@case('standardize_gender_values')
+def _(ctx, rows):
+    df = ctx['normalized'].copy()
+    return lambda: src.standardize_gender_values(df, include=['gender'])
+
+@case('compact_dtypes')
+def _(ctx, rows):
+    df = ctx['clean'].copy()
+    return lambda: src.compact_dtypes(df)
+
+@case('CleaningPipeline')
+def _(ctx, rows):
+    df = ctx['named'].copy()
+    src.clear_datetime_cache()
+    return lambda: src.CleaningPipeline(SCORING_STEPS).run(df)
+
+@case('DataQualityProfile')
+def _(ctx, rows):
+    return lambda: src.DataQualityProfile().update(ctx['raw'])
+
+@case('profile_data_quality')
+def _(ctx, rows):
+    return lambda: src.profile_data_quality(src.iter_dataset_from_zip(ctx['zip_path'], MEMBER, chunksize=100_000, **READ_KWARGS))
+
+# sketches and cube
+
+@case('QuantileSketch')
+def _(ctx, rows):
+    waiting = (ctx['clean']['appointment_day'] - ctx['clean']['scheduled_day']).dt.total_seconds()
+    return lambda: src.QuantileSketch().update(waiting).quantile([0.25, 0.5, 0.75])
+
+@case('build_quantile_sketches')
+def _(ctx, rows):
+    return lambda: src.build_quantile_sketches(ctx['clean'], 'age', by='neighbourhood')
+
+@case('find_outliers')
+def _(ctx, rows):
+    return lambda: src.find_outliers(ctx['clean']['age'])
+
+@case('build_attendance_cube')
+def _(ctx, rows):
+    return lambda: src.build_attendance_cube(ctx['clean'])
+
+@case('AttendanceCube')
+def _(ctx, rows):
+    cube = ctx['cube']
+    # A fresh cube per call, the breakdowns are memoized
+    return lambda: [src.AttendanceCube(cube.dimensions, cube.levels, cube.cells, cube.cell_counts).counts(dimensions, **filters)
+                    for dimensions, filters, _ in BREAKDOWNS]
+
+# duplicates
+
+@case('build_duplicate_index')
+def _(ctx, rows):
+    chunks = np.array_split(np.arange(len(ctx['named'])), 10)
+    # A new index directory per call
+    paths = (os.path.join(ctx['work_dir'], f'duplicates_{rows}_{call}') for call in itertools.count())
+    return lambda: src.build_duplicate_index((ctx['named'].iloc[chunk] for chunk in chunks), next(paths))
+
+@case('DuplicateIndex')
+def _(ctx, rows):
+    index = src.build_duplicate_index([ctx['named'].iloc[:len(ctx['named']) // 2]])
+    return lambda: index.update(ctx['named'], add=False)
+
+# hypothesis tests
+
+@case('build_contingency_tables')
+def _(ctx, rows):
+    return lambda: src.build_contingency_tables(ctx['clean'])
+
+@case('run_hypothesis_tests')
+def _(ctx, rows):
+    return lambda: src.run_hypothesis_tests(ctx['clean'], n_resamples=1000, n_jobs=1)
+
+# validation
+
+@case('ValidationRules')
+def _(ctx, rows):
+    chunks = np.array_split(np.arange(len(ctx['clean'])), 10)
+    # Chunk by chunk, the age imputed with a fixed value
+    rules = src.ValidationRules([('range', {'column': 'age', 'min': 0, 'max': 115, 'repair': 'impute', 'fill': 37}),
+                                 *src.validation.PATIENT_RULES[1:]])
+    return lambda: sum(len(chunk) for chunk, _ in rules.validate_chunks(ctx['clean'].iloc[chunk].copy() for chunk in chunks))
+
+@case('validate_dataset')
+def _(ctx, rows):
+    return lambda: src.validate_dataset(ctx['clean'].copy())
+
+# eda, rendered headless to files
+
+def _figure(ctx, name):
+    return os.path.join(ctx['work_dir'], f'{name}.png')
+
+@case('summarize_distribution')
+def _(ctx, rows):
+    return lambda: src.summarize_distribution(ctx['clean']['age'], bins=20, kde=True)
+
+@case('missing_values_heatmap', max_rows=50_000)
+def _(ctx, rows):
+    df = src.replace_missing_values(ctx['named'].head(rows).copy())
+    return lambda: src.missing_values_heatmap(df, output_path=_figure(ctx, 'heatmap'))
+
+@case('plot_boxplots')
+def _(ctx, rows):
+    clean = ctx['clean']
+    series = [clean.loc[clean['gender'] == gender, 'age'] for gender in ['female', 'male']]
+    return lambda: src.plot_boxplots(series, ['female', 'male'], 'age', 'Age', output_path=_figure(ctx, 'boxplots'))
+
+@case('plot_histogram')
+def _(ctx, rows):
+    return lambda: src.plot_histogram(ctx['clean']['age'], bins=20, output_path=_figure(ctx, 'histogram'))
+
+@case('plot_hue_histogram')
+def _(ctx, rows):
+    return lambda: src.plot_hue_histogram(ctx['clean'], x_col='age', hue_col='no_show', bins=30,
+                                          output_path=_figure(ctx, 'hue_histogram'))
+
+@case('plot_dual_histogram')
+def _(ctx, rows):
+    clean = ctx['clean']
+    female, male = (clean.loc[clean['gender'] == gender, 'age'] for gender in ['female', 'male'])
+    return lambda: src.plot_dual_histogram(female, male, bins=20, output_path=_figure(ctx, 'dual_histogram'))
+
+@case('plot_frequency_density')
+def _(ctx, rows):
+    return lambda: src.plot_frequency_density(ctx['clean']['age'], bins=20, output_path=_figure(ctx, 'density'))
+
+@case('plot_grouped_barplot')
+def _(ctx, rows):
+    return lambda: src.plot_grouped_barplot(ctx['cube'], x_col='appointment_weekday', y_col='count', hue_col='no_show',
+                                            output_path=_figure(ctx, 'grouped_barplot'))
+
+@case('plot_horizontal_bar')
+def _(ctx, rows):
+    return lambda: src.plot_horizontal_bar(ctx['clean']['no_show'], output_path=_figure(ctx, 'horizontal_bar'))
+
+@case('render_figures')
+def _(ctx, rows):
+    clean = ctx['clean']
+    specs = [{'name': f'age_{gender}', 'plot': 'plot_histogram', 'kwargs': {'ds': clean.loc[clean['gender'] == gender, 'age']}}
+             for gender in ['female', 'male']]
+    specs.append({'name': 'no_show', 'plot': 'plot_horizontal_bar', 'kwargs': {'ds': ctx['cube'].rollup('no_show')}})
+    return lambda: src.render_figures(specs, os.path.join(ctx['work_dir'], 'figures'), n_jobs=1, use_cache=False)
+
+# features
+
+@case('compute_no_show_features')
+def _(ctx, rows):
+    return lambda: src.compute_no_show_features(ctx['clean'])
+
+@case('build_feature_matrix')
+def _(ctx, rows):
+    return lambda: src.build_feature_matrix(ctx['clean'])
+
+@case('compute_booking_features')
+def _(ctx, rows):
+    return lambda: src.compute_booking_features(ctx['batch'], ctx['state'], ctx['rates'])
+
+@case('build_neighbourhood_no_show_rates')
+def _(ctx, rows):
+    return lambda: src.build_neighbourhood_no_show_rates(ctx['clean'])
+
+@case('build_patient_feature_state')
+def _(ctx, rows):
+    return lambda: src.build_patient_feature_state(ctx['history'])
+
+@case('update_patient_feature_state')
+def _(ctx, rows):
+    return lambda: src.update_patient_feature_state(ctx['state'], ctx['batch'])
+
+@case('save_patient_feature_state')
+def _(ctx, rows):
+    return lambda: src.save_patient_feature_state(ctx['state'], os.path.join(ctx['work_dir'], 'state_copy.npz'))
+
+@case('load_patient_feature_state')
+def _(ctx, rows):
+    return lambda: src.load_patient_feature_state(ctx['state_path'])
+
+# modeling, capped like the training sample of the model
+
+@case('cross_validate_no_show_models', max_rows=200_000)
+def _(ctx, rows):
+    candidates = {'logistic_regression': (make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000)), None)}
+    return lambda: src.cross_validate_no_show_models(ctx['X'][:rows], ctx['y'][:rows], candidates, n_splits=3, n_jobs=1,
+                                                     work_dir=ctx['work_dir'])
+
+@case('train_no_show_model', max_rows=200_000)
+def _(ctx, rows):
+    estimator = make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+    return lambda: src.train_no_show_model(ctx['X'][:rows], ctx['y'][:rows], estimator)
+
+# scoring
+
+@case('NoShowScoringServer')
+def _(ctx, rows):
+    server = src.NoShowScoringServer(ctx['model'], ctx['state'], ctx['rates'])
+    return lambda: server.score_bookings(ctx['bookings'])
+
+@case('serve_no_show_scores')
+def _(ctx, rows):
+
+    # Start, score the bookings of the last day over one connection, then stop the server like Ctrl+C
+    def client(port, payload, count):
+        for _ in range(500):
+            try:
+                connection = socket.create_connection(('127.0.0.1', port))
+                break
+            except ConnectionRefusedError:
+                time.sleep(0.01)
+        with connection, connection.makefile('rb') as responses:
+            connection.sendall(payload)
+            for _ in range(count):
+                responses.readline()
+        _thread.interrupt_main()
+
+    payload = b''.join(json.dumps(booking).encode() + b'\n' for booking in ctx['bookings'])
+
+    def run():
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        threading.Thread(target=client, args=(port, payload, len(ctx['bookings'])), daemon=True).start()
+        return src.serve_no_show_scores(ctx['model'], ctx['state'], ctx['rates'], port=port)
+
+    return run
+
+# instrumentation
+
+def _traced_cleaning(ctx, memory=False):
+    df = ctx['named'].copy()
+    with src.InstrumentationTrace('bench', memory=memory) as trace:
+        src.normalize_df_string_format(df)
+        src.standardize_gender_values(df, include=['gender'])
+        src.convert_integer_to_boolean(df, include=FLAG_COLUMNS)
+    return trace
+
+@case('InstrumentationTrace')
+def _(ctx, rows):
+    return lambda: _traced_cleaning(ctx)
+
+@case('instrument')
+def _(ctx, rows):
+    # 10,000 calls of a decorated function with no active trace
+    headers = src.instrument(src.normalize_headers_string_format.__wrapped__)
+    columns = list(ctx['raw'].columns)
+    return lambda: [headers(columns) for _ in range(10_000)]
+
+@case('summarize_trace')
+def _(ctx, rows):
+    trace = _traced_cleaning(ctx, memory=True)
+    return lambda: src.summarize_trace(trace)
+
+# utils
+
+@case('format_notebook')
+def _(ctx, rows):
+    return src.format_notebook
+
+# Function for timing one case: best of several calls, then one more call under tracemalloc for the peak
+def measure(prepare, ctx, rows, repeat):
+
+    seconds = []
+    for _ in range(repeat):
+        run = prepare(ctx, rows)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            run()
+            seconds.append(time.perf_counter() - start)
+
+    run = prepare(ctx, rows)
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return min(seconds), peak / 2**20
+
+# Function for the cases slower than the baseline by more than the tolerance
+def find_regressions(results, baseline, tolerance, min_seconds):
+
+    reference = {(row['name'], row['rows']): row for row in baseline['results']}
+    regressions = []
+
+    for row in results:
+
+        before = reference.get((row['name'], row['rows']))
+        if before is None or max(row['seconds'], before['seconds']) < min_seconds:
+            continue
+
+        ratio = row['seconds'] / max(before['seconds'], 1e-9)
+        if ratio > 1 + tolerance:
+            regressions.append(f"{row['name']} at {row['rows']} rows: {before['seconds']:.3f} s -> {row['seconds']:.3f} s (x{ratio:.2f})")
+
+    return regressions
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', help="Public names to run, every one by default")
+    parser.add_argument('--data-dir', help="Keep the synthetic ZIPs here and reuse them, a temporary directory by default")
+    parser.add_argument('--max-model-rows', type=int, default=200_000)
+    parser.add_argument('--save', help="JSON file for the results")
+    parser.add_argument('--compare', help="JSON results of a previous run to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown over the baseline, 0.25 is 25%%")
+    parser.add_argument('--min-seconds', type=float, default=0.05, help="Cases faster than this on both runs are not compared")
+    args = parser.parse_args()
+
+    uncovered = sorted(set(src.__all__) - set(CASES))
+    if uncovered:
+        raise SystemExit(f"*** Error ***   > Public names without a benchmark case: {uncovered}")
+
+    names = args.only or list(src.__all__)
+    unknown = sorted(set(names) - set(CASES))
+    if unknown:
+        raise SystemExit(f"*** Error ***   > Unknown names: {unknown}")
+
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        data_dir = args.data_dir or tmp
+
+        for rows in args.rows:
+
+            zip_path = os.path.join(data_dir, f'synthetic_{rows}_{args.seed}.zip')
+            if not os.path.exists(zip_path):
+                start = time.perf_counter()
+                write_synthetic_zip(zip_path, rows, seed=args.seed)
+                print(f"> Generated {rows} rows in {time.perf_counter() - start:.1f} s")
+
+            work_dir = tempfile.mkdtemp(dir=tmp)
+            with contextlib.redirect_stdout(io.StringIO()):
+                ctx = build_context(zip_path, work_dir, args.max_model_rows)
+
+            print(f"\n{'function':<34} {'rows':>9} {'seconds':>9} {'rows/s':>12} {'peak MB':>9}")
+            for name in names:
+
+                prepare, max_rows = CASES[name]
+                input_rows = rows if max_rows is None else min(rows, max_rows)
+
+                try:
+                    seconds, peak = measure(prepare, ctx, input_rows, args.repeat)
+                except Exception as error:
+                    raise SystemExit(f"*** Error ***   > {name} failed at {rows} rows: {type(error).__name__}: {error}")
+
+                results.append({'name': name, 'rows': rows, 'input_rows': input_rows, 'seconds': seconds, 'peak_mb': peak})
+                print(f"{name:<34} {input_rows:>9} {seconds:>9.4f} {input_rows / seconds:>12,.0f} {peak:>9.1f}")
+
+    report = {'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+              'machine': {'platform': platform.platform(), 'processor': platform.machine(), 'cpus': os.cpu_count(),
+                          'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+                          'scikit-learn': sklearn.__version__},
+              'seed': args.seed, 'repeat': args.repeat, 'results': results}
+
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"\n> Results saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = find_regressions(results, baseline, args.tolerance, args.min_seconds)
+        if regressions:
+            raise SystemExit("*** Error ***   > Slower than the baseline by more than "
+                             f"{args.tolerance:.0%}:\n" + '\n'.join(regressions))
+        print(f"> No regression over {args.tolerance:.0%} against {args.compare}")
+
+if __name__ == '__main__':
+    main()
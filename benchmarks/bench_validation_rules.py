@@ -0,0 +1,141 @@
+# bench_validation_rules.py for checking ValidationRules against the ad-hoc pandas cells of 02-cleaning, whole and chunk
+# by chunk, and timing both, plus the whole number check of convert_ndtype_to_numeric against the integer copy it replaced
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_validation_rules --rows 2000000 --chunksize 200000
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.synthetic_data import generate_block
+from src import ValidationRules, normalize_headers_string_format
+from src.data_cleaning import _is_whole_number_series
+from src.validation import PATIENT_RULES
+
+# Mean age of the synthetic patients, a fixed fill gives the same repairs whatever the chunking
+RULES = [('range', {'column': 'age', 'min': 0, 'max': 115, 'repair': 'impute', 'fill': 37}), *PATIENT_RULES[1:]]
+
+# Function for cleaned patients with errors of every kind: ages out of range, unknown genders and handicap
+# levels, bookings after the appointment day and appointments delivered twice
+def make_patients(rows, seed=0, error_rate=0.001):
+
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(generate_block(rng, 0, rows, rows, quirks=False))
+    df.columns = normalize_headers_string_format(df.columns)
+    df['gender'] = df['gender'].map({'F': 'female', 'M': 'male'})
+    for column in ('scheduled_day', 'appointment_day'):
+        df[column] = df[column].dt.tz_localize('UTC')
+
+    def errors():
+        return np.flatnonzero(rng.random(rows) < error_rate)
+
+    ages = errors()
+    df.loc[ages, 'age'] = rng.choice([-1, 130], len(ages))
+    df.loc[errors(), 'gender'] = 'unknown'
+    df.loc[errors(), 'handcap'] = 7
+    late = errors()
+    df.loc[late, 'scheduled_day'] = df.loc[late, 'appointment_day'] + pd.Timedelta(days=2)
+    repeated = errors()
+    df.loc[repeated, 'appointment_id'] = df['appointment_id'].to_numpy()[repeated // 2]
+
+    return df
+
+# Function for the cells of 02-cleaning: one boolean mask per rule, the age patched and the bad rows dropped by hand
+def reference(df):
+
+    masks = {'range:age': ((df['age'] < 0) | (df['age'] > 115)).to_numpy(),
+             'integer:age': np.zeros(len(df), dtype=bool),
+             'allowed:gender': (~df['gender'].isin(['female', 'male']) & df['gender'].notna()).to_numpy(),
+             'allowed:handcap': (~df['handcap'].isin([0, 1, 2, 3, 4])).to_numpy(),
+             'order:scheduled_day<=appointment_day': (df['appointment_day'].dt.floor('D') < df['scheduled_day'].dt.floor('D')).to_numpy(),
+             'unique:appointment_id': df['appointment_id'].duplicated().to_numpy()}
+
+    repaired = df.copy()
+    repaired.loc[masks['range:age'], 'age'] = 37
+    repaired = repaired[~(masks['order:scheduled_day<=appointment_day'] | masks['unique:appointment_id'])]
+
+    return masks, repaired
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--chunksize', type=int, default=200_000)
+    args = parser.parse_args()
+
+    df = make_patients(args.rows)
+    chunks = [df.iloc[start:start + args.chunksize] for start in range(0, len(df), args.chunksize)]
+
+    start = time.perf_counter()
+    masks, expected = reference(df)
+    reference_seconds = time.perf_counter() - start
+
+    rules = ValidationRules(RULES)
+    tracemalloc.start()
+    start = time.perf_counter()
+    violations = rules.evaluate(df)
+    evaluate_seconds = time.perf_counter() - start
+    repaired = rules.repair(df.copy(), violations)
+    rules_seconds = time.perf_counter() - start
+    rules_peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+
+    index = rules.violation_index(violations)
+    for name, mask in masks.items():
+        if not index[name].equals(df.index[mask]):
+            raise SystemExit(f"*** Error ***   > [{name}] flags other rows than the pandas cell")
+    if not repaired.equals(expected):
+        raise SystemExit("*** Error ***   > The repaired frame differs from the one of the pandas cells")
+    print(f"> {args.rows} rows, {violations.dtype} bitmap: same violations and repairs as the pandas cells")
+    print(rules.report[['violations', 'repaired', 'dropped']].to_string())
+
+    start = time.perf_counter()
+    streamed = list(ValidationRules(RULES).validate_chunks(chunk.copy() for chunk in chunks))
+    chunks_seconds = time.perf_counter() - start
+    if not pd.concat([chunk for chunk, _ in streamed]).equals(expected) or \
+       not pd.concat([bits for _, bits in streamed]).equals(violations):
+        raise SystemExit("*** Error ***   > Chunk by chunk validation differs from the whole frame")
+    print(f"> {len(chunks)} chunks of {args.chunksize} rows: same bitmap and repairs, duplicates found across chunks")
+
+    print(f"{'':>28} {'seconds':>8}")
+    print(f"{'pandas cells':>28} {reference_seconds:>8.2f}")
+    print(f"{'ValidationRules.evaluate':>28} {evaluate_seconds:>8.2f}")
+    print(f"{'evaluate + repair':>28} {rules_seconds:>8.2f}   peak {rules_peak:.0f} MB")
+    print(f"{'validate_chunks':>28} {chunks_seconds:>8.2f}")
+
+    # The whole number check of convert_ndtype_to_numeric, on patient ids stored as floats
+    ids = df['patient_id'].astype(np.float64)
+    for label, values in (('whole floats', ids), ('with NaN', ids.where(np.arange(len(ids)) % 1000 != 0))):
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            outcome = np.array_equal(values, values.astype('int'))
+        except ValueError as error:
+            outcome = type(error).__name__
+        copy_seconds = time.perf_counter() - start
+        copy_peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        whole = _is_whole_number_series(values)
+        whole_seconds = time.perf_counter() - start
+        whole_peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+        print(f"> {label}: astype('int') check {outcome} in {copy_seconds:.3f} s, peak {copy_peak:.0f} MB; "
+              f"block check {whole} in {whole_seconds:.3f} s, peak {whole_peak:.0f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+# synthetic_data.py for generating seeded raw-schema appointment datasets at any scale, as a pipe-separated ZIP
+#
+# Usage (from the project root):
+#   python -m benchmarks.synthetic_data --rows 10000000 --output data/synthetic/patients_10M.zip --seed 0
+
+import argparse
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.bench_streaming_zip import HEADER
+from src.data_cleaning import MISSING_VALUES
+
+MEMBER = 'KaggleV2-May-2016.csv'
+
+NEIGHBOURHOODS = np.array(['JARDIM CAMBURI', 'MARIA ORTIZ', 'RESISTÊNCIA', 'JARDIM DA PENHA', 'ITARARÉ', 'CENTRO',
+                           'TABUAZEIRO', 'SANTA MARTHA', 'JESUS DE NAZARETH', 'BONFIM', 'SANTO ANTÔNIO', 'SANTO ANDRÉ',
+                           'CARATOÍRA', 'JABOUR', 'SÃO PEDRO', 'ILHA DO PRÍNCIPE', 'NOVA PALESTINA', 'ANDORINHAS',
+                           'DA PENHA', 'ROMÃO', 'GURIGICA', 'SÃO JOSÉ', 'BELA VISTA', 'MARUÍPE', 'FORTE SÃO JOÃO',
+                           'ILHA DE SANTA MARIA', 'SÃO CRISTÓVÃO', 'REDENÇÃO', 'SÃO BENEDITO', 'JOANA D´ARC',
+                           'CONSOLAÇÃO', 'PRAIA DO SUÁ', 'PARQUE MOSCOSO', 'MATA DA PRAIA', 'ILHAS OCEÂNICAS DE TRINDADE'])
+
+# Zipf-like popularity of the neighbourhoods, the first ones concentrate most appointments
+NEIGHBOURHOOD_WEIGHTS = 1 / np.arange(1, len(NEIGHBOURHOODS) + 1) ** 0.8
+NEIGHBOURHOOD_WEIGHTS /= NEIGHBOURHOOD_WEIGHTS.sum()
+
+FIRST_DAY = np.datetime64('2016-01-04', 's')
+
+# Function for one block of rows: numeric columns as NumPy arrays, the string columns already formatted
+def generate_block(rng, start, n, rows, days=180, quirks=True, missing_rate=0.001):
+
+    # Returning patients: a pool about half the size of the dataset, a few patients book very often
+    pool = max(1, int(rows * 0.56))
+    patient = (pool * rng.random(n) ** 1.5).astype(np.int64)
+    patient_id = (patient * 2_654_435_761 + 86_028_157) % 999_999_000_000_000 + 10_000
+
+    # Weekdays only, the appointment time is always midnight and the booking is 0 to ~3 months before
+    weekdays = np.flatnonzero(np.is_busday(FIRST_DAY.astype('datetime64[D]') + np.arange(days)))
+    appointment_day = FIRST_DAY + rng.choice(weekdays, n).astype('timedelta64[D]')
+    waiting = np.where(rng.random(n) < 0.35, 0, np.minimum(rng.geometric(1 / 12, n), 179))
+    scheduled_day = (appointment_day - waiting.astype('timedelta64[D]')
+                     + rng.integers(7 * 3600, 20 * 3600, n).astype('timedelta64[s]'))
+
+    age = np.clip(np.where(rng.random(n) < 0.25, rng.integers(0, 18, n), rng.normal(45, 20, n)), 0, 115).astype(np.int64)
+    female = rng.random(n) < 0.65
+    sms_received = (waiting > 2) & (rng.random(n) < 0.55)
+    scholarship = rng.random(n) < 0.10
+    hipertension = rng.random(n) < np.clip(age / 150, 0.01, 0.6)
+    diabetes = rng.random(n) < np.clip(age / 500, 0.005, 0.2)
+    alcoholism = rng.random(n) < 0.03
+    handcap = rng.choice(5, n, p=[0.97974, 0.01847, 0.00166, 0.00012, 0.00001])
+
+    # About 20% no-shows, more with long waits and young patients, fewer with an SMS reminder
+    logit = -1.9 + 0.9 * np.log1p(waiting) / np.log(30) - 0.25 * sms_received - 0.008 * (age - 40) + 0.2 * scholarship
+    no_show = rng.random(n) < 1 / (1 + np.exp(-logit))
+
+    gender = np.where(female, 'F', 'M').astype(object)
+    neighbourhood = NEIGHBOURHOODS[rng.choice(len(NEIGHBOURHOODS), n, p=NEIGHBOURHOOD_WEIGHTS)].astype(object)
+    patient_text = patient_id.astype(str).astype(object)
+
+    if quirks:
+
+        # A handful of -1 ages, like the original extract
+        age[rng.random(n) < 1e-5] = -1
+
+        # Mixed case and stray spaces, which normalize_df_string_format and detect_implicit_duplicates catch
+        variant = rng.random(n)
+        title, padded = variant < 0.005, (variant >= 0.005) & (variant < 0.008)
+        neighbourhood[title] = np.char.title(neighbourhood[title].astype(str)).astype(object)
+        neighbourhood[padded] = np.char.add(neighbourhood[padded].astype(str), ' ').astype(object)
+        lower = rng.random(n) < 0.003
+        gender[lower] = np.char.lower(gender[lower].astype(str)).astype(object)
+
+        # Missing value tokens in the string columns
+        for column in (gender, neighbourhood):
+            missing = rng.random(n) < missing_rate
+            column[missing] = rng.choice(np.array(MISSING_VALUES, dtype=object), missing.sum())
+
+        # Patient ids that are not whole numbers, as a few in the original
+        fractional = rng.random(n) < 1e-4
+        patient_text[fractional] = [f"{value}.{digits}" for value, digits in
+                                    zip(patient_id[fractional] % 100_000, rng.integers(10_000, 99_999, fractional.sum()))]
+
+    return {'Patient Id': patient_text,
+            'Appointment ID': np.arange(start, start + n) + 5_000_000,
+            'Gender': gender,
+            'Scheduled Day': scheduled_day,
+            'Appointment Day': appointment_day,
+            'Age': age,
+            'Neighbourhood': neighbourhood,
+            'Scholarship': scholarship.astype(np.int8),
+            'Hipertension': hipertension.astype(np.int8),
+            'Diabetes': diabetes.astype(np.int8),
+            'Alcoholism': alcoholism.astype(np.int8),
+            'Handcap': handcap.astype(np.int8),
+            'SMS_received': sms_received.astype(np.int8),
+            'No-show': np.where(no_show, 'Yes', 'No').astype(object)}
+
+# Function for writing the dataset block by block into a ZIP member, memory stays at one block
+def write_synthetic_zip(path, rows, seed=0, block=500_000, days=180, quirks=True, missing_rate=0.001, compresslevel=1):
+    """
+    Writes a seeded dataset with the schema and format of KaggleV2-May-2016.zip.
+
+    Args:
+        path (str): ZIP file to write, with one pipe-separated member named like the original.
+        rows (int): Number of appointments.
+        seed (int): Seed of the generator, the same seed and block give the same file.
+        block (int): Rows generated and written at a time.
+        days (int): Calendar days covered by the appointments.
+        quirks (bool): Add the quirks of the raw data: missing tokens, mixed case, -1 ages, fractional ids.
+        missing_rate (float): Share of missing tokens in 'Gender' and 'Neighbourhood' with quirks.
+        compresslevel (int): Deflate level, 1 keeps writing fast at large scales.
+    """
+    rng = np.random.default_rng(seed)
+    options = pa_csv.WriteOptions(include_header=False, delimiter='|', quoting_style='none')
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as z:
+        with z.open(MEMBER, 'w', force_zip64=True) as member:
+
+            member.write((HEADER + '\n').encode())
+
+            for start in range(0, rows, block):
+
+                columns = generate_block(rng, start, min(block, rows - start), rows, days, quirks, missing_rate)
+
+                # Timestamps in the original format, e.g. 2016-04-29T18:38:08Z
+                for column in ('Scheduled Day', 'Appointment Day'):
+                    columns[column] = pc.strftime(pa.array(columns[column]), format='%Y-%m-%dT%H:%M:%SZ')
+
+                sink = pa.BufferOutputStream()
+                pa_csv.write_csv(pa.table(columns), sink, write_options=options)
+                member.write(sink.getvalue())
+
+# Function for cleaned-schema appointments spread over a number of days, in arrival order
+def make_appointments(rows, days, patients, seed=0):
+
+    rng = np.random.default_rng(seed)
+    appointment_day = pd.Timestamp('2016-01-04', tz='UTC') + pd.to_timedelta(np.sort(rng.integers(0, days, rows)), 'D')
+    scheduled_day = appointment_day - pd.to_timedelta(rng.integers(0, 30 * 86400, rows), 's')
+
+    return pd.DataFrame({'patient_id': rng.integers(0, patients, rows) * 7919 + 10**10,
+                         'appointment_id': np.arange(rows) + 5_000_000,
+                         'scheduled_day': scheduled_day,
+                         'appointment_day': appointment_day,
+                         'no_show': rng.choice(np.array(['no', 'yes'], dtype=object), rows, p=[0.8, 0.2])})
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--output', default=str(project_root / 'data' / 'synthetic' / 'patients.zip'))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-quirks', action='store_true')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    write_synthetic_zip(args.output, args.rows, seed=args.seed, quirks=not args.no_quirks)
+    print(f"> {args.rows} rows written to {args.output} ({Path(args.output).stat().st_size / 2**20:.1f} MB) "
+          f"in {time.perf_counter() - start:.1f} s")
+
+if __name__ == '__main__':
+    main()
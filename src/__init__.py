@@ -2,46 +2,87 @@
 
 # Smart __init__.py used for importing easily from the package.
 
-try:
-    
-    from .data_loader import (load_dataset_from_zip, 
-                              load_dataset_from_csv, 
-                              load_dataset_from_excel, 
-                              load_dataset_from_list, 
-                              load_dataset_from_dict)
-    
-    from .data_cleaning import (check_existing_missing_values,
-                                replace_missing_values,
-                                normalize_df_string_format,
-                                normalize_headers_string_format,
-                                detect_implicit_duplicates,
-                                replace_string_values_datetime,
-                                find_errors_to_numeric,
-                                convert_ndtype_to_numeric,
-                                convert_integer_to_boolean,
-                                standardize_gender_values)
-    
-    from .eda import (missing_values_heatmap,
-                      plot_boxplots,
-                      plot_histogram,
-                      plot_hue_histogram,
-                      plot_dual_histogram,
-                      plot_frequency_density,
-                      plot_grouped_barplot,
-                      plot_horizontal_bar)
-    
-    from .utils import(format_notebook)
-                      
+# The names are loaded lazily: a submodule, and its dependencies (seaborn and matplotlib for eda,
+# scikit-learn for modeling), is only imported the first time one of its names is used, so a
+# cleaning job does not pay for the plotting and modeling imports. Import errors are raised as is.
 
-except ImportError as e:
-    raise ImportError("One or more modules could not be found."
-                      "Ensure required scripts exist in the same directory as '__init__.py'.") from e
+import importlib
+
+_LAZY_IMPORTS = {
+    'data_loader': ['load_dataset_from_zip',
+                    'iter_dataset_from_zip',
+                    'load_dataset_from_csv',
+                    'load_dataset_from_excel',
+                    'load_dataset_from_list',
+                    'load_dataset_from_dict',
+                    'clear_dataset_cache',
+                    'get_dataset_cache_stats',
+                    'load_datasets_from_sources'],
+    'data_cleaning': ['check_existing_missing_values',
+                      'replace_missing_values',
+                      'normalize_df_string_format',
+                      'normalize_headers_string_format',
+                      'detect_implicit_duplicates',
+                      'replace_string_values_datetime',
+                      'find_errors_to_numeric',
+                      'convert_ndtype_to_numeric',
+                      'convert_integer_to_boolean',
+                      'standardize_gender_values',
+                      'compact_dtypes',
+                      'clear_datetime_cache'],
+    'cleaning_pipeline': ['CleaningPipeline'],
+    'data_quality': ['DataQualityProfile',
+                     'profile_data_quality'],
+    'sketches': ['QuantileSketch',
+                 'build_quantile_sketches',
+                 'find_outliers'],
+    'cube': ['AttendanceCube',
+             'build_attendance_cube'],
+    'duplicates': ['DuplicateIndex',
+                   'build_duplicate_index'],
+    'hypothesis_tests': ['build_contingency_tables',
+                         'run_hypothesis_tests'],
+    'validation': ['ValidationRules',
+                   'validate_dataset'],
+    'eda': ['summarize_distribution',
+            'missing_values_heatmap',
+            'plot_boxplots',
+            'plot_histogram',
+            'plot_hue_histogram',
+            'plot_dual_histogram',
+            'plot_frequency_density',
+            'plot_grouped_barplot',
+            'plot_horizontal_bar',
+            'render_figures'],
+    'features': ['compute_no_show_features',
+                 'build_feature_matrix',
+                 'compute_booking_features',
+                 'build_neighbourhood_no_show_rates',
+                 'build_patient_feature_state',
+                 'update_patient_feature_state',
+                 'save_patient_feature_state',
+                 'load_patient_feature_state'],
+    'modeling': ['cross_validate_no_show_models',
+                 'train_no_show_model'],
+    'scoring': ['NoShowScoringServer',
+                'serve_no_show_scores'],
+    'instrumentation': ['InstrumentationTrace',
+                        'instrument',
+                        'summarize_trace'],
+    'utils': ['format_notebook']
+}
+
+_NAME_MODULES = {name: module for module, names in _LAZY_IMPORTS.items() for name in names}
 
 __all__ = ['load_dataset_from_zip', 
+           'iter_dataset_from_zip',
            'load_dataset_from_csv', 
            'load_dataset_from_excel', 
            'load_dataset_from_list', 
            'load_dataset_from_dict',
+           'clear_dataset_cache',
+           'get_dataset_cache_stats',
+           'load_datasets_from_sources',
            
            'check_existing_missing_values',
            'replace_missing_values',
@@ -53,7 +94,30 @@ __all__ = ['load_dataset_from_zip',
            'convert_ndtype_to_numeric',
            'convert_integer_to_boolean',
            'standardize_gender_values',
+           'compact_dtypes',
+           'clear_datetime_cache',
+           
+           'CleaningPipeline',
+           'DataQualityProfile',
+           'profile_data_quality',
+           
+           'QuantileSketch',
+           'build_quantile_sketches',
+           'find_outliers',
+           
+           'AttendanceCube',
+           'build_attendance_cube',
            
+           'DuplicateIndex',
+           'build_duplicate_index',
+           
+           'build_contingency_tables',
+           'run_hypothesis_tests',
+           
+           'ValidationRules',
+           'validate_dataset',
+           
+           'summarize_distribution',
            'missing_values_heatmap',
            'plot_boxplots',
            'plot_histogram',
@@ -62,5 +126,43 @@ __all__ = ['load_dataset_from_zip',
            'plot_frequency_density',
            'plot_grouped_barplot',
            'plot_horizontal_bar',
+           'render_figures',
+           
+           'compute_no_show_features',
+           'build_feature_matrix',
+           'compute_booking_features',
+           'build_neighbourhood_no_show_rates',
+           'build_patient_feature_state',
+           'update_patient_feature_state',
+           'save_patient_feature_state',
+           'load_patient_feature_state',
+           
+           'cross_validate_no_show_models',
+           'train_no_show_model',
            
-           'format_notebook']
\ No newline at end of file
+           'NoShowScoringServer',
+           'serve_no_show_scores',
+           
+           'InstrumentationTrace',
+           'instrument',
+           'summarize_trace',
+           
+           'format_notebook']
+
+def __getattr__(name):
+
+    # Submodules, e.g. src.data_cleaning, and the names they export
+    if name in _LAZY_IMPORTS:
+        return importlib.import_module(f'.{name}', __name__)
+
+    if name not in _NAME_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f'.{_NAME_MODULES[name]}', __name__), name)
+    globals()[name] = value
+
+    return value
+
+def __dir__():
+
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,437 @@
+# cleaning_pipeline.py for planning and running the data_cleaning steps column by column
+
+import os
+import pickle
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from . import data_cleaning as dc
+from .instrumentation import column_timer, instrument
+
+# Steps that map every value independently on 'object' columns, consecutive ones are fused over the unique values
+_VALUE_MAP_STEPS = ('replace_missing_values', 'normalize_df_string_format', 'standardize_gender_values')
+
+_MISSING_TOKENS = frozenset(dc.MISSING_VALUES)
+
+# Buffers from this size on are copied once into shared memory instead of into the pickle
+_OUT_OF_BAND_BYTES = 1 << 20
+
+class CleaningPipeline:
+    """
+    Declarative version of the data_cleaning sequence used in 02-cleaning.
+
+    The step list is planned once per set of columns: every column gets the ordered steps that
+    touch it, consecutive value mapping steps (missing tokens, string normalization, gender
+    abbreviations) are fused into a single pass over the column's unique values, and each
+    column is read and assigned back only once. The output matches calling the functions one
+    after the other.
+
+    Args:
+        steps (list): Steps in execution order, each a data_cleaning function (or its name), or a
+            (function, kwargs) tuple with the same keyword arguments the function takes,
+            e.g. ('convert_ndtype_to_numeric', {'include': ['patient_id'], 'type': 'integer'}).
+        column_spec (dict, optional): Per column keyword overrides for a step,
+            e.g. {'appointment_day': {'replace_string_values_datetime': {'frmt': '%Y_%m_%d'}}}.
+        track_memory (bool): Also record the peak traced memory of every step (slower).
+
+    Example:
+        pipeline = CleaningPipeline([replace_missing_values,
+                                     normalize_df_string_format,
+                                     (standardize_gender_values, {'include': ['gender']})])
+        df = pipeline.run(df)
+        print(pipeline.report)
+    """
+
+    def __init__(self, steps, column_spec=None, track_memory=False):
+
+        self.steps = [self._resolve_step(step) for step in steps]
+        self.column_spec = column_spec or {}
+        self.track_memory = track_memory
+        self.report = None
+        self._plans = {}
+
+    @staticmethod
+    def _resolve_step(step):
+
+        func, kwargs = step if isinstance(step, tuple) else (step, {})
+        name = func if isinstance(func, str) else func.__name__
+
+        if name not in _STEP_KERNELS and name not in _VALUE_MAP_STEPS:
+            raise ValueError(f"*** Error ***   > '{name}' is not a supported cleaning step.")
+
+        return name, dict(kwargs)
+
+    # Function for listing, per column, the stages it goes through
+    def plan(self, df):
+
+        key = tuple(df.columns)
+        if key in self._plans:
+            return self._plans[key]
+
+        column_steps = {}
+
+        for position, (name, kwargs) in enumerate(self.steps):
+
+            exclude = kwargs.get('exclude') or []
+            include = kwargs.get('include')
+
+            if include is None:
+                available_columns = [col for col in df.columns if col not in exclude]
+            else:
+                available_columns = [col for col in include if col not in exclude]
+
+            for column in available_columns:
+
+                if column not in df.columns:
+                    raise KeyError(column)
+
+                step_kwargs = {k: v for k, v in kwargs.items() if k not in ('include', 'exclude')}
+                step_kwargs.update(self.column_spec.get(column, {}).get(name, {}))
+                column_steps.setdefault(column, []).append((name, step_kwargs))
+
+        plan = {column: _build_stages(steps) for column, steps in column_steps.items()}
+        self._plans[key] = plan
+
+        return plan
+
+    # Function for running the planned stages, each column is assigned back once
+    @instrument
+    def run(self, df):
+
+        plan = self.plan(df)
+
+        timings = {}
+        started_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+
+        try:
+
+            for column, stages in plan.items():
+
+                with column_timer(column):
+
+                    series = df[column]
+
+                    for label, stage in stages:
+
+                        if self.track_memory:
+                            tracemalloc.reset_peak()
+                            base_memory = tracemalloc.get_traced_memory()[0]
+
+                        start = time.perf_counter()
+                        series = stage(series)
+                        elapsed = time.perf_counter() - start
+
+                        entry = timings.setdefault(label, {'columns': 0, 'wall_time_s': 0.0, 'peak_memory_mb': 0.0})
+                        entry['columns'] += 1
+                        entry['wall_time_s'] += elapsed
+
+                        if self.track_memory:
+                            peak = (tracemalloc.get_traced_memory()[1] - base_memory) / 2**20
+                            entry['peak_memory_mb'] = max(entry['peak_memory_mb'], peak)
+
+                    df[column] = series
+
+        finally:
+
+            if started_tracing:
+                tracemalloc.stop()
+
+        report = pd.DataFrame.from_dict(timings, orient='index', columns=['columns', 'wall_time_s', 'peak_memory_mb'])
+        report.index.name = 'step'
+        if not self.track_memory:
+            report = report.drop(columns='peak_memory_mb')
+        self.report = report
+
+        return df
+
+    # Function for running the plan on row partitions in a process pool, the result is the one of run(df)
+    @instrument
+    def run_partitioned(self, df, n_jobs=None, partitions=None, partition_by=None):
+        """
+        Runs the pipeline on partitions of the rows in parallel worker processes.
+
+        The planned columns of every partition are pickled (protocol 5) into a shared memory
+        block, so only the block name goes through the pool: NumPy buffers are copied into it
+        once, and the workers send their cleaned partitions back the same way. The partitions are
+        reassembled in the original row order. Columns whose partitions end up with different
+        dtypes (e.g. integers downcast to int8 in one partition and int16 in another) get the
+        dtype of the serial run: integer and float widths are promoted, any other difference
+        (like categories from as_category) is recomputed serially for that column. The output
+        is identical to run(df).
+
+        Args:
+            df (pd.DataFrame): DataFrame modified in place.
+            n_jobs (int, optional): Worker processes, all cores by default; 1 runs serially.
+            partitions (int, optional): Number of partitions, n_jobs by default.
+            partition_by (str, optional): Column hashed to assign the partitions, e.g. 'patient_id'
+                to keep every patient in one partition. Contiguous row ranges by default.
+
+        Returns:
+            pd.DataFrame: df, cleaned.
+        """
+        n_jobs = n_jobs or os.cpu_count()
+        partitions = min(partitions or n_jobs, len(df))
+
+        if n_jobs == 1 or partitions <= 1:
+            return self.run(df)
+
+        plan = self.plan(df)
+        columns = list(plan)
+
+        # Rows of every partition: ranges, or the rows whose key hashes to it (kept in their original order)
+        if partition_by is None:
+            order = None
+            bounds = np.linspace(0, len(df), partitions + 1).astype(np.int64)
+        else:
+            keys = pd.util.hash_pandas_object(df[partition_by], index=False).to_numpy() % np.uint64(partitions)
+            order = np.argsort(keys, kind='stable')
+            bounds = np.searchsorted(keys[order], np.arange(partitions + 1))
+
+        selected = df[columns]
+        inputs, futures, consumed = [], [], set()
+        parts, reports = [], []
+
+        try:
+
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                # Positional index, the labels of df are put back when reassembling
+                rows = slice(start, stop) if order is None else order[start:stop]
+                inputs.append(_share_object(selected.iloc[rows].reset_index(drop=True)))
+            del selected
+
+            with ProcessPoolExecutor(max_workers=min(n_jobs, partitions)) as executor:
+                futures = [executor.submit(_run_shared_partition, shm.name, sizes, self.steps, self.column_spec)
+                           for shm, sizes in inputs]
+
+            for future in futures:
+                name, sizes, report = future.result()
+                # The block is unlinked by the load, even when it fails
+                consumed.add(name)
+                parts.append(_load_shared_object(name, sizes, unlink=True))
+                reports.append(report)
+
+        finally:
+
+            for shm, _ in inputs:
+                shm.close()
+                shm.unlink()
+
+            # Output blocks of the partitions that succeeded, left when another partition or a load failed
+            for future in futures:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    name = future.result()[0]
+                    if name not in consumed:
+                        _unlink_shared_object(name)
+
+        inverse = None
+        if order is not None:
+            inverse = np.empty_like(order)
+            inverse[order] = np.arange(len(order))
+
+        for column in columns:
+
+            pieces = [part[column] for part in parts]
+            dtypes = [piece.dtype for piece in pieces]
+
+            if len(set(dtypes)) > 1 and not _promotable(dtypes):
+                series = df[column]
+                for _, stage in plan[column]:
+                    series = stage(series)
+            else:
+                series = pd.concat(pieces, ignore_index=True)
+                if inverse is not None:
+                    series = series.iloc[inverse]
+                series = series.set_axis(df.index)
+
+            df[column] = series
+
+        # Seconds summed over the workers
+        self.report = pd.concat(reports).groupby(level=0, sort=False).agg({'columns': 'max', 'wall_time_s': 'sum'})
+
+        return df
+
+def _build_stages(steps):
+
+    stages = []
+    position = 0
+
+    while position < len(steps):
+
+        name, kwargs = steps[position]
+
+        if _is_value_map_step(name, kwargs):
+
+            group = [name]
+            position += 1
+            while position < len(steps) and _is_value_map_step(*steps[position]):
+                group.append(steps[position][0])
+                position += 1
+
+            stages.append(('+'.join(group), _fused_value_map_stage(group)))
+
+        else:
+
+            kernel = _STEP_KERNELS[name]
+            stages.append((name, lambda series, kernel=kernel, kwargs=kwargs: kernel(series, **kwargs)))
+            position += 1
+
+    return stages
+
+def _is_value_map_step(name, kwargs):
+
+    return name in _VALUE_MAP_STEPS and not kwargs.get('as_category', False)
+
+def _is_missing_scalar(value):
+
+    return value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and np.isnan(value))
+
+def _replace_missing_value(value):
+
+    return pd.NA if isinstance(value, str) and value in _MISSING_TOKENS else value
+
+def _normalize_value(value):
+
+    if isinstance(value, str):
+        return dc._normalize_string(value)
+
+    return value if _is_missing_scalar(value) else np.nan
+
+def _standardize_gender_value(value):
+
+    return dc.GENDER_VALUES.get(value, value) if isinstance(value, str) else value
+
+_VALUE_FUNCTIONS = {'replace_missing_values': _replace_missing_value,
+                    'normalize_df_string_format': _normalize_value,
+                    'standardize_gender_values': _standardize_gender_value}
+
+# The same steps as pyarrow.compute kernels, for Arrow string columns
+_ARROW_FUNCTIONS = {'replace_missing_values': dc._arrow_replace_missing,
+                    'normalize_df_string_format': dc._arrow_normalize_string,
+                    'standardize_gender_values': dc._arrow_standardize_gender}
+
+def _fused_value_map_stage(group):
+
+    functions = [_VALUE_FUNCTIONS[name] for name in group]
+    arrow_functions = [_ARROW_FUNCTIONS[name] for name in group]
+
+    def stage(series):
+
+        # Every fused step only acts on text columns and keeps their dtype
+        if dc._is_arrow_string_dtype(series.dtype):
+            return dc._map_arrow_strings(series, arrow_functions)
+
+        if not dc._is_text_dtype(series.dtype):
+            return series
+
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        mapped = np.empty(len(uniques), dtype=object)
+
+        for position, value in enumerate(uniques):
+            for function in functions:
+                value = function(value)
+            mapped[position] = value
+
+        values = mapped.take(codes) if len(mapped) else np.empty(len(codes), dtype=object)
+
+        # Missing values go through every step unchanged
+        missing = codes == -1
+        if missing.any():
+            values[missing] = series.to_numpy(dtype=object)[missing]
+
+        values = pd.Series(values, index=series.index, name=series.name, dtype=object)
+
+        return values if series.dtype == 'object' else values.astype(series.dtype)
+
+    return stage
+
+def _normalize_stage(series, as_category=False):
+
+    if not dc._is_text_dtype(series.dtype):
+        return series
+
+    return dc._normalize_series_string_format(series, as_category=as_category)
+
+_STEP_KERNELS = {'normalize_df_string_format': _normalize_stage,
+                 'convert_integer_to_boolean': dc._convert_integer_series_to_boolean,
+                 'convert_ndtype_to_numeric': dc._convert_series_to_numeric,
+                 'replace_string_values_datetime': dc._replace_series_datetime}
+
+# Function for pickling an object into a new shared memory block: (block, sizes of the pickle and of each out-of-band buffer)
+def _share_object(value):
+
+    # Only large buffers go out-of-band: small ones, like the block placements that copy() shares, stay in the pickle
+    buffers = []
+
+    def in_band(buffer):
+        if buffer.raw().nbytes < _OUT_OF_BAND_BYTES:
+            return True
+        buffers.append(buffer)
+        return False
+
+    data = pickle.dumps(value, protocol=5, buffer_callback=in_band)
+    chunks = [memoryview(data), *(buffer.raw() for buffer in buffers)]
+    sizes = [chunk.nbytes for chunk in chunks]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(sum(sizes), 1))
+    offset = 0
+    for chunk, size in zip(chunks, sizes):
+        shm.buf[offset:offset + size] = chunk
+        offset += size
+
+    return shm, sizes
+
+# Function for unpickling an object from a shared memory block, copied out of it so the block can be released
+def _load_shared_object(name, sizes, unlink=False):
+
+    shm = shared_memory.SharedMemory(name=name)
+
+    try:
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        views = [shm.buf[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+        shared = pickle.loads(views[0], buffers=views[1:])
+        value = shared.copy(deep=True)
+
+        # Nothing may point into the block when it is closed
+        del shared
+        for view in views:
+            view.release()
+    finally:
+        shm.close()
+        if unlink:
+            shm.unlink()
+
+    return value
+
+def _unlink_shared_object(name):
+
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+
+    shm.close()
+    shm.unlink()
+
+def _run_shared_partition(name, sizes, steps, column_spec):
+
+    pipeline = CleaningPipeline(steps, column_spec=column_spec)
+    df = pipeline.run(_load_shared_object(name, sizes))
+
+    shm, sizes = _share_object(df)
+    shm.close()
+
+    return shm.name, sizes, pipeline.report
+
+def _promotable(dtypes):
+
+    # Integer (or float) results of different widths, e.g. downcast per partition
+    kinds = {dtype.kind if isinstance(dtype, np.dtype) else None for dtype in dtypes}
+
+    return kinds <= {'i'} or kinds <= {'u'} or kinds <= {'f'}
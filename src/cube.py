@@ -0,0 +1,219 @@
+# cube.py for counting appointments once over the low cardinality columns and answering breakdowns from the counts
+
+import numpy as np
+import pandas as pd
+
+# Columns of the cleaned patients frame counted by default, appointment_weekday is derived from appointment_day
+ATTENDANCE_DIMENSIONS = ['gender', 'age', 'neighbourhood', 'scholarship', 'hipertension', 'diabetes', 'alcoholism',
+                         'handcap', 'sms_received', 'appointment_weekday', 'no_show']
+
+# Largest dense bincount of a rollup, past it the cells are grouped with np.unique
+_MAX_DENSE_CELLS = 50_000_000
+
+class AttendanceCube:
+    """
+    Appointment counts per combination of dimension values, stored as sparse cells.
+
+    Every non empty combination is one cell: a row of level positions (one per dimension)
+    and its count. Slices filter the cells and rollups add them up with np.bincount over
+    the kept dimensions, so a breakdown costs a pass over the cells (at most the number of
+    distinct combinations) instead of a scan of the appointments. Results of counts() are
+    memoized per cube.
+
+    Use build_attendance_cube to build it from a DataFrame.
+
+    Example:
+        cube = build_attendance_cube(df_patients_clean)
+        cube.counts(['no_show', 'age'], age=range(0, 18))
+        plot_horizontal_bar(cube.slice(gender='female').rollup(['no_show']), colors=['darkred', 'red'])
+    """
+
+    def __init__(self, dimensions, levels, cells, counts):
+
+        self.dimensions = list(dimensions)
+        self.levels = dict(levels)
+        self.cells = cells
+        self.cell_counts = counts
+        self._cache = {}
+
+    @property
+    def total(self):
+
+        return int(self.cell_counts.sum())
+
+    # Function for the cube restricted to the filters, e.g. slice(gender='female', age=range(0, 18))
+    def slice(self, where=None, **filters):
+
+        mask = self._mask({**(where or {}), **filters})
+
+        return AttendanceCube(self.dimensions, self.levels, self.cells[mask], self.cell_counts[mask])
+
+    # Function for the cube over fewer dimensions, the other ones summed up
+    def rollup(self, dimensions):
+
+        dimensions = [dimensions] if isinstance(dimensions, str) else list(dimensions)
+        positions = [self._position(dimension) for dimension in dimensions]
+        cells, counts = _group_cells(self.cells[:, positions], self.cell_counts,
+                                     [len(self.levels[dimension]) for dimension in dimensions])
+
+        return AttendanceCube(dimensions, {dimension: self.levels[dimension] for dimension in dimensions}, cells, counts)
+
+    # Function for the counts of a breakdown, like df[filters].groupby(dimensions).size()
+    def counts(self, dimensions=None, where=None, **filters):
+        """
+        Counts appointments per combination of the given dimensions, after the filters.
+
+        Args:
+            dimensions (str or list, optional): Dimensions of the breakdown, every dimension by default.
+            where (dict, optional): Filters by dimension name, also accepted as keyword arguments.
+                A filter is a value, a list-like of values or a callable on the values, e.g.
+                {'gender': 'female', 'age': lambda age: age >= 18}.
+
+        Returns:
+            pd.Series: Non zero counts named 'count', indexed by the dimension values in sorted
+                order (a MultiIndex for several dimensions), missing values left out like groupby.
+        """
+        dimensions = self.dimensions if dimensions is None else ([dimensions] if isinstance(dimensions, str) else list(dimensions))
+        filters = {**(where or {}), **filters}
+
+        # Callables cannot be compared, their breakdowns are not memoized
+        key = None
+        if not any(callable(value) for value in filters.values()):
+            key = (tuple(dimensions), tuple(sorted((name, _filter_key(value)) for name, value in filters.items())))
+            if key in self._cache:
+                return self._cache[key].copy()
+
+        cube = self.slice(filters) if filters else self
+        rolled = cube.rollup(dimensions)
+
+        # Missing values have their own level, dropped from the output
+        keep = np.ones(len(rolled.cell_counts), dtype=bool)
+        arrays = []
+        for position, dimension in enumerate(dimensions):
+            labels = rolled.levels[dimension]
+            codes = rolled.cells[:, position]
+            keep &= ~labels.isna()[codes]
+            arrays.append(labels[codes])
+
+        arrays = [array[keep] for array in arrays]
+        index = pd.MultiIndex.from_arrays(arrays, names=dimensions) if len(dimensions) > 1 else pd.Index(arrays[0], name=dimensions[0])
+        result = pd.Series(rolled.cell_counts[keep], index=index, name='count')
+
+        if key is not None:
+            self._cache[key] = result
+
+        return result.copy()
+
+    def _position(self, dimension):
+
+        if dimension not in self.levels:
+            raise KeyError(f"*** Error ***   > '{dimension}' is not a dimension of the cube: {self.dimensions}")
+
+        return self.dimensions.index(dimension)
+
+    def _mask(self, filters):
+
+        mask = np.ones(len(self.cell_counts), dtype=bool)
+
+        for dimension, value in filters.items():
+
+            labels = self.levels[dimension]
+            if callable(value):
+                allowed = np.asarray(labels.map(lambda label: bool(value(label)) if not pd.isna(label) else False), dtype=bool)
+            elif pd.api.types.is_list_like(value):
+                allowed = labels.isin(list(value))
+            else:
+                allowed = labels.isin([value])
+
+            mask &= allowed[self.cells[:, self._position(dimension)]]
+
+        return mask
+
+# Function for counting the appointments of a DataFrame over the low cardinality dimensions, in one pass
+def build_attendance_cube(df, dimensions=None):
+    """
+    Builds an AttendanceCube: one np.unique pass over the mixed radix codes of every row.
+
+    Args:
+        df (pd.DataFrame): Cleaned patients data.
+        dimensions (list, optional): Columns to count by, the ATTENDANCE_DIMENSIONS present in df by default.
+            'appointment_weekday' (Monday is 0) is derived from 'appointment_day' when df has no such column.
+
+    Returns:
+        AttendanceCube: Counts of every non empty combination.
+    """
+    available = [*df.columns, *(['appointment_weekday'] if 'appointment_day' in df.columns else [])]
+
+    if dimensions is None:
+        dimensions = [dimension for dimension in ATTENDANCE_DIMENSIONS if dimension in available]
+
+    missing = [dimension for dimension in dimensions if dimension not in available]
+    if missing:
+        raise KeyError(f"*** Error ***   > Missing columns for the cube: {missing}")
+
+    levels = {}
+    codes = np.zeros(len(df), dtype=np.int64)
+    radix = 1
+
+    for dimension in dimensions:
+
+        # Sorted levels, missing values get the last one
+        column_codes, labels = pd.factorize(_dimension_column(df, dimension), sort=True)
+        if (column_codes < 0).any():
+            column_codes = np.where(column_codes < 0, len(labels), column_codes)
+            labels = labels.append(pd.Index([np.nan]))
+
+        levels[dimension] = labels
+        codes = codes * max(len(labels), 1) + column_codes
+        radix *= max(len(labels), 1)
+
+        if radix > 2**62:
+            raise ValueError("*** Error ***   > Too many combinations for the cube, use fewer dimensions.")
+
+    unique_codes, counts = np.unique(codes, return_counts=True)
+
+    return AttendanceCube(dimensions, levels, _decode(unique_codes, [len(levels[dimension]) for dimension in dimensions]), counts)
+
+def _dimension_column(df, dimension):
+
+    if dimension in df.columns:
+        return df[dimension]
+
+    return pd.to_datetime(df['appointment_day']).dt.weekday.rename('appointment_weekday')
+
+def _decode(codes, sizes):
+
+    # Mixed radix codes back to one column of level positions per dimension, the first dimension most significant
+    cells = np.empty((len(codes), len(sizes)), dtype=np.int32)
+
+    for position in range(len(sizes) - 1, -1, -1):
+        size = max(sizes[position], 1)
+        cells[:, position] = codes % size
+        codes = codes // size
+
+    return cells
+
+def _group_cells(cells, counts, sizes):
+
+    codes = np.zeros(len(counts), dtype=np.int64)
+    for position, size in enumerate(sizes):
+        codes = codes * max(size, 1) + cells[:, position]
+
+    total = int(np.prod([max(size, 1) for size in sizes], dtype=np.float64))
+
+    if total <= _MAX_DENSE_CELLS:
+        sums = np.bincount(codes, weights=counts, minlength=total)
+        unique_codes = np.flatnonzero(sums)
+        grouped = sums[unique_codes]
+    else:
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+        grouped = np.bincount(inverse.ravel(), weights=counts)
+
+    return _decode(unique_codes, sizes), grouped.astype(np.int64)
+
+def _filter_key(value):
+
+    if pd.api.types.is_list_like(value):
+        return tuple(value)
+
+    return value
@@ -1,39 +1,120 @@
 # data_cleaning.py for dataset cleaning
 
 import numpy as np
+import os
 import pandas as pd
 import re
-from tqdm import tqdm
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pandas.tseries.api import guess_datetime_format
 
-def check_existing_missing_values(df, df_name="DataFrame"):
+from .instrumentation import column_timer, instrument
+
+# Tokens treated as missing values in text columns
+MISSING_VALUES = ['', ' ', 'N/A', 'none', 'None', 'null', 'NULL', 'NaN', 'nan', 'NAN', 'nat', 'NaT']
+
+# Text columns are 'object' or a pandas string dtype. The Arrow backed ones ('string[pyarrow]', and pd.ArrowDtype
+# strings from dtype_backend='pyarrow') are cleaned with pyarrow.compute kernels, their values never become Python objects
+def _is_text_dtype(dtype):
+    
+    return dtype == 'object' or isinstance(dtype, pd.StringDtype) or _is_arrow_string_dtype(dtype)
+
+def _is_arrow_string_dtype(dtype):
+    
+    if isinstance(dtype, pd.StringDtype):
+        
+        return dtype.storage != 'python'
+    
+    if isinstance(dtype, pd.ArrowDtype):
+        
+        import pyarrow as pa
+        
+        return pa.types.is_string(dtype.pyarrow_dtype) or pa.types.is_large_string(dtype.pyarrow_dtype)
+    
+    return False
+
+# Function for mapping an Arrow string column through pyarrow.compute kernels, applied to its unique values
+# when they repeat (mostly distinct values, like booking times, are mapped directly)
+def _map_arrow_strings(series, functions):
+    
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    
+    values = pa.array(series.array)
+    uniques = pc.unique(values)
+    repeated = 2 * len(uniques) <= len(values)
+    mapped = uniques if repeated else values
+    
+    for function in functions:
+        
+        mapped = function(mapped)
+    
+    # Nulls are one of the uniques and every kernel keeps them null
+    mapped = mapped.cast(values.type)
+    result = pc.take(mapped, pc.index_in(values, value_set=uniques)) if repeated else mapped
+    
+    return pd.Series(type(series.array)(result), index=series.index, name=series.name)
+
+def _arrow_replace_missing(values):
     
-    missing_values = ['', ' ', 'N/A', 'none', 'None', 'null', 'NULL', 'NaN', 'nan', 'NAN', 'nat', 'NaT']
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    
+    return pc.if_else(pc.is_in(values, value_set=pa.array(MISSING_VALUES, type=values.type)), pa.scalar(None, values.type), values)
+
+# Python's [\W_]+ for RE2, where \W is ASCII only: anything but Unicode letters and numbers
+_ARROW_NON_WORD_RUN = r'[^\p{L}\p{N}]+'
+
+def _arrow_normalize_string(values):
+    
+    import pyarrow.compute as pc
+    
+    return pc.utf8_lower(pc.replace_substring_regex(values, _ARROW_NON_WORD_RUN, '_'))
+
+def _arrow_standardize_gender(values):
+    
+    import pyarrow.compute as pc
+    
+    for abbreviation, gender in GENDER_VALUES.items():
+        
+        values = pc.if_else(pc.equal(values, abbreviation), gender, values)
+    
+    return values
+
+@instrument
+def check_existing_missing_values(df, df_name="DataFrame"):
     
     print(f"> Dataframe: {df_name}\n")
     
+    missing_tokens = {}
+    
     for column in df.columns:
         
-        if df[column].dtype != 'object':
+        if not _is_text_dtype(df[column].dtype):
             
             continue
         
         else:
             
-            if df[column].isin(missing_values).any():
+            # One isin pass per column, counted once instead of tested with any() and then counted again
+            missing_tokens[column] = int(df[column].isin(MISSING_VALUES).sum())
+            
+            if missing_tokens[column]:
                                 
-                print(f"*** Warning ***   > Mising values in '{column}': {df[column].isin(missing_values).sum()}")
+                print(f"*** Warning ***   > Mising values in '{column}': {missing_tokens[column]}")
             
             else:
                 
                 print(f"*** Warning ***   > No missing values in '{column}' found")
                 
     print()
+    
+    return pd.Series(missing_tokens, name='missing_tokens', dtype='int64')
 
 # Function used for assigning pd.NA to missing values
+@instrument
 def replace_missing_values(df, include=None, exclude=None):
     
-    missing_values = ['', ' ', 'N/A', 'none', 'None', 'null', 'NULL', 'NaN', 'nan', 'NAN', 'nat', 'NaT']
-    
     if exclude is None:
         exclude = []
     
@@ -44,20 +125,33 @@ def replace_missing_values(df, include=None, exclude=None):
  
     for column in available_columns:
         
-        if df[column].dtype != 'object':
+        if not _is_text_dtype(df[column].dtype):
             
             continue
         
         else:
             
-            if df[column].isin(missing_values).any():
-                
-                df[column] = df[column].replace(missing_values, pd.NA)
+            with column_timer(column):
+                df[column] = _replace_missing_series(df[column])
 
     return df
 
+def _replace_missing_series(series):
+    
+    if _is_arrow_string_dtype(series.dtype):
+        
+        return _map_arrow_strings(series, [_arrow_replace_missing])
+    
+    if _is_text_dtype(series.dtype) and series.isin(MISSING_VALUES).any():
+        
+        return series.replace(MISSING_VALUES, pd.NA)
+    
+    return series
+
 # Function dataframe for format normalizing type 'object' (strings)
-def normalize_df_string_format(df, include=None, exclude=None):
+# Each column is factorized and only its unique values are normalized, then mapped back through the codes
+@instrument
+def normalize_df_string_format(df, include=None, exclude=None, as_category=False):
         
     if exclude is None:
         exclude = []
@@ -69,39 +163,79 @@ def normalize_df_string_format(df, include=None, exclude=None):
     
     for column in available_columns:
         
-       if df[column].dtype != 'object':
+       if not _is_text_dtype(df[column].dtype):
            
            continue
        
        else:
                       
-           df[column] = df[column].str.replace(r'[^\w\s]', ' ', regex=True)
-           df[column] = df[column].str.replace(r'\s+', '_', regex=True)
-           df[column] = df[column].str.replace(r'__+', '_', regex=True)
-           df[column] = df[column].str.lower()
-           df[column] = df[column].str.strip()
+           with column_timer(column):
+               df[column] = _normalize_series_string_format(df[column], as_category=as_category)
     
     return df
 
 # Function for format normalizing type 'object' (strings)
+@instrument
 def normalize_headers_string_format(df_header: list):
     
     header = []
     
     for title in df_header:
                
-           title = re.sub(r'[^\w\s]', ' ', title)
-           title = re.sub(r'\s+', '_', title)
-           title = re.sub(r'__+', '_', title)
-           title = title.lower()
-           title = title.strip()
-           
-           header.append(title)
+           header.append(_normalize_string(title))
     
     return header
 
-# Function for implicit duplicates
-def detect_implicit_duplicates(df, include=None, exclude=None):
+# Punctuation and whitespace become spaces, spaces become '_' and repeated '_' collapse: one fused substitution
+_NON_WORD_RUN = re.compile(r'[\W_]+')
+
+def _normalize_string(value):
+    
+    return _NON_WORD_RUN.sub('_', value).lower().strip()
+
+def _normalize_series_string_format(series, as_category=False):
+    
+    if _is_arrow_string_dtype(series.dtype):
+        
+        normalized = _map_arrow_strings(series, [_arrow_normalize_string])
+        
+        if as_category:
+            
+            # Categories in order of appearance, like the 'object' path
+            codes, categories = pd.factorize(normalized, use_na_sentinel=True)
+            
+            return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=series.index, name=series.name)
+        
+        return normalized
+    
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    # Like the .str accessor, values that are not strings become NaN
+    normalized = np.array([_normalize_string(value) if isinstance(value, str) else np.nan for value in uniques], dtype=object)
+    
+    if as_category:
+        
+        category_codes, categories = pd.factorize(normalized, use_na_sentinel=True)
+        category_codes = np.append(category_codes, -1)
+        
+        return pd.Series(pd.Categorical.from_codes(category_codes[codes], categories=categories),
+                         index=series.index, name=series.name)
+    
+    values = normalized.take(codes) if len(normalized) else np.empty(len(codes), dtype=object)
+    
+    # Missing values are kept as they were (None, NaN, pd.NA...)
+    missing = codes == -1
+    if missing.any():
+        values[missing] = series.to_numpy(dtype=object)[missing]
+    
+    values = pd.Series(values, index=series.index, name=series.name, dtype=object)
+    
+    # 'string[python]' columns stay strings
+    return values if series.dtype == 'object' else values.astype(series.dtype)
+
+# Function for implicit duplicates: single-word values contained (case insensitive) in other values of the column
+# Works on the deduplicated values with their row counts, matching all bases at once with an Aho-Corasick index
+@instrument
+def detect_implicit_duplicates(df, include=None, exclude=None, search_all_values=False, n_jobs=1, verbose=True):
     
     if exclude is None:
         exclude = []
@@ -111,39 +245,118 @@ def detect_implicit_duplicates(df, include=None, exclude=None):
     else:
         available_columns = [col for col in include if col not in exclude]
     
+    tasks = []
+    
     for column in available_columns:
         
-        if column in exclude:
-            
-            continue  
-        
-        if df[column].dtype != 'object':
+        if not _is_text_dtype(df[column].dtype):
             
             continue
         
-        # 1. Keep values that are single word with no separators with special chars
-        column_values = df[column]
-        column_values = column_values[column_values != '']
-        column_values = column_values[column_values.apply(lambda x: len(re.split(r"[ \-\_']", x)) == 1)]
-
-        # 2. Get base unique values
-        base_unique_values = column_values.unique().tolist()
-        if not base_unique_values:
+        value_counts = df[column].value_counts(sort=False)
+        value_counts = value_counts[[isinstance(value, str) for value in value_counts.index]]
+        tasks.append((column, value_counts, search_all_values))
+    
+    if n_jobs != 1 and len(tasks) > 1:
+        
+        max_workers = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+            results = list(executor.map(_find_implicit_duplicates, *zip(*tasks)))
+    
+    else:
+        
+        results = [_find_implicit_duplicates(*task) for task in tasks]
+    
+    columns = ['column', 'base', 'base_count', 'match', 'match_count']
+    results = [result for result in results if not result.empty]
+    duplicates = pd.concat(results, ignore_index=True) if results else pd.DataFrame(columns=columns)
+    
+    if verbose:
+        
+        for column, column_duplicates in duplicates.groupby('column', sort=False):
             
-            continue
-
-        print(f"> Column: '{column}'")
+            print(f"> Column: '{column}'")
+            
+            for base, matches in column_duplicates.groupby('base', sort=False):
+                
+                print(f"  '{base}' ({matches['base_count'].iloc[0]} rows) → {dict(zip(matches['match'], matches['match_count']))}")
+    
+    return duplicates
 
-        # 3. Compare base unique values against all Column's values
-        for base in tqdm(base_unique_values, desc=f" Searching implicit values for: '{column}'"):
-            pattern = re.compile(re.escape(base), re.IGNORECASE)
+def _find_implicit_duplicates(column, value_counts, search_all_values=False):
+    
+    values = value_counts.index.to_series(index=value_counts.index)
+    values = values[values != '']
+    
+    # 1. Base values are single words with no separators
+    single_word = ~values.str.contains(r"[ \-\_']", regex=True)
+    bases = values[single_word].tolist()
+    candidates = values.tolist() if search_all_values else bases
+    
+    columns = ['column', 'base', 'base_count', 'match', 'match_count']
+    if not bases:
+        return pd.DataFrame(columns=columns)
+    
+    # 2. Search every base inside every candidate value in one scan per candidate
+    automaton = _build_aho_corasick([base.lower() for base in bases])
+    
+    rows = []
+    for candidate in candidates:
+        for base_position in _search_aho_corasick(automaton, candidate.lower()):
+            base = bases[base_position]
+            if candidate != base:
+                rows.append((column, base, value_counts[base], candidate, value_counts[candidate]))
+    
+    duplicates = pd.DataFrame(rows, columns=columns)
+    
+    return duplicates.sort_values(['base_count', 'base', 'match_count'], ascending=[False, True, False], ignore_index=True)
 
-            matches = [val for val in column_values if val != base and pattern.search(val)]
+def _build_aho_corasick(patterns):
+    
+    transitions = [{}]
+    outputs = [[]]
+    
+    for position, pattern in enumerate(patterns):
+        state = 0
+        for char in pattern:
+            if char not in transitions[state]:
+                transitions.append({})
+                outputs.append([])
+                transitions[state][char] = len(transitions) - 1
+            state = transitions[state][char]
+        outputs[state].append(position)
+    
+    # Failure links in breadth-first order, inheriting the outputs of the suffix state
+    failure = [0] * len(transitions)
+    queue = deque(transitions[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, next_state in transitions[state].items():
+            queue.append(next_state)
+            fallback = failure[state]
+            while fallback and char not in transitions[fallback]:
+                fallback = failure[fallback]
+            failure[next_state] = transitions[fallback].get(char, 0)
+            outputs[next_state] = outputs[next_state] + outputs[failure[next_state]]
+    
+    return transitions, failure, outputs
 
-            if matches:
-                print(f"  '{base}' → {matches}")
+def _search_aho_corasick(automaton, text):
+    
+    transitions, failure, outputs = automaton
+    
+    found = set()
+    state = 0
+    for char in text:
+        while state and char not in transitions[state]:
+            state = failure[state]
+        state = transitions[state].get(char, 0)
+        found.update(outputs[state])
+    
+    return found
 
 # Function for replacing string date values to datetime values
+@instrument
 def replace_string_values_datetime(df, include=None, exclude=None, frmt=None, time_zone='UTC'):
     
     if exclude is None:
@@ -156,28 +369,209 @@ def replace_string_values_datetime(df, include=None, exclude=None, frmt=None, ti
     
     for column in available_columns:
         
-        if df[column].dtype != 'object':
+        if not _is_text_dtype(df[column].dtype):
             
             continue
         
         else:
             
-            df[column] = pd.to_datetime(df[column], format=frmt, errors='coerce')
+            with column_timer(column):
+                df[column] = _replace_series_datetime(df[column], frmt=frmt, time_zone=time_zone)
+    
+    return df
+
+# Parsed timestamps per (format, string) shared by every call, least recently used entries are evicted first
+_DATETIME_CACHE = OrderedDict()
+DATETIME_CACHE_MAX_SIZE = 200_000
+
+# Function for emptying the parsed timestamps cache
+@instrument
+def clear_datetime_cache():
+    
+    _DATETIME_CACHE.clear()
+
+# Each distinct string is parsed once (or read from the cache), localized once and broadcast back through the codes
+def _replace_series_datetime(series, frmt=None, time_zone='UTC'):
+    
+    if _is_arrow_string_dtype(series.dtype):
+        
+        return _replace_arrow_series_datetime(series, frmt, time_zone)
+    
+    if not _is_text_dtype(series.dtype):
+        
+        return series
+    
+    # Mostly distinct values (estimated on a sample) gain nothing from deduplication
+    sample = series.iloc[::max(1, len(series) // 10_000)].dropna()
+    
+    if len(sample) >= 1_000 and sample.nunique() > 0.95 * len(sample):
+        
+        return _replace_series_datetime_rowwise(series, frmt, time_zone)
+    
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    
+    if pd.api.types.infer_dtype(uniques, skipna=False) not in ('string', 'empty'):
+        
+        return _replace_series_datetime_rowwise(series, frmt, time_zone)
+    
+    frmt = _resolve_datetime_format(uniques, frmt)
+    
+    parsed = _parse_unique_datetimes(uniques, frmt)
+    
+    if parsed is None:
+        
+        return _replace_series_datetime_rowwise(series, frmt, time_zone)
+    
+    parsed = parsed.tz_convert(time_zone) if parsed.tz is not None else parsed.tz_localize(time_zone)
+    
+    return pd.Series(parsed.take(codes, allow_fill=True, fill_value=pd.NaT), index=series.index, name=series.name)
+
+def _replace_series_datetime_rowwise(series, frmt, time_zone):
+    
+    series = pd.to_datetime(series, format=frmt, errors='coerce')
+    
+    try:
+        
+        return series.dt.tz_localize(time_zone)
+    
+    except TypeError:
+        
+        return series.dt.tz_convert(time_zone)
+
+# Arrow strings are parsed by pyarrow's strptime, which is case sensitive: values like the normalized
+# '2016_04_29t18_38_08z' are parsed again upper case, and whatever it cannot parse goes the 'object' way
+def _replace_arrow_series_datetime(series, frmt, time_zone):
+    
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    
+    values = pa.array(series.array)
+    sample = pc.drop_null(values).slice(0, 100).to_pylist()
+    frmt = _resolve_datetime_format(np.array(sample, dtype=object), frmt)
+    parsed = None
+    
+    # Repeated values (appointment days) are parsed once, mostly distinct ones (booking times) directly
+    uniques = pc.unique(values)
+    positions = None
+    if 2 * len(uniques) <= len(values):
+        positions = pc.index_in(values, value_set=uniques)
+        values = uniques
+    
+    if frmt is not None and '%z' not in frmt and '%Z' not in frmt:
+        
+        upper_format = re.sub(r'(%.)|([^%]+)', lambda match: match.group(1) or match.group(2).upper(), frmt)
+        
+        for upper in (False, True):
             
             try:
                 
-                df[column] = df[column].dt.tz_localize(time_zone)
+                parsed = pc.strptime(pc.utf8_upper(values) if upper else values, format=upper_format if upper else frmt,
+                                     unit='ns', error_is_null=True)
+            
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                
+                parsed = None
+                break
             
-            except TypeError:
+            if parsed.null_count == values.null_count:
                 
-                df[column] = df[column].dt.tz_convert(time_zone)
+                break
+            
+            parsed = None
     
-    return df
+    if parsed is None:
+        
+        return _replace_series_datetime(series.astype(object), frmt, time_zone)
+    
+    if positions is not None:
+        
+        parsed = pc.take(parsed, positions)
+    
+    # Same dtype as from an 'object' column
+    parsed = pd.DatetimeIndex(parsed.to_numpy(zero_copy_only=False)).tz_localize(time_zone)
+    
+    return pd.Series(parsed, index=series.index, name=series.name)
+
+def _resolve_datetime_format(uniques, frmt, sample_size=100):
+    
+    if not len(uniques):
+        
+        return frmt
+    
+    # Like pd.to_datetime, the format is inferred from the first value
+    if frmt is None:
+        
+        frmt = guess_datetime_format(uniques[0])
+        
+        if frmt is None:
+            
+            return None
+    
+    sample = uniques[np.linspace(0, len(uniques) - 1, min(sample_size, len(uniques))).astype(int)]
+    failures = pd.to_datetime(pd.Index(sample, dtype=object), format=frmt, errors='coerce').isna().sum()
+    
+    if failures:
+        
+        print(f"*** Warning ***   > {failures} of {len(sample)} sampled values do not match the datetime format '{frmt}'")
+    
+    return frmt
+
+def _parse_unique_datetimes(uniques, frmt):
+    
+    # More distinct values than the cache holds would only churn it
+    if len(uniques) > DATETIME_CACHE_MAX_SIZE:
+        
+        parsed = pd.to_datetime(pd.Index(uniques, dtype=object), format=frmt, errors='coerce')
+        
+        return parsed if isinstance(parsed, pd.DatetimeIndex) else None
+    
+    cached = [_DATETIME_CACHE.get((frmt, value)) for value in uniques]
+    missing_positions = [position for position, entry in enumerate(cached) if entry is None]
+    
+    if missing_positions:
+        
+        missing_values = pd.Index(uniques.take(missing_positions), dtype=object)
+        parsed = pd.to_datetime(missing_values, format=frmt, errors='coerce')
+        
+        # Mixed offsets or other results that are not one datetime dtype keep the row by row path
+        if not isinstance(parsed, pd.DatetimeIndex):
+            
+            return None
+        
+        tz = parsed.tz
+        nanoseconds = (parsed.tz_convert('UTC').tz_localize(None) if tz is not None else parsed).as_unit('ns').asi8
+        
+        for position, value, ns in zip(missing_positions, missing_values, nanoseconds):
+            
+            cached[position] = (ns, tz)
+            _DATETIME_CACHE[(frmt, value)] = (ns, tz)
+    
+    for value in uniques:
+        
+        _DATETIME_CACHE.move_to_end((frmt, value))
+    
+    while len(_DATETIME_CACHE) > DATETIME_CACHE_MAX_SIZE:
+        
+        _DATETIME_CACHE.popitem(last=False)
+    
+    timezones = {tz for _, tz in cached}
+    
+    if len(timezones) > 1:
+        
+        return None
+    
+    tz = timezones.pop() if timezones else None
+    parsed = pd.DatetimeIndex(np.array([ns for ns, _ in cached], dtype='int64').view('M8[ns]'))
+    
+    return parsed.tz_localize('UTC').tz_convert(tz) if tz is not None else parsed
 
 # Function for findingv alues ​​that do not allow conversion to numeric
+@instrument
 def find_errors_to_numeric(df, column):
     
-    mask = pd.to_numeric(df[column], errors='coerce').isna() & df[column].notna()
+    numeric_col = pd.to_numeric(df[column], errors='coerce')
+    
+    mask = numeric_col.isna() & df[column].notna()
     non_integer_values = df.loc[mask, column]
     
     if non_integer_values.empty:
@@ -189,7 +583,6 @@ def find_errors_to_numeric(df, column):
         print(f"*** Warning ***   > Non numeric values found in column [{column}]:\n{non_integer_values}\n")
         print(f"> Conversion unsuccessful, non numeric values amount: {non_integer_values.shape[0]}\n")
                 
-    numeric_col = pd.to_numeric(df[column], errors='coerce')
     mask = (numeric_col % 1 != 0) & (~numeric_col.isna())
     non_integer_numeric = df.loc[mask, column]
     
@@ -203,6 +596,7 @@ def find_errors_to_numeric(df, column):
         print(f"> Conversion unsuccessful, numeric values non whole integer amount: {non_integer_numeric.shape[0]}\n")
 
 # Function for converting values to integer data type
+@instrument
 def convert_ndtype_to_numeric(df, type=None, include=None, exclude=None):
     
     if exclude is None:
@@ -215,36 +609,81 @@ def convert_ndtype_to_numeric(df, type=None, include=None, exclude=None):
     
     for column in available_columns:
         
-        if type == 'integer':
+        with column_timer(column):
+            df[column] = _convert_series_to_numeric(df[column], type=type)
+    
+    return df
+
+def _convert_series_to_numeric(series, type=None):
+    
+    if type == 'integer':
+        
+        if _is_whole_number_series(series):
             
-            if np.array_equal(df[column], df[column].astype('int')):
-                
-                df[column] = pd.to_numeric(df[column], downcast='integer', errors="coerce")
+            return pd.to_numeric(series, downcast='integer', errors="coerce")
+        
+        else:
             
-            else:
-                
-                find_errors_to_numeric(df, column)                
-
+            find_errors_to_numeric(series.to_frame(), series.name)
             
-        elif type == 'float':
-                
-                df[column] = pd.to_numeric(df[column], downcast='float', errors="coerce")
+            return series
+        
+    elif type == 'float':
+            
+            return pd.to_numeric(series, downcast='float', errors="coerce")
+        
+    else:
+        
+        if _is_whole_number_series(series):
             
+            return pd.to_numeric(series, errors="coerce")
+        
         else:
             
-            if np.array_equal(df[column], df[column].astype('int')):
-                
-                df[column] = pd.to_numeric(df[column], errors="coerce")
+            find_errors_to_numeric(series.to_frame(), series.name)
             
-            else:
-                
-                find_errors_to_numeric(df, columns)    
-                
-                df[column] = pd.to_numeric(df[column], errors="coerce")
-    
-    return df
+            return pd.to_numeric(series, errors="coerce")
+
+# Whole numbers whatever the dtype, missing values aside: checked block by block instead of comparing with an integer
+# copy of the column, which raised on NaN and never matched text
+def _is_whole_number_series(series, block=1 << 16):
+
+    if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_integer_dtype(series.dtype):
+
+        return True
+
+    if not pd.api.types.is_float_dtype(series.dtype):
+
+        # Every value present has to be a number
+        numeric = pd.to_numeric(series, errors='coerce')
+
+        if (numeric.isna() & series.notna()).any():
+
+            return False
+
+        if not pd.api.types.is_float_dtype(numeric.dtype):
+
+            return True
+
+        series = numeric
+
+    values = series.to_numpy() if series.dtype.kind == 'f' else series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    for start in range(0, len(values), block):
+
+        if not _whole_number_mask(values[start:start + block]).all():
+
+            return False
+
+    return True
+
+# True for the whole numbers and NaN of a float array, infinities are not whole
+def _whole_number_mask(values):
+
+    return np.isnan(values) | (np.isfinite(values) & (np.floor(values) == values))
 
 # Function for converting integer values to boolean data type
+@instrument
 def convert_integer_to_boolean(df, include=None, exclude=None):
     
     if exclude is None:
@@ -257,18 +696,35 @@ def convert_integer_to_boolean(df, include=None, exclude=None):
     
     for column in available_columns:
         
-        if df[column].dtype != 'int':
+        if not _is_integer_series(df[column]):
             
             continue
         
         else:
             
-            df[column] = df[column].astype(bool)
+            with column_timer(column):
+                df[column] = _convert_integer_series_to_boolean(df[column])
     
     return df
 
+def _convert_integer_series_to_boolean(series):
+    
+    if not _is_integer_series(series):
+        
+        return series
+    
+    # Arrow integers keep their nulls as Arrow booleans
+    return series.astype('bool[pyarrow]' if isinstance(series.dtype, pd.ArrowDtype) else bool)
+
+# Any width of signed or unsigned integers, comparing with 'int' only matches the platform default
+def _is_integer_series(series):
+    
+    return pd.api.types.is_integer_dtype(series.dtype) and \
+        (not pd.api.types.is_extension_array_dtype(series.dtype) or isinstance(series.dtype, pd.ArrowDtype))
+
 
 # Function for converting abbreviated gender values to complete gender
+@instrument
 def standardize_gender_values(df, include=None, exclude=None):    
     
     if exclude is None:
@@ -281,16 +737,215 @@ def standardize_gender_values(df, include=None, exclude=None):
     
     for column in available_columns:
         
-        if df[column].dtype != 'object':
+        if not _is_text_dtype(df[column].dtype):
             
             continue
         
         else:
             
-            df[column] = df[column].replace('f', 'female')
-            df[column] = df[column].replace('m', 'male')
+            with column_timer(column):
+                df[column] = _standardize_gender_series(df[column])
     
     return df
 
+# Abbreviations replaced by standardize_gender_values
+GENDER_VALUES = {'f': 'female', 'm': 'male'}
+
+def _standardize_gender_series(series):
+    
+    if _is_arrow_string_dtype(series.dtype):
+        
+        return _map_arrow_strings(series, [_arrow_standardize_gender])
+    
+    if not _is_text_dtype(series.dtype):
+        
+        return series
+    
+    for abbreviation, gender in GENDER_VALUES.items():
+        
+        series = series.replace(abbreviation, gender)
+    
+    return series
 
-    
\ No newline at end of file
+# Function for storing every column with the narrowest dtype that keeps its values
+@instrument
+def compact_dtypes(df, include=None, exclude=None, category_threshold=0.5, bool_flags=True, dates=True, profile=None):
+    """
+    Infers and applies the narrowest safe dtype per column and reports the memory saved.
+    
+    Integers are downcast to the smallest (unsigned when possible) width, 0/1 columns become
+    bool, floats holding whole numbers become nullable integers, strings with few distinct
+    values become 'category' and datetimes with no time of day become Arrow dates.
+    
+    The dtypes are inferred from the values of df. To compact a dataset chunk by chunk, pass
+    the profile of the whole dataset: every dtype is then decided from its column counters
+    (minimum, maximum, nulls, distinct values, floats float32 cannot hold, datetimes with a
+    time of day), so every chunk gets the same dtype. Categorical chunks still have their own
+    categories, concatenate them with pd.api.types.union_categoricals.
+    
+    Args:
+        df (pd.DataFrame): DataFrame modified in place.
+        include (list, optional): Columns to compact, all by default.
+        exclude (list, optional): Columns to leave untouched.
+        category_threshold (float): Maximum ratio of distinct values to rows for 'category'.
+        bool_flags (bool): Convert integer columns holding only 0 and 1 to bool.
+        dates (bool): Convert midnight-only datetimes to 'date32[pyarrow]' (requires pyarrow).
+        profile (DataQualityProfile or pd.DataFrame, optional): Profile of the whole dataset, e.g.
+            merged over every chunk, or its to_frame().
+    
+    Returns:
+        tuple: The DataFrame and a report with dtypes and memory (bytes) before and after per column.
+    """
+    if profile is not None and not isinstance(profile, pd.DataFrame):
+        profile = profile.to_frame()
+    
+    if exclude is None:
+        exclude = []
+    
+    if include is None:
+        available_columns = [col for col in df.columns if col not in exclude]
+    else:
+        available_columns = [col for col in include if col not in exclude]
+    
+    rows = []
+    
+    for column in available_columns:
+        
+        before = df[column]
+
+        with column_timer(column):
+
+            stats = profile.loc[column] if profile is not None and column in profile.index else None
+            after = _compact_series(before, category_threshold, bool_flags, dates, stats)
+
+            if after is not before:
+
+                df[column] = after
+        
+        rows.append((column, str(before.dtype), str(after.dtype),
+                     before.memory_usage(index=False, deep=True), after.memory_usage(index=False, deep=True)))
+    
+    report = pd.DataFrame(rows, columns=['column', 'dtype_before', 'dtype_after', 'bytes_before', 'bytes_after']).set_index('column')
+    report.loc['total'] = ['', '', report['bytes_before'].sum(), report['bytes_after'].sum()]
+    report['reduction'] = report['bytes_before'] / report['bytes_after'].where(report['bytes_after'] > 0)
+    
+    return df, report
+
+def _compact_series(series, category_threshold=0.5, bool_flags=True, dates=True, stats=None):
+    
+    dtype = series.dtype
+    
+    if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        
+        return series
+    
+    if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_float_dtype(dtype):
+        
+        return _compact_numeric_series(series, bool_flags, stats)
+    
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        
+        return _compact_datetime_series(series, stats) if dates else series
+    
+    if dtype == 'object' or pd.api.types.is_string_dtype(dtype):
+        
+        if stats is not None and not pd.isna(stats['distinct']):
+            
+            rows, distinct = stats['rows'], stats['distinct']
+        
+        else:
+            
+            rows, distinct = len(series), series.nunique(dropna=True) if len(series) else 0
+        
+        if rows and distinct <= category_threshold * rows:
+            
+            return series.astype('category')
+    
+    return series
+
+# Nullable integer dtype of every NumPy width, for whole number floats with missing values
+_NULLABLE_INTEGER_DTYPES = {np.dtype(np.int8): pd.Int8Dtype(), np.dtype(np.int16): pd.Int16Dtype(),
+                            np.dtype(np.int32): pd.Int32Dtype(), np.dtype(np.int64): pd.Int64Dtype(),
+                            np.dtype(np.uint8): pd.UInt8Dtype(), np.dtype(np.uint16): pd.UInt16Dtype(),
+                            np.dtype(np.uint32): pd.UInt32Dtype(), np.dtype(np.uint64): pd.UInt64Dtype()}
+
+def _compact_numeric_series(series, bool_flags, stats=None):
+    
+    values = series.to_numpy(dtype='float64', na_value=np.nan) if series.hasnans else series.to_numpy()
+    
+    if stats is None:
+        
+        finite = values[~np.isnan(values)] if values.dtype.kind == 'f' else values
+        has_missing = bool(series.isna().any())
+        whole = len(finite) > 0 and (values.dtype.kind != 'f' or (np.array_equal(finite, np.round(finite))
+                                                                  and not np.isinf(finite).any()))
+        low, high = (finite.min(), finite.max()) if whole else (None, None)
+    
+    else:
+        
+        # Column level counters of the whole dataset: non_integer also counts infinite values
+        has_missing = stats['nulls'] > 0
+        whole = stats['rows'] > stats['nulls'] and stats['non_integer'] == 0
+        low, high = (stats['min'], stats['max']) if whole else (None, None)
+    
+    if not whole:
+        
+        # Real valued floats: float32 only when the round trip is exact
+        if stats is not None:
+            
+            exact = stats['non_float32'] == 0
+        
+        else:
+            
+            exact = np.array_equal(values.astype(np.float32).astype(np.float64), values, equal_nan=True)
+        
+        if values.dtype == np.float64 and exact:
+            
+            return series.astype(np.float32)
+        
+        return series
+    
+    if bool_flags and not has_missing and low >= 0 and high <= 1:
+        
+        return series.astype(bool)
+    
+    for candidate in ([np.uint8, np.uint16, np.uint32, np.uint64] if low >= 0 else [np.int8, np.int16, np.int32, np.int64]):
+        
+        info = np.iinfo(candidate)
+        
+        if info.min <= low and high <= info.max:
+            
+            target = _NULLABLE_INTEGER_DTYPES[np.dtype(candidate)] if has_missing else np.dtype(candidate)
+            
+            return series if series.dtype == target else series.astype(target)
+    
+    return series
+
+def _compact_datetime_series(series, stats=None):
+    
+    if series.dt.tz is not None and str(series.dt.tz) != 'UTC':
+        
+        return series
+    
+    if stats is not None:
+        
+        midnight_only = stats['rows'] > stats['nulls'] and stats['non_midnight'] == 0
+    
+    else:
+        
+        valid = series.dropna()
+        midnight_only = not valid.empty and (valid == valid.dt.normalize()).all()
+    
+    if not midnight_only:
+        
+        return series
+    
+    try:
+        
+        import pyarrow as pa
+    
+    except ImportError:
+        
+        return series
+    
+    return series.dt.tz_localize(None).astype(pd.ArrowDtype(pa.date32())) if series.dt.tz is not None else series.astype(pd.ArrowDtype(pa.date32()))
@@ -1,31 +1,66 @@
 # data_loader.py for opening dataset files
 
 import pandas as pd
+import numpy as np
+import fnmatch
+import glob
+import hashlib
 import os
+import time
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-def load_dataset_from_zip(zip_path: str, filename: str, **kwargs) -> pd.DataFrame:
+from .instrumentation import instrument
+
+# Hit/miss/eviction counters shared by every cached load in the process
+_CACHE_STATS = {'hits': 0, 'misses': 0, 'evictions': 0, 'errors': 0}
+DEFAULT_CACHE_MAX_BYTES = 2 * 1024**3
+
+@instrument
+def load_dataset_from_zip(zip_path: str, filename: str, chunksize: int = None, cache_dir: str = None,
+                          cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES, arrow: bool = False, **kwargs) -> pd.DataFrame:
     """
     Loads a CSV or Excel file from within a ZIP archive into a DataFrame.
     
     Args:
         zip_path (str): Path to the ZIP file.
         filename (str): Name of the CSV or Excel file inside the ZIP.
+        chunksize (int, optional): If given, the member is streamed and an iterator of
+            DataFrame chunks of at most this many rows is returned instead (see iter_dataset_from_zip).
+        cache_dir (str, optional): Directory of the on-disk columnar cache. When given, the parsed
+            frame is stored as an uncompressed Arrow/Feather file keyed on the ZIP path, its
+            mtime and size, the member name and the reader kwargs, and repeat loads read it back
+            memory-mapped instead of re-parsing. Ignored when chunksize is given.
+        cache_max_bytes (int): Size bound of cache_dir, least recently used entries are evicted first.
+        arrow (bool): Loads Arrow-backed columns (dtype_backend='pyarrow'). CSV members are parsed
+            by pyarrow (engine='pyarrow'), so strings never become Python objects; CSV chunks and
+            Excel members are converted after parsing. Explicit engine or dtype_backend kwargs win.
+            Chunked Excel members are not supported and raise a ValueError.
         kwargs: Additional parameters passed to pd.read_csv or pd.read_excel.
     
     Returns:
-        pd.DataFrame: Loaded DataFrame.
+        pd.DataFrame: Loaded DataFrame (or an iterator of DataFrames when chunksize is given).
     
     Raises:
         FileNotFoundError: If the ZIP file does not exist.
         KeyError: If the specified file is not found in the ZIP.
-        ValueError: If the file extension is not supported.
+        ValueError: If the file extension is not supported, or arrow is set for a chunked Excel member.
     """
+    if arrow:
+        kwargs = _arrow_read_kwargs(kwargs, os.path.splitext(filename)[1].lower(), chunked=chunksize is not None)
+
+    if chunksize is not None:
+        return iter_dataset_from_zip(zip_path, filename, chunksize=chunksize, **kwargs)
+
     if not os.path.exists(zip_path):
         print(f"\n*** Error *** \nFile not found: {zip_path}")
         print("Current working directory:", os.getcwd())
         raise FileNotFoundError(f"File not found: {zip_path}")
 
+    if cache_dir is not None:
+        return _load_with_cache(lambda: load_dataset_from_zip(zip_path, filename, **kwargs),
+                                zip_path, filename, kwargs, cache_dir, cache_max_bytes)
+
     with zipfile.ZipFile(zip_path) as z:
         if filename not in z.namelist():
             raise KeyError(f"The file '{filename}' was not found in the ZIP archive.")
@@ -40,34 +75,493 @@ def load_dataset_from_zip(zip_path: str, filename: str, **kwargs) -> pd.DataFram
                 raise ValueError(f"Unsupported file extension '{ext}'. Only .csv, .xls and .xlsx are supported.")
     return df
 
-def load_dataset_from_csv(path, **kwargs):
+@instrument
+def iter_dataset_from_zip(zip_path: str, filename: str, chunksize: int = 100_000, transforms=None, **kwargs):
+    """
+    Streams a CSV or Excel file from within a ZIP archive as DataFrame chunks.
+    
+    The member is decompressed and parsed incrementally, so peak memory stays close to
+    the size of one chunk regardless of the size of the archive.
+    
+    Args:
+        zip_path (str): Path to the ZIP file.
+        filename (str): Name of the CSV or Excel file inside the ZIP.
+        chunksize (int): Maximum number of rows per chunk.
+        transforms (list, optional): Cleaning steps applied to every chunk as it arrives, in order.
+            Each item is either a callable taking a DataFrame, or a (callable, kwargs) tuple,
+            e.g. [(normalize_df_string_format, {}), (standardize_gender_values, {'include': ['gender']})].
+        kwargs: Additional parameters passed to pd.read_csv. For Excel members only
+            'sheet_name', 'header', 'names' and 'dtype' are supported.
+    
+    Returns:
+        Iterator[pd.DataFrame]: Consecutive chunks of the file, with a running RangeIndex.
+    
+    Raises:
+        FileNotFoundError: If the ZIP file does not exist.
+        KeyError: If the specified file is not found in the ZIP.
+        ValueError: If the file extension is not supported or chunksize is not positive.
+    """
+    if chunksize is None or chunksize < 1:
+        raise ValueError(f"chunksize must be a positive integer, got {chunksize}.")
+
+    if not os.path.exists(zip_path):
+        print(f"\n*** Error *** \nFile not found: {zip_path}")
+        print("Current working directory:", os.getcwd())
+        raise FileNotFoundError(f"File not found: {zip_path}")
+
+    with zipfile.ZipFile(zip_path) as z:
+        if filename not in z.namelist():
+            raise KeyError(f"The file '{filename}' was not found in the ZIP archive.")
+
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == '.csv':
+        reader = lambda file: pd.read_csv(file, chunksize=chunksize, **kwargs)
+    elif ext in ['.xls', '.xlsx']:
+        reader = lambda file: _iter_excel_chunks(file, ext, chunksize, **kwargs)
+    else:
+        raise ValueError(f"Unsupported file extension '{ext}'. Only .csv, .xls and .xlsx are supported.")
+
+    # Errors above are raised on the call itself, the member is only opened once iteration starts
+    return _stream_zip_member(zip_path, filename, reader, transforms)
+
+def _stream_zip_member(zip_path, filename, reader, transforms):
+
+    with zipfile.ZipFile(zip_path) as z:
+        with z.open(filename) as file:
+            for chunk in reader(file):
+                yield _apply_transforms(chunk, transforms)
+
+def _apply_transforms(df, transforms):
+
+    for step in transforms or []:
+        func, step_kwargs = step if isinstance(step, tuple) else (step, {})
+        result = func(df, **step_kwargs)
+        # Cleaning functions modify the frame in place and return it, but a few only report
+        if isinstance(result, pd.DataFrame):
+            df = result
+
+    return df
+
+def _iter_excel_chunks(file, ext, chunksize, sheet_name=0, header=0, names=None, dtype=None):
+
+    if ext == '.xls':
+        # The legacy binary format has no row streaming reader, the sheet is read once and sliced
+        df = pd.read_excel(file, sheet_name=sheet_name, header=header, names=names, dtype=dtype)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        rows = sheet.iter_rows(values_only=True)
+
+        columns = names
+        if header is not None:
+            for _ in range(header):
+                next(rows, None)
+            header_row = next(rows, None)
+            if columns is None and header_row is not None:
+                columns = list(header_row)
+
+        start = 0
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) == chunksize:
+                yield _excel_rows_to_frame(buffer, columns, dtype, start)
+                start += len(buffer)
+                buffer = []
+        if buffer:
+            yield _excel_rows_to_frame(buffer, columns, dtype, start)
+    finally:
+        workbook.close()
+
+def _excel_rows_to_frame(rows, columns, dtype, start):
+
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    df.index = pd.RangeIndex(start, start + len(df))
+    if dtype is not None:
+        df = df.astype(dtype)
+
+    return df
+
+@instrument
+def load_dataset_from_csv(path, cache_dir=None, cache_max_bytes=DEFAULT_CACHE_MAX_BYTES, arrow=False, **kwargs):
     
     if not os.path.exists(path):
         raise FileNotFoundError(f"*** Error *** \nFile not found: {path}.")
         print("\nThis is your current", os.getcwd())
     
+    if arrow:
+        kwargs = _arrow_read_kwargs(kwargs)
+    
+    if cache_dir is not None:
+        return _load_with_cache(lambda: pd.read_csv(path, **kwargs), path, None, kwargs, cache_dir, cache_max_bytes)
+    
     df = pd.read_csv(path, **kwargs)
     
     return df
 
-def load_dataset_from_excel(path, **kwargs):
+@instrument
+def load_dataset_from_excel(path, cache_dir=None, cache_max_bytes=DEFAULT_CACHE_MAX_BYTES, arrow=False, **kwargs):
 
     if not os.path.exists(path):
         raise FileNotFoundError(f"*** Error *** \nFile not found: {path}.")
         print("\nThis is your current", os.getcwd())
 
+    if arrow:
+        kwargs = _arrow_read_kwargs(kwargs, '.xlsx')
+
+    if cache_dir is not None:
+        return _load_with_cache(lambda: pd.read_excel(path, **kwargs), path, None, kwargs, cache_dir, cache_max_bytes)
+
     df = pd.read_excel(path, **kwargs)
     
     return df
 
+@instrument
 def load_dataset_from_list(list ):
     
     df = pd.DataFrame(list)
     
     return df 
 
+@instrument
 def load_dataset_from_dict(dict ):
     
     df = pd.DataFrame.from_dict(dict, orient='columns')
     
-    return df
\ No newline at end of file
+    return df
+
+# Function for removing cached frames, all of them or only the ones built from one source file
+@instrument
+def clear_dataset_cache(cache_dir, path=None):
+    """
+    Explicitly invalidates entries of the on-disk dataset cache.
+    
+    Args:
+        cache_dir (str): Cache directory used with the load_dataset_from_* functions.
+        path (str, optional): Source file (CSV, Excel or ZIP) whose entries are removed.
+            If None, the whole cache is cleared.
+    
+    Returns:
+        int: Number of cache entries removed.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    prefix = _cache_source_digest(path) if path is not None else ''
+    removed = 0
+    for entry in os.listdir(cache_dir):
+        if entry.endswith('.feather') and entry.startswith(prefix):
+            os.remove(os.path.join(cache_dir, entry))
+            removed += 1
+
+    return removed
+
+# Function for reading the cache counters of the current process
+@instrument
+def get_dataset_cache_stats(reset=False):
+
+    stats = dict(_CACHE_STATS)
+    if reset:
+        for key in _CACHE_STATS:
+            _CACHE_STATS[key] = 0
+
+    return stats
+
+# Function for loading many extracts (ZIP members, CSV and Excel files) concurrently into one DataFrame
+@instrument
+def load_datasets_from_sources(sources, members='*', n_jobs=None, use_processes=False, normalize_headers=True,
+                               source_column='source', **kwargs):
+    """
+    Loads every source concurrently and stacks them into a single DataFrame.
+
+    Each source (one CSV or Excel file, or one member of a ZIP archive) is decompressed and
+    parsed in a thread or process pool. The headers are harmonized with
+    normalize_headers_string_format, and the frames are copied once into columns preallocated
+    for the total number of rows, instead of growing the result with repeated pd.concat.
+    Columns missing from a source are filled with missing values. A source that fails is
+    reported and left out, the others are still loaded.
+
+    Args:
+        sources (str or list): Paths or glob patterns of .zip, .csv, .xls and .xlsx files,
+            e.g. 'data/raw/extracts/*.zip'.
+        members (str): Glob pattern of the ZIP members to load, every CSV and Excel member by default.
+        n_jobs (int, optional): Concurrent loads, all cores by default.
+        use_processes (bool): Parse in worker processes instead of threads, for CPU-bound parsing
+            of many large members (the frames are then sent back pickled).
+        normalize_headers (bool): Normalize the column names of every source before stacking.
+        source_column (str, optional): Name of a categorical column with the source of every row
+            (its file name, or its path when file names repeat), None to skip it.
+        kwargs: Additional parameters passed to pd.read_csv. For Excel sources only 'sheet_name',
+            'header', 'names' and 'dtype' are used.
+
+    Returns:
+        tuple: The stacked DataFrame (sources in sorted path and member order, with a RangeIndex)
+            and a report with the source, member, status ('loaded' or 'failed'), rows, columns,
+            seconds and error of every source.
+
+    Raises:
+        FileNotFoundError: If no file matches the sources.
+    """
+    paths = _expand_sources(sources)
+    if not paths:
+        raise FileNotFoundError(f"*** Error ***   > No files match the sources: {sources}")
+
+    tasks, failures = [], []
+
+    for path in paths:
+        if path.lower().endswith('.zip'):
+            try:
+                with zipfile.ZipFile(path) as z:
+                    names = sorted(name for name in z.namelist()
+                                   if os.path.splitext(name)[1].lower() in _TABULAR_EXTENSIONS and fnmatch.fnmatch(name, members))
+            except (OSError, zipfile.BadZipFile) as error:
+                failures.append(_source_report(path, None, None, 0.0, error))
+                continue
+            tasks.extend((path, name) for name in names)
+        else:
+            tasks.append((path, None))
+
+    start = time.perf_counter()
+
+    max_workers = max(1, min(n_jobs or os.cpu_count(), len(tasks) or 1))
+    pool = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool(max_workers=max_workers) as executor:
+        results = list(executor.map(_load_source, *zip(*tasks), [normalize_headers] * len(tasks), [kwargs] * len(tasks))) if tasks else []
+
+    frames, loaded, report = [], [], failures
+    for (path, member), (df, seconds, error) in zip(tasks, results):
+        report.append(_source_report(path, member, df, seconds, error))
+        if error is None:
+            frames.append(df)
+            loaded.append((path, member))
+
+    df = _stack_frames(frames, _source_labels(loaded), source_column)
+
+    report = pd.DataFrame(report, columns=['source', 'member', 'status', 'rows', 'columns', 'seconds', 'error'])
+    failed = report['status'] == 'failed'
+
+    print(f"> {len(frames)} sources loaded ({len(df)} rows) in {time.perf_counter() - start:.2f} s with {max_workers} "
+          f"{'processes' if use_processes else 'threads'}, {int(failed.sum())} failed")
+    for _, row in report[failed].iterrows():
+        print(f"*** Warning ***   > {row['source']}{'' if row['member'] is None else ':' + row['member']}: {row['error']}")
+
+    return df, report
+
+# Function for the reader kwargs of an Arrow-backed load: pyarrow parses whole CSVs straight into Arrow
+# dtypes, the C parser (chunks) and the Excel readers convert their result
+def _arrow_read_kwargs(kwargs, ext='.csv', chunked=False):
+
+    if chunked and ext != '.csv':
+        # The Excel chunks are built row by row from openpyxl, with no dtype_backend to pass on
+        raise ValueError("*** Error ***   > arrow=True is not supported for chunked Excel members, "
+                         "convert the chunks with convert_dtypes(dtype_backend='pyarrow') instead.")
+
+    arrow_kwargs = {'dtype_backend': 'pyarrow'}
+
+    if ext == '.csv' and not chunked:
+        arrow_kwargs['engine'] = 'pyarrow'
+
+    return {**arrow_kwargs, **kwargs}
+
+def _cache_source_digest(path):
+
+    return hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+
+def _cache_entry_path(cache_dir, path, member, kwargs):
+
+    stat = os.stat(path)
+    key = repr((os.path.abspath(path), member, stat.st_mtime_ns, stat.st_size, sorted(kwargs.items(), key=lambda kv: kv[0])))
+    key_digest = hashlib.sha1(key.encode()).hexdigest()[:24]
+
+    return os.path.join(cache_dir, f"{_cache_source_digest(path)}-{key_digest}.feather")
+
+def _load_with_cache(load, path, member, kwargs, cache_dir, cache_max_bytes):
+
+    try:
+        import pyarrow as pa
+        from pyarrow import feather
+    except ImportError as e:
+        raise ImportError("The dataset cache requires 'pyarrow' to be installed.") from e
+
+    os.makedirs(cache_dir, exist_ok=True)
+    entry = _cache_entry_path(cache_dir, path, member, kwargs)
+
+    if os.path.exists(entry):
+        _CACHE_STATS['hits'] += 1
+        # Touch the entry so eviction treats it as recently used
+        os.utime(entry)
+        # Arrow loads come back with the ArrowDtype columns a miss returns, not pandas' own string dtype
+        types_mapper = pd.ArrowDtype if kwargs.get('dtype_backend') == 'pyarrow' else None
+        return feather.read_table(entry, memory_map=True).to_pandas(types_mapper=types_mapper)
+
+    _CACHE_STATS['misses'] += 1
+    df = load()
+
+    tmp_entry = f"{entry}.{os.getpid()}.tmp"
+    try:
+        feather.write_feather(pa.Table.from_pandas(df), tmp_entry, compression='uncompressed')
+        os.replace(tmp_entry, entry)
+    except (pa.ArrowException, TypeError, ValueError) as e:
+        # Frames Arrow cannot represent faithfully (e.g. mixed-type object columns) are simply not cached
+        _CACHE_STATS['errors'] += 1
+        print(f"*** Warning ***   > Dataset not cached: {e}")
+        if os.path.exists(tmp_entry):
+            os.remove(tmp_entry)
+        return df
+
+    _evict_cache_entries(cache_dir, cache_max_bytes)
+
+    return df
+
+def _evict_cache_entries(cache_dir, cache_max_bytes):
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.feather'):
+            stat = os.stat(os.path.join(cache_dir, name))
+            entries.append((stat.st_mtime_ns, stat.st_size, name))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= cache_max_bytes:
+            break
+        os.remove(os.path.join(cache_dir, name))
+        total -= size
+        _CACHE_STATS['evictions'] += 1
+
+# Extensions load_datasets_from_sources reads, inside ZIP archives and as files
+_TABULAR_EXTENSIONS = ('.csv', '.xls', '.xlsx')
+
+_EXCEL_KWARGS = ('sheet_name', 'header', 'names', 'dtype')
+
+def _expand_sources(sources):
+
+    patterns = [sources] if isinstance(sources, (str, os.PathLike)) else list(sources)
+
+    paths = []
+    for pattern in map(str, patterns):
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        paths.extend(path for path in matches if path not in paths)
+
+    return paths
+
+def _load_source(path, member, normalize_headers, kwargs):
+
+    start = time.perf_counter()
+
+    try:
+        ext = os.path.splitext(member if member is not None else path)[1].lower()
+        if ext not in _TABULAR_EXTENSIONS:
+            raise ValueError(f"Unsupported file extension '{ext}'. Only .csv, .xls, .xlsx and .zip are supported.")
+
+        read_kwargs = kwargs if ext == '.csv' else {key: value for key, value in kwargs.items() if key in _EXCEL_KWARGS}
+        reader = pd.read_csv if ext == '.csv' else pd.read_excel
+
+        if member is None:
+            df = reader(path, **read_kwargs)
+        else:
+            with zipfile.ZipFile(path) as z, z.open(member) as file:
+                df = reader(file, **read_kwargs)
+
+        if normalize_headers:
+            from .data_cleaning import normalize_headers_string_format
+            df.columns = normalize_headers_string_format(map(str, df.columns))
+
+        if df.columns.duplicated().any():
+            raise ValueError(f"Duplicated columns after normalizing the headers: {sorted(set(df.columns[df.columns.duplicated()]))}")
+
+    except Exception as error:
+        return None, time.perf_counter() - start, f"{type(error).__name__}: {error}"
+
+    return df, time.perf_counter() - start, None
+
+def _source_report(path, member, df, seconds, error):
+
+    if error is not None and not isinstance(error, str):
+        error = f"{type(error).__name__}: {error}"
+
+    return (path, member, 'failed' if error else 'loaded', None if df is None else len(df),
+            None if df is None else df.shape[1], seconds, error)
+
+# Function for the source label of every loaded source: the file name, or its path below the common folder of
+# the sources when two files have the same name, e.g. a/extract.csv and b/extract.csv
+def _source_labels(sources):
+
+    def label(name, member):
+        return name if member is None else f"{name}:{member}"
+
+    labels = [label(os.path.basename(path), member) for path, member in sources]
+
+    if len(set(labels)) < len(labels):
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path, _ in sources])
+        labels = [label(os.path.relpath(os.path.abspath(path), root), member) for path, member in sources]
+
+    # Categories have to be unique, the same source given twice gets a numeric suffix
+    seen = {}
+    for position, name in enumerate(labels):
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            labels[position] = f"{name} ({seen[name]})"
+
+    return labels
+
+def _stack_frames(frames, labels, source_column):
+
+    columns = list(dict.fromkeys(column for df in frames for column in df.columns))
+    lengths = np.array([len(df) for df in frames], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    total = int(offsets[-1])
+
+    # One output array per column with the dtype every source fits in, a missing column needs a missing value
+    outputs = {}
+    for column in columns:
+        dtypes = [df[column].dtype for df in frames if column in df.columns]
+        complete = len(dtypes) == len(frames)
+        if all(isinstance(dtype, np.dtype) for dtype in dtypes):
+            try:
+                dtype = np.result_type(*dtypes)
+            except TypeError:
+                dtype = np.dtype(object)
+            # Like pd.concat, booleans mixed with numbers stay objects
+            if any(source_dtype.kind == 'b' for source_dtype in dtypes) and dtype.kind != 'b':
+                dtype = np.dtype(object)
+            if not complete and dtype.kind in 'biu':
+                dtype = np.dtype('float64') if dtype.kind != 'b' else np.dtype(object)
+            outputs[column] = np.empty(total, dtype=dtype)
+            if not complete:
+                outputs[column][:] = np.datetime64('NaT') if dtype.kind in 'mM' else np.nan
+        else:
+            # Extension dtypes (categorical, nullable, Arrow) are stacked by pandas
+            outputs[column] = None
+
+    extension_parts = {column: [] for column, output in outputs.items() if output is None}
+
+    for position, df in enumerate(frames):
+        start, stop = offsets[position], offsets[position + 1]
+        for column in df.columns:
+            if outputs[column] is not None:
+                outputs[column][start:stop] = df[column].to_numpy()
+            else:
+                extension_parts[column].append(df[column])
+        for column in extension_parts:
+            if column not in df.columns:
+                extension_parts[column].append(pd.Series(pd.NA, index=range(len(df)), dtype=object))
+        frames[position] = None
+
+    data = {}
+    for column in columns:
+        if outputs[column] is not None:
+            data[column] = outputs[column]
+        else:
+            data[column] = pd.concat(extension_parts.pop(column), ignore_index=True).array
+
+    if source_column is not None:
+        data[source_column] = pd.Categorical.from_codes(np.repeat(np.arange(len(labels)), lengths), categories=labels)
+
+    return pd.DataFrame(data, index=pd.RangeIndex(total), copy=False)
@@ -0,0 +1,219 @@
+# data_quality.py for profiling missing, non numeric and distinct values of a dataset in one pass
+
+import numpy as np
+import pandas as pd
+
+from .data_cleaning import MISSING_VALUES, _is_arrow_string_dtype, _is_text_dtype
+
+_COUNTERS = ['rows', 'nulls', 'missing_tokens', 'non_numeric', 'non_integer', 'non_float32', 'non_midnight']
+
+# Strings pd.to_numeric may accept, only those Arrow values are converted with it
+_NUMERIC_PATTERN = r'(?i)^\s*[+-]?((\d+\.?\d*|\.\d+)(e[+-]?\d+)?|inf(inity)?)\s*$'
+
+class DataQualityProfile:
+    """
+    Mergeable per column data quality counters.
+
+    Every update scans a DataFrame (or one streamed chunk of it) once per column: object
+    columns are factorized and the missing tokens, numeric conversion, distinct values and
+    min/max are evaluated on the unique values only, weighted by their row counts. Float
+    columns also count the values float32 cannot hold exactly, and datetime columns the
+    values with a time of day, which compact_dtypes uses to give every chunk the same dtype.
+    Profiles built on different chunks or processes can be combined with merge().
+
+    Args:
+        missing_values (list, optional): Tokens counted as missing, MISSING_VALUES by default.
+        track_distinct (bool): Keep the 64-bit hashes of the distinct values of every column,
+            needed for exact distinct counts across chunks (memory grows with the cardinality).
+
+    Example:
+        profile = DataQualityProfile()
+        for chunk in iter_dataset_from_zip(zip_path, filename, chunksize=100_000, sep='|'):
+            profile.update(chunk)
+        print(profile.to_frame())
+    """
+
+    def __init__(self, missing_values=None, track_distinct=True):
+
+        self.missing_values = list(MISSING_VALUES if missing_values is None else missing_values)
+        self.track_distinct = track_distinct
+        self.columns = {}
+
+    def update(self, df):
+
+        for column in df.columns:
+
+            stats = _profile_series(df[column], self.missing_values, self.track_distinct)
+            self._merge_column(column, stats)
+
+        return self
+
+    def merge(self, other):
+
+        for column, stats in other.columns.items():
+
+            self._merge_column(column, stats)
+
+        return self
+
+    def _merge_column(self, column, stats):
+
+        if column not in self.columns:
+
+            self.columns[column] = stats
+            return
+
+        current = self.columns[column]
+
+        for counter in _COUNTERS:
+            current[counter] += stats[counter]
+
+        if current['dtype'] != stats['dtype']:
+            current['dtype'] = 'mixed'
+
+        if current['distinct_hashes'] is not None and stats['distinct_hashes'] is not None:
+            current['distinct_hashes'] = np.union1d(current['distinct_hashes'], stats['distinct_hashes'])
+        else:
+            current['distinct_hashes'] = None
+
+        current['min'] = _combine_extreme(current['min'], stats['min'], min)
+        current['max'] = _combine_extreme(current['max'], stats['max'], max)
+
+    def to_frame(self):
+
+        rows = []
+
+        for column, stats in self.columns.items():
+
+            distinct = len(stats['distinct_hashes']) if stats['distinct_hashes'] is not None else pd.NA
+            rows.append([column, stats['dtype'], *[stats[counter] for counter in _COUNTERS], distinct, stats['min'], stats['max']])
+
+        profile = pd.DataFrame(rows, columns=['column', 'dtype', *_COUNTERS, 'distinct', 'min', 'max'])
+
+        return profile.set_index('column')
+
+# Function for profiling a DataFrame, or an iterable of chunks, without printing
+def profile_data_quality(data, missing_values=None, track_distinct=True):
+
+    profile = DataQualityProfile(missing_values=missing_values, track_distinct=track_distinct)
+
+    for chunk in ([data] if isinstance(data, pd.DataFrame) else data):
+
+        profile.update(chunk)
+
+    return profile
+
+def _combine_extreme(current, new, pick):
+
+    if current is None or (not isinstance(current, str) and pd.isna(current)):
+        return new
+    if new is None or (not isinstance(new, str) and pd.isna(new)):
+        return current
+
+    try:
+        return pick(current, new)
+    except TypeError:
+        return np.nan
+
+def _profile_series(series, missing_values, track_distinct):
+
+    stats = {'dtype': str(series.dtype), 'rows': len(series), 'non_float32': 0, 'non_midnight': 0,
+             'distinct_hashes': None, 'min': np.nan, 'max': np.nan}
+
+    if _is_arrow_string_dtype(series.dtype):
+
+        return _profile_arrow_strings(series, missing_values, track_distinct, stats)
+
+    if _is_text_dtype(series.dtype) or isinstance(series.dtype, pd.CategoricalDtype):
+
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        uniques = np.asarray(uniques, dtype=object)
+
+        stats['nulls'] = int(len(codes) - counts.sum())
+        stats['missing_tokens'] = int(counts[pd.Index(uniques, dtype=object).isin(missing_values)].sum())
+
+        numeric = pd.to_numeric(pd.Series(uniques, dtype=object), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        is_numeric = ~np.isnan(numeric)
+        stats['non_numeric'] = int(counts[~is_numeric].sum())
+        with np.errstate(invalid='ignore'):
+            stats['non_integer'] = int(counts[is_numeric & (np.mod(numeric, 1) != 0)].sum())
+
+        if len(uniques) and all(isinstance(value, str) for value in uniques):
+            stats['min'], stats['max'] = min(uniques), max(uniques)
+
+        if track_distinct:
+            stats['distinct_hashes'] = np.unique(pd.util.hash_array(uniques, categorize=False))
+
+        return stats
+
+    is_null = series.isna().to_numpy()
+    stats['nulls'] = int(is_null.sum())
+    stats['missing_tokens'] = 0
+    valid = series[~is_null]
+
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+
+        values = valid.to_numpy(dtype='float64')
+        stats['non_numeric'] = 0
+        with np.errstate(invalid='ignore', over='ignore'):
+            stats['non_integer'] = int((np.mod(values, 1) != 0).sum())
+            if pd.api.types.is_float_dtype(series.dtype):
+                stats['non_float32'] = int((values.astype(np.float32).astype(np.float64) != values).sum())
+
+    else:
+
+        # Booleans and datetimes convert to whole numbers with pd.to_numeric
+        stats['non_numeric'] = 0
+        stats['non_integer'] = 0
+
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            # Wall clock time of day, in the column's timezone
+            wall = valid.dt.tz_localize(None) if valid.dt.tz is not None else valid
+            stats['non_midnight'] = int((wall != wall.dt.normalize()).sum())
+
+    if len(valid):
+        stats['min'], stats['max'] = valid.min(), valid.max()
+
+    if track_distinct:
+        stats['distinct_hashes'] = np.unique(pd.util.hash_pandas_object(valid, index=False).to_numpy())
+
+    return stats
+
+# Same counters for Arrow strings, from pyarrow's value counts: only the numeric looking and (for the
+# distinct hashes) the unique values become Python objects
+def _profile_arrow_strings(series, missing_values, track_distinct, stats):
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    values = pa.array(series.array)
+    counted = pc.value_counts(values)
+    valid = counted.field('values').is_valid()
+    uniques = counted.field('values').filter(valid)
+    counts = counted.field('counts').filter(valid).to_numpy()
+
+    stats['nulls'] = int(values.null_count)
+    is_missing = pc.is_in(uniques, value_set=pa.array(missing_values, type=uniques.type)).to_numpy(zero_copy_only=False)
+    stats['missing_tokens'] = int(counts[is_missing].sum())
+
+    numeric = np.full(len(uniques), np.nan)
+    numeric_like = pc.match_substring_regex(uniques, _NUMERIC_PATTERN).to_numpy(zero_copy_only=False)
+    if numeric_like.any():
+        numeric[numeric_like] = pd.to_numeric(pd.Series(uniques.filter(numeric_like).to_pylist(), dtype=object),
+                                              errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+    is_numeric = ~np.isnan(numeric)
+    stats['non_numeric'] = int(counts[~is_numeric].sum())
+    with np.errstate(invalid='ignore'):
+        stats['non_integer'] = int(counts[is_numeric & (np.mod(numeric, 1) != 0)].sum())
+
+    # UTF-8 bytes sort like the code points, as Python compares strings
+    if len(uniques):
+        extremes = pc.min_max(uniques)
+        stats['min'], stats['max'] = extremes['min'].as_py(), extremes['max'].as_py()
+
+    if track_distinct:
+        stats['distinct_hashes'] = np.unique(pd.util.hash_array(np.array(uniques.to_pylist(), dtype=object), categorize=False))
+
+    return stats
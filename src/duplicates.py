@@ -0,0 +1,258 @@
+# duplicates.py for finding rows of new extracts already seen in earlier ones, from 64-bit row fingerprints kept on disk
+
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Status of every row of a batch, in the order of the categories
+DUPLICATE_STATUSES = ['new', 'duplicate', 'changed']
+
+class DuplicateIndex:
+    """
+    Persistent index of the rows seen so far, to deduplicate extracts batch by batch.
+
+    Every row is fingerprinted with pd.util.hash_pandas_object over the chosen columns (one
+    uint64 per row), and its key column (appointment_id) is hashed the same way. The index
+    only stores the distinct fingerprints and key hashes, as sorted runs of uint64: a batch
+    is checked with a binary search per run and adds one run with its unseen hashes, and
+    runs of similar size are merged (like an LSM tree), so there are about log2(rows) runs.
+    With a path, the runs are .npy files memory mapped from the directory: checking a batch
+    reads the pages it lands on, and the memory used is the one of the batch, not of the
+    history.
+
+    A row is 'duplicate' when the same fingerprint was seen before (in an earlier batch or
+    earlier in the batch), 'changed' when its key was seen with other values (e.g. the same
+    appointment_id with another sms_received), 'new' otherwise. Fingerprints depend on the
+    dtypes, so the extracts have to be loaded and cleaned the same way; a warning is printed
+    when the dtypes of a batch differ from the indexed ones.
+
+    Args:
+        path (str, optional): Directory of the index, created or reopened. In memory by default.
+        columns (list, optional): Columns fingerprinted, every column of the first batch by default.
+        key (str, optional): Column identifying a record, None to only look for exact duplicates.
+        merge_factor (float): A run is merged into the previous one while that one is at most
+            merge_factor times larger.
+
+    Example:
+        index = DuplicateIndex('data/interim/duplicate_index')
+        for path in monthly_extracts:
+            df = load_dataset_from_zip(path, filename, sep='|', keep_default_na=False)
+            status = index.update(df)
+            df_new = df[status == 'new']
+        index.report
+    """
+
+    def __init__(self, path=None, columns=None, key='appointment_id', merge_factor=2):
+
+        self.path = path
+        self.columns = None if columns is None else list(columns)
+        self.key = key
+        self.merge_factor = merge_factor
+        self.dtypes = None
+        self._runs = []
+        self._next_run = 0
+        self._batches = []
+
+        if path is not None:
+            self._open()
+
+    def __len__(self):
+
+        return int(sum(len(rows) for _, rows, _ in self._runs))
+
+    @property
+    def report(self):
+
+        return pd.DataFrame(self._batches, columns=['rows', 'new', 'duplicate', 'changed']).rename_axis('batch')
+
+    # Function for the status of every row of a batch against the rows seen so far, then adding the batch
+    def update(self, batch, add=True):
+        """
+        Classifies the rows of a batch as new, duplicate or changed, in O(batch) memory.
+
+        Args:
+            batch (pd.DataFrame): Rows to check, e.g. one extract or one chunk of it.
+            add (bool): Adds the batch to the index; False only checks it.
+
+        Returns:
+            pd.Series: Categorical 'duplicate_status' with the DUPLICATE_STATUSES, on the index of batch.
+        """
+        columns = self._batch_columns(batch)
+
+        # Only the first row of each fingerprint (and key) in the batch is looked up in the runs
+        rows = pd.util.hash_pandas_object(batch[columns], index=False).to_numpy()
+        first_row = ~pd.Series(rows).duplicated().to_numpy()
+        seen_row = np.zeros(len(batch), dtype=bool)
+        seen_row[first_row] = self._contains(1, rows[first_row])
+        duplicate = ~first_row | seen_row
+
+        changed = np.zeros(len(batch), dtype=bool)
+        new_keys = np.zeros(0, dtype=np.uint64)
+
+        if self.key is not None:
+            keys = pd.util.hash_pandas_object(batch[self.key], index=False).to_numpy()
+            first_key = ~pd.Series(keys).duplicated().to_numpy()
+            seen_key = ~first_key
+            seen_key[first_key] = self._contains(2, keys[first_key])
+            changed = ~duplicate & seen_key
+            new_keys = keys[~seen_key]
+
+        codes = np.where(duplicate, 1, np.where(changed, 2, 0)).astype(np.int8)
+        status = pd.Series(pd.Categorical.from_codes(codes, DUPLICATE_STATUSES), index=batch.index, name='duplicate_status')
+
+        if add:
+            self._add_run(rows[~duplicate], new_keys)
+            counts = np.bincount(codes, minlength=3)
+            self._batches.append([len(batch), *(int(count) for count in counts)])
+
+        return status
+
+    def _batch_columns(self, batch):
+
+        if self.columns is None:
+            self.columns = sorted(column for column in batch.columns if column != self.key) + \
+                           ([self.key] if self.key in batch.columns else [])
+
+        missing = [column for column in [*self.columns, *([self.key] if self.key else [])] if column not in batch.columns]
+        if missing:
+            raise KeyError(f"*** Error ***   > Missing columns in the batch: {missing}")
+
+        dtypes = {column: str(dtype) for column, dtype in batch[self.columns].dtypes.items()}
+        if self.key is not None:
+            dtypes[self.key] = str(batch[self.key].dtype)
+
+        if self.dtypes is None:
+            self.dtypes = dtypes
+            self._save_settings()
+        elif dtypes != self.dtypes:
+            changed = {column: f"{self.dtypes.get(column)} -> {dtype}" for column, dtype in dtypes.items() if self.dtypes.get(column) != dtype}
+            print(f"*** Warning ***   > dtypes differ from the indexed batches, their rows will not match: {changed}")
+
+        return self.columns
+
+    # Function for the hashes found in any run, kind 1 for the row fingerprints and 2 for the keys
+    def _contains(self, kind, values):
+
+        found = np.zeros(len(values), dtype=bool)
+
+        if not len(values) or not self._runs:
+            return found
+
+        # Sorted lookups walk every run forward
+        order = np.argsort(values)
+        values = values[order]
+        found_sorted = np.zeros(len(values), dtype=bool)
+
+        for run in self._runs:
+            hashes = run[kind]
+            if len(hashes):
+                positions = np.minimum(np.searchsorted(hashes, values), len(hashes) - 1)
+                found_sorted |= hashes[positions] == values
+
+        found[order] = found_sorted
+
+        return found
+
+    def _add_run(self, rows, keys):
+
+        if not len(rows) and not len(keys):
+            return
+
+        # The hashes are distinct already, first ones of the batch and unseen
+        self._runs.append(self._write_run(np.sort(rows), np.sort(keys)))
+
+        # Runs hold hashes unseen by the older runs, merging them is a sort of the concatenation
+        while len(self._runs) > 1 and _run_size(self._runs[-2]) <= self.merge_factor * _run_size(self._runs[-1]):
+            newer = self._runs.pop()
+            older = self._runs.pop()
+            self._runs.append(self._write_run(np.sort(np.concatenate([older[1], newer[1]])),
+                                              np.sort(np.concatenate([older[2], newer[2]]))))
+            self._remove_run(older[0])
+            self._remove_run(newer[0])
+
+    def _write_run(self, rows, keys):
+
+        run = self._next_run
+        self._next_run += 1
+
+        if self.path is None:
+            return run, rows, keys
+
+        # Written under a temporary name and renamed, a run file is always complete
+        arrays = []
+        for kind, hashes in (('rows', rows), ('keys', keys)):
+            filename = os.path.join(self.path, f'{kind}_{run:06d}.npy')
+            with open(filename + '.tmp', 'wb') as file:
+                np.save(file, hashes)
+            os.replace(filename + '.tmp', filename)
+            arrays.append(np.load(filename, mmap_mode='r'))
+
+        return run, *arrays
+
+    def _remove_run(self, run):
+
+        if self.path is not None:
+            for kind in ('rows', 'keys'):
+                os.remove(os.path.join(self.path, f'{kind}_{run:06d}.npy'))
+
+    def _open(self):
+
+        os.makedirs(self.path, exist_ok=True)
+        settings_path = os.path.join(self.path, 'index.json')
+
+        if os.path.exists(settings_path):
+
+            with open(settings_path) as file:
+                settings = json.load(file)
+
+            if self.columns is not None and self.columns != settings['columns'] or self.key != settings['key']:
+                raise ValueError(f"*** Error ***   > The index at {self.path} fingerprints {settings['columns']} "
+                                 f"with key {settings['key']!r}")
+
+            self.columns = settings['columns']
+            self.dtypes = settings['dtypes']
+
+        # A run left by an interrupted merge overlaps the merged one, which does not change the lookups
+        runs = sorted(int(os.path.basename(filename)[5:11]) for filename in glob.glob(os.path.join(self.path, 'keys_*.npy')))
+
+        for run in runs:
+            rows_path = os.path.join(self.path, f'rows_{run:06d}.npy')
+            if os.path.exists(rows_path):
+                self._runs.append((run, np.load(rows_path, mmap_mode='r'),
+                                   np.load(os.path.join(self.path, f'keys_{run:06d}.npy'), mmap_mode='r')))
+
+        self._next_run = runs[-1] + 1 if runs else 0
+
+    def _save_settings(self):
+
+        if self.path is not None:
+            with open(os.path.join(self.path, 'index.json'), 'w') as file:
+                json.dump({'columns': self.columns, 'key': self.key, 'dtypes': self.dtypes}, file, indent=2)
+
+def _run_size(run):
+
+    return len(run[1]) + len(run[2])
+
+# Function for indexing batches one after the other, e.g. the chunks of iter_dataset_from_zip or monthly extracts
+def build_duplicate_index(batches, path=None, columns=None, key='appointment_id'):
+    """
+    Builds (or extends) a DuplicateIndex from batches of rows.
+
+    Args:
+        batches (iterable): DataFrames, e.g. the chunks of iter_dataset_from_zip.
+        path (str, optional): Directory of the index, reopened if it exists.
+        columns (list, optional): Columns fingerprinted, every column of the first batch by default.
+        key (str, optional): Column identifying a record, None to only look for exact duplicates.
+
+    Returns:
+        DuplicateIndex: Index with the counts per batch in its report.
+    """
+    index = DuplicateIndex(path, columns=columns, key=key)
+
+    for batch in batches:
+        index.update(batch)
+
+    return index
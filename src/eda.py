@@ -1,12 +1,26 @@
 # Exploratory Data Analysis for Visualizations and summary statistics
 
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 import seaborn as sns
 from matplotlib import pyplot as plt
 
+from .cube import AttendanceCube
+from .instrumentation import instrument
+from .sketches import QuantileSketch
+
+# File next to the rendered figures with the content hash of each one (see render_figures)
+RENDER_CACHE_FILE = '.render_cache.json'
+
 # Missing values for identifying and analyzing missing values within a dataframe
-def missing_values_heatmap(df):
+@instrument
+def missing_values_heatmap(df, output_path=None):
     
     plt.figure(figsize=(15, 7))
     sns.heatmap(df.isna(), cbar=False, cmap='viridis', yticklabels=False)
@@ -14,28 +28,29 @@ def missing_values_heatmap(df):
     plt.xlabel('Columns')
     plt.ylabel('Rows')
     plt.tight_layout()
-    plt.show()
+    _show_or_save(output_path)
 
-# Plot a graph for "N" Boxplots one next to the other
+# Plot a graph for "N" Boxplots one next to the other, each series can also be a QuantileSketch of a streamed column
 # plot_boxplots_vertical(ds_list=[serie1, serie2, serie3], xlabels=['A', 'B', 'C'], ylabel='Valores',
 #                                 title='Title', color=['red', 'green', 'blue'])
-def plot_boxplots(ds_list, xlabels, ylabel, title, yticks_range=None, rotation=0, color='grey'):
+@instrument
+def plot_boxplots(ds_list, xlabels, ylabel, title, yticks_range=None, rotation=0, color='grey', output_path=None):
   
     if len(ds_list) != len(xlabels):
         raise ValueError("*** Error ***   > The data list and labels must be the same length.")
     
-    df = pd.DataFrame({'value': pd.concat(ds_list, ignore_index=True),
-                       'group': sum([[label]*len(s) for label, s in zip(xlabels, ds_list)], [])})
+    # Box statistics per series from a quantile sketch, no concatenation of the data
+    stats = [_box_stats(ds, label) for ds, label in zip(ds_list, xlabels)]
     
     plt.figure(figsize=(15, 7))
-
     
-    # If color is list, assign custom palette; if string, use solid color
-    if isinstance(color, (list, tuple)) and len(color) == len(xlabels):
-        palette = dict(zip(xlabels, color))
-        sns.boxplot(x='group', y='value', data=df, palette=palette)
-    else:
-        sns.boxplot(x='group', y='value', data=df, color=color)
+    # If color is list, one color per box; if string, use solid color
+    colors = color if isinstance(color, (list, tuple)) and len(color) == len(xlabels) else [color] * len(xlabels)
+    
+    boxes = plt.gca().bxp(stats, patch_artist=True, showfliers=True,
+                          medianprops={'color': '#3f3f3f'}, flierprops={'marker': 'd', 'markerfacecolor': '#3f3f3f'})
+    for box, box_color in zip(boxes['boxes'], colors):
+        box.set_facecolor(box_color)
     
     plt.ylabel(ylabel)
     plt.title(title)
@@ -43,28 +58,81 @@ def plot_boxplots(ds_list, xlabels, ylabel, title, yticks_range=None, rotation=0
     
     if yticks_range is not None:
         plt.ylim(yticks_range[0], yticks_range[1])
+        plt.yticks(np.arange(*yticks_range), rotation=rotation)
     
-    plt.yticks(np.arange(*yticks_range), rotation=rotation)
     plt.grid(True)
     
     plt.tight_layout()
-    plt.show()
+    _show_or_save(output_path)
+
+
+# Function for the aggregates the histogram and density plots draw: bin counts, mean, median and an optional KDE
+# summarize_distribution(ds=series1, bins=np.arange(0, 120, 5), kde=True)
+@instrument
+def summarize_distribution(ds, bins=10, kde=False, gridsize=1024, cut=3):
+    """
+    Bins a numeric series once so the plots only draw len(bins) bars.
+
+    Integer series are reduced to their value counts with np.bincount, and the histogram,
+    mean, median (an exact QuantileSketch) and KDE are all computed from those (value, count)
+    pairs; other series use np.histogram and np.median. A QuantileSketch of a streamed column
+    can be summarized too, from its centroids (exact while it holds every distinct value). The KDE is a Gaussian with Scott's bandwidth, like seaborn's
+    kdeplot, evaluated by linear binning on a regular grid and one FFT convolution, so its cost
+    depends on the grid and not on the number of rows.
+
+    Args:
+        ds (pd.Series, array-like or QuantileSketch): Values, missing ones are dropped.
+        bins (int or array-like): Number of bins or bin edges, as in np.histogram.
+        kde (bool): Also compute the KDE curve.
+        gridsize (int): Points of the KDE grid.
+        cut (float): The KDE grid extends cut bandwidths past the extreme values.
+
+    Returns:
+        dict: 'edges', 'counts', 'n', 'mean', 'median' and 'kde' (grid and density arrays, or
+            None when not requested or the values are constant).
+    """
+    values, weights = _value_counts(ds)
+    n = len(values) if weights is None else int(round(weights.sum()))
+
+    if n == 0:
+        edges = np.histogram_bin_edges([], bins=bins)
+        return {'edges': edges, 'counts': np.zeros(len(edges) - 1, dtype=np.int64), 'n': 0,
+                'mean': np.nan, 'median': np.nan, 'kde': None}
+
+    edges = np.histogram_bin_edges(values, bins=bins)
+    counts = np.histogram(values, bins=edges, weights=weights)[0]
+
+    if weights is None:
+        mean = values.mean()
+        median = np.median(values)
+    elif isinstance(ds, QuantileSketch):
+        mean = ds.mean
+        median = ds.quantile(0.5)
+    else:
+        mean = np.dot(values, weights) / n
+        median = QuantileSketch(exact_limit=len(values)).update(values, weights).quantile(0.5)
 
+    summary = {'edges': edges, 'counts': counts.astype(np.int64), 'n': n, 'mean': float(mean), 'median': float(median), 'kde': None}
+
+    if kde:
+        summary['kde'] = _binned_fft_kde(values, weights, n, mean, gridsize, cut)
+
+    return summary
 
 # Plot a Histogram graph
 # plot_histogram(ds=series1, bins=np.arange(0, 1475, 25), color='grey', title='Distribution of Monthly Durations',
 #                xlabel='Duration (minutes)', ylabel='Frequency', xticks_range=(0, 1500, 50), yticks_range=(0, 80, 8))
-def plot_histogram(ds, bins=10, color='grey', title='', xlabel='', ylabel='Frequency', xticks_range=None, yticks_range=None, rotation=0):
+# ds can also be the output of summarize_distribution, then bins is ignored
+@instrument
+def plot_histogram(ds, bins=10, color='grey', title='', xlabel='', ylabel='Frequency', xticks_range=None, yticks_range=None, rotation=0, output_path=None):
 
-    # Make sure no mising values exists
-    ds = ds.dropna()
-    
-    # Media and Mean calculation
-    mean_val = ds.mean()
-    median_val = ds.median()
+    # Bin counts, mean and median in one pass (missing values dropped)
+    summary = _as_summary(ds, bins)
+    mean_val = summary['mean']
+    median_val = summary['median']
 
     plt.figure(figsize=(15, 7))
-    sns.histplot(ds, bins=bins, edgecolor='black', color=color, kde=False)
+    _plot_binned(summary, edgecolor='black', color=color)
 
     # Mean line
     plt.axvline(mean_val, color='red', linestyle='dashed', linewidth=1.5, label=f'Mean: {mean_val:.2f}')
@@ -80,18 +148,24 @@ def plot_histogram(ds, bins=10, color='grey', title='', xlabel='', ylabel='Frequ
     if yticks_range is not None:
         plt.ylim(yticks_range[0], yticks_range[1])
     
-    plt.xticks(np.arange(*xticks_range), rotation=rotation)
-    plt.yticks(np.arange(*yticks_range), rotation=rotation)
+    if xticks_range is not None:
+        plt.xticks(np.arange(*xticks_range), rotation=rotation)
+    if yticks_range is not None:
+        plt.yticks(np.arange(*yticks_range), rotation=rotation)
     plt.legend()
     plt.grid(True)
 
     plt.tight_layout()
-    plt.show()
+    _show_or_save(output_path)
 
-def plot_hue_histogram(df, x_col='', hue_col='', bins=30, title='', xlabel='', ylabel='', legend_title ='', legend_labels=[]):
+@instrument
+def plot_hue_histogram(df, x_col='', hue_col='', bins=30, title='', xlabel='', ylabel='', legend_title ='', legend_labels=[], output_path=None):
+
+    # One row per (hue, bin) with its count instead of the raw rows
+    binned, edges = _bin_by_hue(df[x_col], df[hue_col], bins)
 
     plt.figure(figsize=(15, 7))
-    sns.histplot(data=df, x=x_col, hue=hue_col, multiple='stack', bins=bins)
+    sns.histplot(data=binned, x=x_col, weights='count', hue=hue_col, multiple='stack', bins=list(edges))
     plt.title(title)
     plt.xlabel(xlabel)
     plt.ylabel(ylabel)
@@ -99,26 +173,26 @@ def plot_hue_histogram(df, x_col='', hue_col='', bins=30, title='', xlabel='', y
     
     plt.grid(True)
     plt.tight_layout()
-    plt.show()
+    _show_or_save(output_path)
 
 # Plot_dual_histogram(ages_no_show, ages_showed_up, bins=18, color1='tomato',color2='mediumseagreen', title='Ages Distribution - Show vs No show', xlabel='Age',
 #                     xlabel='Age', ylabel='Patients amount', label1='No Show', label2='Show', xticks_range=(0, 1500, 50), yticks_range=(0, 80, 8))
+@instrument
 def plot_dual_histogram(ds1, ds2, bins=10, color1='black', color2='grey', title='Histogram comparison', xlabel='', ylabel='', 
-                        label1='', label2='', xticks_range=None, yticks_range=None, rotation=0):
+                        label1='', label2='', xticks_range=None, yticks_range=None, rotation=0, output_path=None):
 
-    # Make sure no mising values exists
-    ds1 = ds1.dropna()
-    ds2 = ds2.dropna()
+    # Bin counts, mean and median of each series in one pass (missing values dropped)
+    summary1 = _as_summary(ds1, bins)
+    summary2 = _as_summary(ds2, bins)
     
-    # Media and Mean calculation
-    mean1_val = ds1.mean()
-    median1_val = ds1.median()
-    mean2_val = ds1.mean()
-    median2_val = ds1.median()
+    mean1_val = summary1['mean']
+    median1_val = summary1['median']
+    mean2_val = summary2['mean']
+    median2_val = summary2['median']
 
     plt.figure(figsize=(15, 7))
-    sns.histplot(ds1, bins=bins, edgecolor='black', kde=False, color=color1, label=label1, alpha=0.6)
-    sns.histplot(ds2, bins=bins, edgecolor='black', kde=False, color=color2, label=label2, alpha=0.4)
+    _plot_binned(summary1, edgecolor='black', color=color1, label=label1, alpha=0.6)
+    _plot_binned(summary2, edgecolor='black', color=color2, label=label2, alpha=0.4)
     
     # Mean line
     plt.axvline(mean1_val, color='red', linestyle='dashed', linewidth=1.5, label=f'Mean: {mean1_val:.2f}')
@@ -136,31 +210,35 @@ def plot_dual_histogram(ds1, ds2, bins=10, color1='black', color2='grey', title=
     if yticks_range is not None:
         plt.ylim(yticks_range[0], yticks_range[1])
     
-    plt.xticks(np.arange(*xticks_range), rotation=rotation)
-    plt.yticks(np.arange(*yticks_range), rotation=rotation)
+    if xticks_range is not None:
+        plt.xticks(np.arange(*xticks_range), rotation=rotation)
+    if yticks_range is not None:
+        plt.yticks(np.arange(*yticks_range), rotation=rotation)
     plt.legend()
     plt.grid(True)
 
     plt.tight_layout()
-    plt.show()
+    _show_or_save(output_path)
 
 # Plot a Frequency Density graph
 # plot_frequency_density(ds=series1, bins=np.arange(0, 1200, 50), color='grey', title='Frequency density', xlabel='Duration(minutes)',
 #                        ylabel='Density', xticks_range=(0, 1200, 100), show_kde=True)
-def plot_frequency_density(ds, bins=10, color='grey', title='', xlabel='', ylabel='Density',xticks_range=None, rotation=0, show_kde=True):
+@instrument
+def plot_frequency_density(ds, bins=10, color='grey', title='', xlabel='', ylabel='Density',xticks_range=None, rotation=0, show_kde=True, output_path=None):
 
-    ds = ds.dropna()
-    mean_val = ds.mean()
-    median_val = ds.median()
+    # Bin counts, mean, median and the binned FFT KDE in one pass (missing values dropped)
+    summary = _as_summary(ds, bins, kde=show_kde)
+    mean_val = summary['mean']
+    median_val = summary['median']
 
     plt.figure(figsize=(15, 7))
     
     # Histogram with density instead of frequency
-    sns.histplot(ds, bins=bins, stat='density', edgecolor='black', color=color, alpha=0.7)
+    _plot_binned(summary, stat='density', edgecolor='black', color=color, alpha=0.7)
 
     # Optional KDE overlay
-    if show_kde:
-        sns.kdeplot(ds, color='darkblue', linewidth=2, label='KDE')
+    if show_kde and summary['kde'] is not None:
+        plt.plot(*summary['kde'], color='darkblue', linewidth=2, label='KDE')
 
     # Mean and Median lines
     plt.axvline(mean_val, color='red', linestyle='dashed', linewidth=1.5, label=f'Mean: {mean_val:.2f}')
@@ -172,20 +250,24 @@ def plot_frequency_density(ds, bins=10, color='grey', title='', xlabel='', ylabe
 
     if xticks_range:
         plt.xlim(xticks_range[0], xticks_range[1])
-
-    plt.xticks(np.arange(*xticks_range), rotation=rotation)
+        plt.xticks(np.arange(*xticks_range), rotation=rotation)
     plt.legend()
     plt.grid(True)
         
     plt.tight_layout()
-    plt.show()
+    _show_or_save(output_path)
 
 # Plot a grouped bar plot (3 values X, Y and Hue)
 # plot_grouped_barplot(data=dataframe, x_col='month', y_col='median_duration', hue_col='plan', palette=['black', 'grey'], 
 #                      title='Average Call', xlabel='Month', ylabel='Average Call Duration (min)', xticks_range=range(0, 13, 1),
 #                      yticks_range=range(0, 500, 50), rotation=65)
+# ds can also be an AttendanceCube, its counts by hue_col and x_col are drawn as y_col
+@instrument
 def plot_grouped_barplot(ds, x_col, y_col, hue_col=None, palette=['black', 'grey'], title='', xlabel='', ylabel='', xticks_range=None, 
-                         yticks_range=None, rotation=0):
+                         yticks_range=None, rotation=0, output_path=None):
+
+    if isinstance(ds, AttendanceCube):
+        ds = ds.counts([x_col] if hue_col is None else [hue_col, x_col]).rename(y_col).reset_index()
 
     plt.figure(figsize=(15, 7))
     
@@ -203,12 +285,22 @@ def plot_grouped_barplot(ds, x_col, y_col, hue_col=None, palette=['black', 'grey
     plt.grid(True)
 
     plt.tight_layout()
-    plt.show()
+    _show_or_save(output_path)
 
-def plot_horizontal_bar(ds, colors=['black', 'grey'], xlabel='', ylabel='', title='', xticks_range=None, rotation=0):
+# ds can also be an AttendanceCube of one dimension, e.g. cube.slice(gender='female').rollup('no_show')
+@instrument
+def plot_horizontal_bar(ds, colors=['black', 'grey'], xlabel='', ylabel='', title='', xticks_range=None, rotation=0, output_path=None):
     
-    categories = ds.value_counts().index
-    values = ds.value_counts().values
+    # One value_counts (or a lookup in the cube), most frequent first
+    if isinstance(ds, AttendanceCube):
+        if len(ds.dimensions) != 1:
+            raise ValueError(f"*** Error ***   > The cube must have one dimension, roll it up first: {ds.dimensions}")
+        counts = ds.counts().sort_values(ascending=False, kind='stable')
+    else:
+        counts = ds.value_counts()
+    
+    categories = counts.index
+    values = counts.values
     
     plt.figure(figsize=(15, 7))
     sns.barplot(y=categories, x=values, hue=categories, dodge=False, palette=colors)
@@ -222,4 +314,283 @@ def plot_horizontal_bar(ds, colors=['black', 'grey'], xlabel='', ylabel='', titl
     plt.grid(True)
     
     plt.tight_layout()
-    plt.show()
\ No newline at end of file
+    _show_or_save(output_path)
+
+# Render many figures to files across a process pool, skipping the ones whose inputs did not change
+# render_figures([{'name': f'patients_{n}', 'plot': 'plot_horizontal_bar', 'kwargs': {'ds': group['no_show']}}
+#                 for n, group in df.groupby('neighbourhood')], output_dir='reports/figures', fmt='png')
+@instrument
+def render_figures(specs, output_dir, fmt='png', n_jobs=None, use_cache=True):
+    """
+    Renders eda plots headless (Agg backend) to PNG/SVG files, in parallel.
+
+    Every figure gets a content hash of its plot function, its arguments (pandas and NumPy
+    data hashed by value) and the source of this module; figures whose file exists with the
+    same hash in the cache file of output_dir are not rendered again.
+
+    Args:
+        specs (list): One dict per figure with 'name' (file name without extension), 'plot' (an
+            eda plot function or its name) and 'kwargs' (its arguments, without output_path).
+        output_dir (str): Directory for the figures, created if needed.
+        fmt (str): 'png', 'svg' or any other format supported by matplotlib's savefig.
+        n_jobs (int, optional): Worker processes, all cores by default; 1 renders in this process.
+        use_cache (bool): Skip unchanged figures.
+
+    Returns:
+        pd.DataFrame: name, path, status ('rendered', 'cached' or 'failed'), seconds and error per figure.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cache_path = os.path.join(output_dir, RENDER_CACHE_FILE)
+
+    cache = {}
+    if use_cache and os.path.exists(cache_path):
+        with open(cache_path) as file:
+            cache = json.load(file)
+
+    source_digest = _module_digest()
+    rows, tasks = [], []
+
+    for position, spec in enumerate(specs):
+
+        name = spec['name']
+        plot = spec['plot'] if isinstance(spec['plot'], str) else spec['plot'].__name__
+        if plot not in _PLOT_FUNCTIONS:
+            raise ValueError(f"*** Error ***   > '{plot}' is not an eda plot function.")
+
+        path = os.path.join(output_dir, f"{name}.{fmt}")
+        digest = _spec_digest(plot, spec.get('kwargs', {}), fmt, source_digest)
+
+        if use_cache and cache.get(name) == digest and os.path.exists(path):
+            rows.append((position, {'name': name, 'path': path, 'status': 'cached', 'seconds': 0.0, 'error': None}))
+        else:
+            tasks.append((position, name, plot, spec.get('kwargs', {}), path, digest))
+
+    start = time.perf_counter()
+
+    if tasks:
+
+        arguments = [task[2:5] for task in tasks]
+
+        if n_jobs == 1:
+            backend = plt.get_backend()
+            plt.switch_backend('Agg')
+            try:
+                results = [_render_spec(*argument) for argument in arguments]
+            finally:
+                plt.switch_backend(backend)
+        else:
+            max_workers = min(n_jobs or os.cpu_count(), len(tasks))
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_use_headless_backend) as executor:
+                results = list(executor.map(_render_spec, *zip(*arguments), chunksize=max(1, len(tasks) // (4 * max_workers))))
+
+        for (position, name, _, _, path, digest), (seconds, error) in zip(tasks, results):
+
+            rows.append((position, {'name': name, 'path': path, 'status': 'failed' if error else 'rendered',
+                                    'seconds': seconds, 'error': error}))
+            if error:
+                cache.pop(name, None)
+            else:
+                cache[name] = digest
+
+    if use_cache:
+        with open(cache_path, 'w') as file:
+            json.dump(cache, file, indent=1, sort_keys=True)
+
+    # Rows in the order of specs
+    report = pd.DataFrame([row for _, row in sorted(rows, key=lambda item: item[0])],
+                          columns=['name', 'path', 'status', 'seconds', 'error'])
+    counts = report['status'].value_counts()
+
+    print(f"> Figures: {counts.get('rendered', 0)} rendered, {counts.get('cached', 0)} cached, "
+          f"{counts.get('failed', 0)} failed in {time.perf_counter() - start:.2f} s")
+    for _, failure in report[report['status'] == 'failed'].iterrows():
+        print(f"*** Warning ***   > Figure '{failure['name']}' failed: {failure['error']}")
+
+    return report
+
+def _show_or_save(output_path):
+
+    # With an output path the figure is written (format from the extension) and closed instead of shown
+    if output_path is None:
+        plt.show()
+    else:
+        # Figure.savefig: pyplot.savefig also redraws the canvas afterwards
+        figure = plt.gcf()
+        figure.savefig(output_path)
+        plt.close(figure)
+
+def _use_headless_backend():
+
+    plt.switch_backend('Agg')
+
+def _render_spec(plot, kwargs, path):
+
+    start = time.perf_counter()
+
+    try:
+        _PLOT_FUNCTIONS[plot](**kwargs, output_path=path)
+        error = None
+    except Exception as exception:
+        plt.close('all')
+        error = f"{type(exception).__name__}: {exception}"
+
+    return time.perf_counter() - start, error
+
+# Function for the digest of the plotting code: this module and the helper modules the plots are drawn with,
+# so a change to the cube or the sketches also renders the figures again
+def _module_digest():
+
+    from . import cube, sketches
+
+    digest = hashlib.sha1()
+    for module_path in (__file__, cube.__file__, sketches.__file__):
+        with open(module_path, 'rb') as file:
+            digest.update(file.read())
+
+    return digest.hexdigest()
+
+def _spec_digest(plot, kwargs, fmt, source_digest):
+
+    digest = hashlib.sha1(f"{plot}|{fmt}|{source_digest}".encode())
+
+    for key in sorted(kwargs):
+        digest.update(key.encode())
+        _update_digest(digest, kwargs[key])
+
+    return digest.hexdigest()
+
+def _update_digest(digest, value):
+
+    # Data is hashed by value, with its index, names and dtypes
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        digest.update(repr((type(value).__name__, getattr(value, 'name', None), list(getattr(value, 'columns', [])),
+                            [str(dtype) for dtype in np.atleast_1d(value.dtypes)])).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else repr(value.tolist()).encode())
+    elif isinstance(value, AttendanceCube):
+        _update_digest(digest, (value.dimensions, [list(value.levels[dimension]) for dimension in value.dimensions],
+                                value.cells, value.cell_counts))
+    elif isinstance(value, QuantileSketch):
+        _update_digest(digest, (value.means, value.weights, value.count, value.mean, value.min, value.max))
+    elif isinstance(value, dict):
+        for key in sorted(value, key=repr):
+            digest.update(repr(key).encode())
+            _update_digest(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _update_digest(digest, item)
+    else:
+        digest.update(repr(value).encode())
+
+def _as_summary(ds, bins, kde=False):
+
+    return ds if isinstance(ds, dict) else summarize_distribution(ds, bins=bins, kde=kde)
+
+def _value_counts(ds):
+
+    if isinstance(ds, QuantileSketch):
+        return ds.means, ds.weights
+
+    values = pd.Series(ds).dropna()
+
+    if pd.api.types.is_bool_dtype(values.dtype):
+        values = values.astype(np.int8)
+
+    values = values.to_numpy()
+
+    # Integers over a moderate range collapse to (value, count) pairs in one bincount
+    if values.dtype.kind in 'iu' and len(values):
+        low, high = values.min(), values.max()
+        if int(high) - int(low) <= 10_000_000:
+            counts = np.bincount(values - low)
+            present = np.flatnonzero(counts)
+            return (present + low).astype(np.float64), counts[present]
+
+    return values.astype(np.float64), None
+
+def _box_stats(ds, label):
+
+    if isinstance(ds, QuantileSketch):
+        return ds.box_stats(label)
+
+    values = pd.Series(ds).dropna().to_numpy(dtype=np.float64)
+    if not len(values):
+        return QuantileSketch().box_stats(label)
+
+    # With the values at hand the quartiles, whiskers and fliers are exact, as matplotlib's boxplot_stats
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    is_flier = (values < low) | (values > high)
+    inside = values[~is_flier]
+
+    return {'label': label, 'med': median, 'q1': q1, 'q3': q3,
+            'whislo': min(inside.min(), q1) if len(inside) else q1, 'whishi': max(inside.max(), q3) if len(inside) else q3,
+            'mean': values.mean(), 'fliers': values[is_flier]}
+
+def _binned_fft_kde(values, weights, n, mean, gridsize, cut):
+
+    if weights is None:
+        weights = np.ones(len(values))
+
+    # Sample standard deviation and Scott's factor, as scipy.stats.gaussian_kde (used by seaborn)
+    variance = np.dot(weights, (values - mean) ** 2) / max(n - 1, 1)
+    bandwidth = np.sqrt(variance) * n ** (-1 / 5)
+    if not bandwidth > 0:
+        return None
+
+    grid = np.linspace(values.min() - cut * bandwidth, values.max() + cut * bandwidth, gridsize)
+    step = grid[1] - grid[0]
+
+    # Linear binning: each value splits its weight between the two nearest grid points
+    position = (values - grid[0]) / step
+    lower = np.minimum(np.floor(position).astype(np.int64), gridsize - 2)
+    fraction = position - lower
+    binned = (np.bincount(lower, weights=weights * (1 - fraction), minlength=gridsize)
+              + np.bincount(lower + 1, weights=weights * fraction, minlength=gridsize))
+
+    offsets = np.arange(-(gridsize - 1), gridsize) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+
+    size = 1 << int(np.ceil(np.log2(3 * gridsize)))
+    convolved = np.fft.irfft(np.fft.rfft(binned, size) * np.fft.rfft(kernel, size), size)
+    density = np.maximum(convolved[gridsize - 1:2 * gridsize - 1], 0) / n
+
+    return grid, density
+
+def _plot_binned(summary, stat='count', **kwargs):
+
+    # One weighted observation per bin: seaborn draws the same bars as with the raw values
+    edges = summary['edges']
+    binned = pd.DataFrame({'value': edges[:-1], 'count': summary['counts']})
+    # Edges as a list: seaborn compares bins with 'auto' when weights are given
+    sns.histplot(data=binned, x='value', weights='count', bins=list(edges), stat=stat, kde=False, **kwargs)
+
+def _bin_by_hue(x, hue, bins):
+
+    valid = (x.notna() & hue.notna()).to_numpy()
+    values = x.to_numpy()[valid].astype(np.float64)
+
+    # Levels in the order seaborn uses: appearance for strings, sorted otherwise
+    codes, levels = pd.factorize(hue[valid], sort=hue.dtype != 'object')
+
+    edges = np.histogram_bin_edges(values, bins=bins)
+    inside = (values >= edges[0]) & (values <= edges[-1])
+    values, codes = values[inside], codes[inside]
+
+    # Same bins as np.histogram, the last edge belongs to the last bin
+    bin_index = np.minimum(np.searchsorted(edges, values, side='right') - 1, len(edges) - 2)
+    counts = np.bincount(codes * (len(edges) - 1) + bin_index, minlength=len(levels) * (len(edges) - 1))
+
+    binned = pd.DataFrame({x.name: np.tile(edges[:-1], len(levels)),
+                           hue.name: np.repeat(np.asarray(levels), len(edges) - 1),
+                           'count': counts})
+
+    return binned, edges
+
+# Plot functions render_figures can call by name
+_PLOT_FUNCTIONS = {function.__name__: function for function in [missing_values_heatmap, plot_boxplots, plot_histogram,
+                                                                  plot_hue_histogram, plot_dual_histogram, plot_frequency_density,
+                                                                  plot_grouped_barplot, plot_horizontal_bar]}
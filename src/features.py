@@ -0,0 +1,366 @@
+# features.py for building the no-show feature matrix from the cleaned patients data
+
+import numpy as np
+import pandas as pd
+
+# Columns of the cleaned patients frame (02-cleaning) used by the features
+REQUIRED_COLUMNS = ['patient_id', 'appointment_id', 'scheduled_day', 'appointment_day', 'no_show']
+
+FLAG_COLUMNS = ['scholarship', 'hipertension', 'diabetes', 'alcoholism', 'handcap', 'sms_received']
+
+FEATURE_COLUMNS = ['days_waiting', 'appointment_weekday', 'scheduled_hour', 'age', 'gender_female',
+                   *FLAG_COLUMNS,
+                   'prior_appointments', 'prior_no_shows', 'prior_no_show_rate', 'days_since_last_appointment',
+                   'neighbourhood_no_show_rate']
+
+# Patient history features, also maintained incrementally (see update_patient_feature_state)
+HISTORY_COLUMNS = ['prior_appointments', 'prior_no_shows', 'prior_no_show_rate', 'days_since_last_appointment']
+
+_NANOSECONDS_PER_DAY = 86_400 * 10**9
+
+# Function for computing every no-show feature with compact dtypes, rows in the order of df
+def compute_no_show_features(df):
+    """
+    Computes the no-show features of every appointment with vectorized operations.
+
+    Appointments are sorted once by patient and (appointment_day, scheduled_day, appointment_id).
+    The patient history features and the neighbourhood no-show rate only count appointments
+    on earlier days, whose outcome is known when the row is scheduled, so no feature sees
+    its own target or the outcome of other appointments of the same day.
+
+    Args:
+        df (pd.DataFrame): Cleaned patients data with at least REQUIRED_COLUMNS. The age, gender,
+            neighbourhood and FLAG_COLUMNS features are filled with 0 when their column is missing.
+
+    Returns:
+        pd.DataFrame: FEATURE_COLUMNS plus the 'no_show' target (int8), indexed like df.
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise KeyError(f"*** Error ***   > Missing columns for the features: {missing}")
+
+    appointment_day = _local_nanoseconds(df['appointment_day'])
+    scheduled_day = _local_nanoseconds(df['scheduled_day'])
+    appointment_date = appointment_day // _NANOSECONDS_PER_DAY
+    no_show = _no_show_to_int8(df['no_show'])
+
+    features = _booking_features(df, appointment_day, scheduled_day)
+
+    patient_codes = pd.factorize(df['patient_id'])[0]
+    order = np.lexsort((df['appointment_id'].to_numpy(), scheduled_day, appointment_day, patient_codes))
+
+    history = _patient_history(patient_codes[order], appointment_date[order], no_show[order])
+    for column, values in history.items():
+        column_values = np.empty_like(values)
+        column_values[order] = values
+        features[column] = column_values
+
+    if 'neighbourhood' in df.columns:
+        features['neighbourhood_no_show_rate'] = _prior_days_rate(pd.factorize(df['neighbourhood'])[0], appointment_date, no_show)
+    else:
+        features['neighbourhood_no_show_rate'] = np.zeros(len(df), np.float32)
+
+    features['no_show'] = no_show
+
+    return features
+
+# Function for the model input: a C-contiguous float32 matrix, the int8 target and the feature names
+def build_feature_matrix(df, features=None):
+
+    if features is None:
+        features = FEATURE_COLUMNS
+
+    # Accepts the cleaned data or the output of compute_no_show_features
+    frame = df if set(features).issubset(df.columns) else compute_no_show_features(df)
+
+    matrix = np.empty((len(frame), len(features)), dtype=np.float32, order='C')
+    for position, column in enumerate(features):
+        matrix[:, position] = frame[column].to_numpy()
+
+    return matrix, _no_show_to_int8(frame['no_show']), list(features)
+
+# Function for the features of new bookings, whose outcome is not known yet, from the stored history
+def compute_booking_features(bookings, state=None, neighbourhood_rates=None):
+    """
+    Computes FEATURE_COLUMNS for bookings to be scored, without a 'no_show' column.
+
+    The patient history features are read from the accumulators of update_patient_feature_state
+    and the neighbourhood rate from build_neighbourhood_no_show_rates, so they match what
+    compute_no_show_features gives a booking on a later day than the stored history. The
+    bookings are not added to the state: their outcome is only known after the appointment.
+
+    Args:
+        bookings (pd.DataFrame): Cleaned bookings with at least 'patient_id', 'scheduled_day' and 'appointment_day'.
+        state (pd.DataFrame, optional): Patient accumulators, no history for every patient by default.
+        neighbourhood_rates (pd.Series, optional): No-show rate per neighbourhood, 0 by default.
+
+    Returns:
+        pd.DataFrame: FEATURE_COLUMNS indexed like bookings.
+    """
+    missing = [column for column in ['patient_id', 'scheduled_day', 'appointment_day'] if column not in bookings.columns]
+    if missing:
+        raise KeyError(f"*** Error ***   > Missing columns for the features: {missing}")
+
+    if state is None:
+        state = _empty_patient_feature_state()
+
+    appointment_day = _local_nanoseconds(bookings['appointment_day'])
+    scheduled_day = _local_nanoseconds(bookings['scheduled_day'])
+    date = appointment_day // _NANOSECONDS_PER_DAY
+
+    # NaT is the smallest int64
+    if (appointment_day == np.iinfo(np.int64).min).any() or (scheduled_day == np.iinfo(np.int64).min).any():
+        raise ValueError("*** Error ***   > Bookings without a valid 'scheduled_day' or 'appointment_day'.")
+
+    features = _booking_features(bookings, appointment_day, scheduled_day)
+
+    position = state.index.get_indexer(bookings['patient_id'])
+    known = position >= 0
+    prior_appointments = np.zeros(len(bookings), dtype=np.int32)
+    prior_no_shows = np.zeros(len(bookings), dtype=np.int32)
+    last_date = np.full(len(bookings), -1, dtype=np.int64)
+    prior_appointments[known] = state['appointments'].to_numpy()[position[known]]
+    prior_no_shows[known] = state['no_shows'].to_numpy()[position[known]]
+    last_date[known] = state['last_appointment_date'].to_numpy()[position[known]]
+
+    features['prior_appointments'] = prior_appointments
+    features['prior_no_shows'] = prior_no_shows
+    features['prior_no_show_rate'] = np.where(prior_appointments > 0, prior_no_shows / np.maximum(prior_appointments, 1), 0.0).astype(np.float32)
+    features['days_since_last_appointment'] = np.where(last_date >= 0, date - last_date, -1).astype(np.int32)
+
+    if neighbourhood_rates is not None and 'neighbourhood' in bookings.columns:
+        overall = neighbourhood_rates.attrs.get('overall', 0.0)
+        rates = neighbourhood_rates.reindex(bookings['neighbourhood'].to_numpy()).to_numpy(dtype=np.float32, na_value=overall)
+        features['neighbourhood_no_show_rate'] = rates
+    else:
+        features['neighbourhood_no_show_rate'] = np.zeros(len(bookings), np.float32)
+
+    return features[FEATURE_COLUMNS]
+
+# Function for the no-show rate of every neighbourhood over a known history, used by compute_booking_features
+def build_neighbourhood_no_show_rates(df):
+
+    no_show = _no_show_to_int8(df['no_show'])
+    codes, neighbourhoods = pd.factorize(df['neighbourhood'])
+    counts = np.bincount(codes[codes >= 0], minlength=len(neighbourhoods))
+    no_shows = np.bincount(codes[codes >= 0], weights=no_show[codes >= 0], minlength=len(neighbourhoods))
+
+    rates = pd.Series((no_shows / np.maximum(counts, 1)).astype(np.float32), index=pd.Index(neighbourhoods, name='neighbourhood'),
+                      name='neighbourhood_no_show_rate')
+    # Rate of the neighbourhoods without history, like compute_no_show_features
+    rates.attrs['overall'] = float(no_show.mean()) if len(no_show) else 0.0
+
+    return rates
+
+# Function for the per patient accumulators (appointments, no-shows, last appointment date) of a full history
+def build_patient_feature_state(df):
+
+    return update_patient_feature_state(None, df)[0]
+
+# Function for appending a new batch of appointments: returns the updated state and the history features of the batch
+def update_patient_feature_state(state, batch):
+    """
+    Updates the per patient accumulators with a batch of new appointments.
+
+    The features returned for the batch are identical to the HISTORY_COLUMNS computed by
+    compute_no_show_features over the whole history followed by the batch, provided every
+    appointment of the batch is on a later day than the patient's appointments already in the state.
+
+    Args:
+        state (pd.DataFrame or None): Accumulators indexed by patient_id, with the 'appointments'
+            and 'no_shows' counts and 'last_appointment_date' (days since 1970-01-01, -1 if none).
+            None starts from an empty history.
+        batch (pd.DataFrame): New appointments with at least REQUIRED_COLUMNS.
+
+    Returns:
+        tuple: The updated state and a DataFrame of HISTORY_COLUMNS indexed like batch.
+
+    Raises:
+        ValueError: If an appointment of the batch is not after the patient's last stored day.
+    """
+    if state is None:
+        state = _empty_patient_feature_state()
+
+    appointment_day = _local_nanoseconds(batch['appointment_day'])
+    scheduled_day = _local_nanoseconds(batch['scheduled_day'])
+    date = appointment_day // _NANOSECONDS_PER_DAY
+    no_show = _no_show_to_int8(batch['no_show'])
+
+    codes, patients = pd.factorize(batch['patient_id'])
+    order = np.lexsort((batch['appointment_id'].to_numpy(), scheduled_day, appointment_day, codes))
+
+    # Accumulators of the batch patients, zero for the ones seen for the first time
+    position = state.index.get_indexer(patients)
+    known = position >= 0
+    initial_count = np.zeros(len(patients), dtype=np.int64)
+    initial_no_shows = np.zeros(len(patients), dtype=np.int64)
+    initial_last_date = np.full(len(patients), -1, dtype=np.int64)
+    initial_count[known] = state['appointments'].to_numpy()[position[known]]
+    initial_no_shows[known] = state['no_shows'].to_numpy()[position[known]]
+    initial_last_date[known] = state['last_appointment_date'].to_numpy()[position[known]]
+
+    if (date <= initial_last_date[codes]).any():
+        raise ValueError("*** Error ***   > The batch has appointments on or before the last day of the patient history in the state.")
+
+    sorted_codes = codes[order]
+    history = _patient_history(sorted_codes, date[order], no_show[order],
+                               initial_count[sorted_codes], initial_no_shows[sorted_codes], initial_last_date[sorted_codes])
+
+    features = pd.DataFrame(index=batch.index)
+    for column, values in history.items():
+        column_values = np.empty_like(values)
+        column_values[order] = values
+        features[column] = column_values
+
+    # New accumulators per batch patient: the last row of each patient in sorted order carries the last date
+    counts = initial_count + np.bincount(codes, minlength=len(patients))
+    no_shows = initial_no_shows + np.bincount(codes, weights=no_show, minlength=len(patients)).astype(np.int64)
+    last_of_patient = np.ones(len(order), dtype=bool)
+    last_of_patient[:-1] = sorted_codes[:-1] != sorted_codes[1:]
+    last_date = initial_last_date.copy()
+    last_date[sorted_codes[last_of_patient]] = date[order][last_of_patient]
+
+    appointments_column = state['appointments'].to_numpy().copy()
+    no_shows_column = state['no_shows'].to_numpy().copy()
+    last_date_column = state['last_appointment_date'].to_numpy().copy()
+    appointments_column[position[known]] = counts[known]
+    no_shows_column[position[known]] = no_shows[known]
+    last_date_column[position[known]] = last_date[known]
+
+    state = pd.DataFrame({'appointments': np.concatenate([appointments_column, counts[~known]]).astype(np.int32),
+                          'no_shows': np.concatenate([no_shows_column, no_shows[~known]]).astype(np.int32),
+                          'last_appointment_date': np.concatenate([last_date_column, last_date[~known]]).astype(np.int32)},
+                         index=pd.Index(np.concatenate([state.index.to_numpy(), np.asarray(patients)[~known]]), name='patient_id'))
+
+    return state, features
+
+# Function for saving the patient accumulators as compact NumPy arrays (.npz)
+def save_patient_feature_state(state, path):
+
+    np.savez(path, patient_id=state.index.to_numpy(), appointments=state['appointments'].to_numpy(),
+             no_shows=state['no_shows'].to_numpy(), last_appointment_date=state['last_appointment_date'].to_numpy())
+
+def load_patient_feature_state(path):
+
+    with np.load(path, allow_pickle=False) as arrays:
+        return pd.DataFrame({'appointments': arrays['appointments'],
+                             'no_shows': arrays['no_shows'],
+                             'last_appointment_date': arrays['last_appointment_date']},
+                            index=pd.Index(arrays['patient_id'], name='patient_id'))
+
+def _empty_patient_feature_state():
+
+    return pd.DataFrame({'appointments': np.zeros(0, np.int32),
+                         'no_shows': np.zeros(0, np.int32),
+                         'last_appointment_date': np.zeros(0, np.int32)},
+                        index=pd.Index(np.zeros(0, np.int64), name='patient_id'))
+
+def _booking_features(df, appointment_day, scheduled_day):
+
+    # Features of the booking itself, known when it is scheduled
+    n = len(df)
+    appointment_date = appointment_day // _NANOSECONDS_PER_DAY
+    scheduled_date = scheduled_day // _NANOSECONDS_PER_DAY
+
+    features = pd.DataFrame(index=df.index)
+    features['days_waiting'] = (appointment_date - scheduled_date).astype(np.int16)
+    # 1970-01-01 was a Thursday, Monday is 0 like pandas .dt.weekday
+    features['appointment_weekday'] = ((appointment_date + 3) % 7).astype(np.int8)
+    features['scheduled_hour'] = ((scheduled_day % _NANOSECONDS_PER_DAY) // (3600 * 10**9)).astype(np.int8)
+    features['age'] = df['age'].to_numpy(dtype=np.int16) if 'age' in df.columns else np.zeros(n, np.int16)
+    features['gender_female'] = (_gender_female(df['gender']) if 'gender' in df.columns else np.zeros(n, np.int8))
+
+    for flag in FLAG_COLUMNS:
+        features[flag] = df[flag].to_numpy(dtype=np.int8) if flag in df.columns else np.zeros(n, np.int8)
+
+    return features
+
+def _patient_history(patient, date, no_show, initial_count=None, initial_no_shows=None, initial_last_date=None):
+
+    # Rows are grouped by patient and in chronological order; initial_* carry the history before them, per row
+    n = len(patient)
+    counts = np.zeros(n, dtype=np.int64) if initial_count is None else np.asarray(initial_count, dtype=np.int64)
+    no_shows = np.zeros(n, dtype=np.int64) if initial_no_shows is None else np.asarray(initial_no_shows, dtype=np.int64)
+    last_date = np.full(n, -1, dtype=np.int64) if initial_last_date is None else np.asarray(initial_last_date, dtype=np.int64)
+
+    group_start, day_start = _run_starts(patient, date)
+
+    # Every appointment of a day sees the history as it was at the start of that day
+    no_shows_before = np.cumsum(no_show, dtype=np.int64) - no_show
+    prior_appointments = day_start - group_start + counts[group_start]
+    prior_no_shows = no_shows_before[day_start] - no_shows_before[group_start] + no_shows[group_start]
+
+    previous_date = np.where(day_start > group_start, date[np.maximum(day_start - 1, 0)], last_date[group_start])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(prior_appointments > 0, prior_no_shows / np.maximum(prior_appointments, 1), 0.0)
+
+    return {'prior_appointments': prior_appointments.astype(np.int32),
+            'prior_no_shows': prior_no_shows.astype(np.int32),
+            'prior_no_show_rate': rate.astype(np.float32),
+            'days_since_last_appointment': np.where(previous_date >= 0, date - previous_date, -1).astype(np.int32)}
+
+def _run_starts(group, date):
+
+    # Position of the first row of each row's group, and of its (group, date) run, in sorted arrays
+    n = len(group)
+    first_of_group = np.ones(n, dtype=bool)
+    first_of_group[1:] = group[1:] != group[:-1]
+    first_of_day = first_of_group.copy()
+    first_of_day[1:] |= date[1:] != date[:-1]
+
+    positions = np.arange(n)
+    group_start = np.maximum.accumulate(np.where(first_of_group, positions, 0)) if n else positions
+    day_start = np.maximum.accumulate(np.where(first_of_day, positions, 0)) if n else positions
+
+    return group_start, day_start
+
+def _prior_days_rate(codes, date, no_show):
+
+    # No-show rate of the group over the days before each row, the overall rate of the days before it (0 on the
+    # first day) when the group has no history yet
+    order = np.lexsort((date, codes))
+    sorted_no_show = no_show[order].astype(np.int64)
+    group_start, day_start = _run_starts(codes[order], date[order])
+
+    no_shows_before = np.cumsum(sorted_no_show) - sorted_no_show
+    prior_count = day_start - group_start
+    prior_no_shows = no_shows_before[day_start] - no_shows_before[group_start]
+
+    by_date = np.argsort(date, kind='stable')
+    rows_before = np.searchsorted(date[by_date], date[order], side='left')
+    overall_no_shows = np.concatenate(([0], np.cumsum(no_show[by_date], dtype=np.int64)))[rows_before]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        overall = np.where(rows_before > 0, overall_no_shows / np.maximum(rows_before, 1), 0.0)
+
+    rate = np.empty(len(codes), dtype=np.float32)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate[order] = np.where(prior_count > 0, prior_no_shows / np.maximum(prior_count, 1), overall)
+
+    return rate
+
+def _local_nanoseconds(series):
+
+    if not pd.api.types.is_datetime64_any_dtype(series.dtype):
+        series = pd.to_datetime(series)
+
+    # Wall clock time in the column's timezone, so days and hours match .dt accessors
+    if series.dt.tz is not None:
+        series = series.dt.tz_localize(None)
+
+    return series.dt.as_unit('ns').to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+def _no_show_to_int8(series):
+
+    if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_numeric_dtype(series.dtype):
+        return series.to_numpy(dtype=np.int8)
+
+    values = series.astype(str).str.lower().map({'yes': 1, 'no': 0, 'true': 1, 'false': 0, '1': 1, '0': 0})
+    if values.isna().any():
+        raise ValueError(f"*** Error ***   > Unexpected no_show values: {series[values.isna()].unique()[:5]}")
+
+    return values.to_numpy(dtype=np.int8)
+
+def _gender_female(series):
+
+    return series.astype(str).str.lower().isin(['female', 'f']).to_numpy(dtype=np.int8)
@@ -0,0 +1,353 @@
+# hypothesis_tests.py for testing the association of every factor with no-shows, overall and within every neighbourhood,
+# from contingency tables counted in one pass over the appointments
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+from scipy import special
+
+from .features import _NANOSECONDS_PER_DAY, _local_nanoseconds, _no_show_to_int8
+
+# Factors of the cleaned patients frame tested by default, 'waiting_time' is binned from the days waiting
+NO_SHOW_FACTORS = ['gender', 'scholarship', 'hipertension', 'diabetes', 'alcoholism', 'handcap', 'sms_received', 'waiting_time']
+
+# Lower edges in days of the waiting time bins, the last bin is open ended
+WAITING_TIME_BINS = [0, 1, 3, 8, 15, 31, 61]
+
+# Rows coded at a time by the counting pass
+_CHUNK_ROWS = 1_000_000
+
+# Resamples per task, fixed so the results only depend on random_state and not on the number of workers
+_RESAMPLES_PER_TASK = 250
+
+# Function for the shows and no-shows of every factor level, overall and per group, as DataFrames
+def build_contingency_tables(df, factors=None, by='neighbourhood', waiting_bins=None):
+    """
+    Counts shows and no-shows per level of every factor and group of `by`, in one np.bincount pass.
+
+    Args:
+        df (pd.DataFrame): Cleaned patients data with 'no_show' and the factor columns.
+        factors (list, optional): Columns to count, the NO_SHOW_FACTORS by default. 'waiting_time'
+            bins 'days_waiting', or the days between 'scheduled_day' and 'appointment_day'.
+        by (str, optional): Column of the groups, e.g. 'neighbourhood'; None for the overall tables only.
+        waiting_bins (list, optional): Lower edges in days of the 'waiting_time' bins, WAITING_TIME_BINS by default.
+
+    Returns:
+        dict: A DataFrame of 'shows' and 'no_shows' per factor, indexed by level (by (group, level)
+            with `by`, NaN for the rows without a group), non empty levels only. With `by`, its
+            own entry counts every group.
+    """
+    groups, levels, tables, totals = _count_tables(df, *_resolve_factors(factors, by), waiting_bins)
+    group_index = groups.append(pd.Index([np.nan]))
+    result = {}
+
+    for factor, counts in tables.items():
+
+        index = pd.Index(levels[factor], name=factor)
+        if by is not None:
+            index = pd.MultiIndex.from_product([group_index, index], names=[by, factor])
+        counts = counts.reshape(-1, 2)
+        result[factor] = pd.DataFrame(counts, index=index, columns=['shows', 'no_shows'])[counts.sum(1) > 0]
+
+    if by is not None:
+        result[by] = pd.DataFrame(totals[:-1], index=groups.rename(by), columns=['shows', 'no_shows'])
+
+    return result
+
+# Function for the chi-square test of every factor and group, with multiple testing correction and resampled intervals
+def run_hypothesis_tests(df, factors=None, by='neighbourhood', waiting_bins=None, n_resamples=1000, confidence=0.95,
+                         alpha=0.05, n_jobs=None, random_state=0):
+    """
+    Tests the association of every factor with no-shows, overall and within every group, as array operations.
+
+    The contingency tables (levels x show/no-show) are counted in one pass, then every test of
+    the battery is computed at once over the stacked tables:
+
+    - each factor over every row, and within each group of `by` (e.g. sms_received in every
+      neighbourhood);
+    - `by` itself over every row, and each of its groups against the other ones.
+
+    Pearson's chi-square (equal to the squared z of the two proportion test for 2 levels) is
+    corrected for the whole battery with Bonferroni and Benjamini-Hochberg. With resamples,
+    the confidence intervals come from a stratified bootstrap: resampling the rows of a level
+    with replacement draws its no-shows from a binomial, so B resamples cost B draws per table
+    cell instead of B passes over the rows. The permutation p-values shuffle the outcomes over
+    the rows of a table: the no-shows of each level are then hypergeometric. The resamples
+    are drawn in tasks of a fixed size over a process pool, the results do not depend on n_jobs.
+    Cramer's V cannot be negative, its intervals lean upward for weak associations.
+
+    Args:
+        df (pd.DataFrame): Cleaned patients data with 'no_show' and the factor columns.
+        factors (list, optional): Columns to test, the NO_SHOW_FACTORS by default.
+        by (str, optional): Column of the groups, None for the overall tests only.
+        waiting_bins (list, optional): Lower edges in days of the 'waiting_time' bins, WAITING_TIME_BINS by default.
+        n_resamples (int): Bootstrap and permutation resamples per test, 0 for the chi-square tests only.
+        confidence (float): Level of the bootstrap percentile intervals.
+        alpha (float): False discovery rate of the 'significant' column.
+        n_jobs (int, optional): Worker processes, all cores by default; 1 resamples in this process.
+        random_state (int): Seed of the resampling.
+
+    Returns:
+        pd.DataFrame: One row per test with 'factor' and 'group' (NaN for the tests over every row),
+            the non empty 'levels', 'rows' and 'no_show_rate' of the table, 'chi2', 'dof', 'p_value',
+            'cramers_v', 'rate_difference' (2 levels only: no-show rate of the second sorted level
+            minus the first, e.g. True - False, or the group minus the other groups), 'p_bonferroni',
+            'p_bh' and 'significant'. With resamples, also 'permutation_p_value' and the
+            '_low'/'_high' bounds of 'rate_difference' and 'cramers_v'.
+
+    Example:
+        tests = run_hypothesis_tests(df_patients_clean, n_resamples=2000)
+        tests[tests['significant'] & tests['group'].isna()].sort_values('cramers_v', ascending=False)
+    """
+    factors, by = _resolve_factors(factors, by)
+    groups, _, tables, totals = _count_tables(df, factors, by, waiting_bins)
+
+    # Blocks of tables with the same number of levels, stacked along the first axis
+    blocks, labels = [], []
+    for factor, counts in tables.items():
+        blocks.append(np.concatenate([counts.sum(0, keepdims=True), counts[:-1]]) if by is not None else counts.sum(0, keepdims=True))
+        labels.append(pd.DataFrame({'factor': factor, 'group': [np.nan, *groups]}) if by is not None else
+                      pd.DataFrame({'factor': [factor], 'group': [np.nan]}))
+
+    if by is not None:
+        # Rows of the groups against the rows of the other groups, the second level being the group
+        known = totals[:-1]
+        blocks.append(known[None])
+        blocks.append(np.stack([known.sum(0) - known, known], axis=1))
+        labels.append(pd.DataFrame({'factor': [by], 'group': [np.nan]}))
+        labels.append(pd.DataFrame({'factor': by, 'group': groups}))
+
+    result = pd.concat(labels, ignore_index=True)
+    stacked = [_table_statistics(block) for block in blocks]
+    for column in stacked[0]:
+        result[column] = np.concatenate([statistics[column] for statistics in stacked])
+
+    result['p_bonferroni'] = _bonferroni(result['p_value'].to_numpy())
+    result['p_bh'] = _benjamini_hochberg(result['p_value'].to_numpy())
+    result['significant'] = result['p_bh'].to_numpy() <= alpha
+
+    if n_resamples:
+        for column, values in _resample_tests(blocks, n_resamples, confidence, n_jobs, random_state).items():
+            result[column] = values
+
+    return result
+
+def _resolve_factors(factors, by):
+
+    factors = NO_SHOW_FACTORS if factors is None else ([factors] if isinstance(factors, str) else list(factors))
+
+    # Within its own groups a factor has a single level, `by` is tested group against group instead
+    return [factor for factor in factors if factor != by], by
+
+# Function for counting every table in one pass: per factor an array (groups + 1, levels, 2), the last group holding
+# the rows without a group, and the (groups + 1, 2) rows per group
+def _count_tables(df, factors, by, waiting_bins):
+
+    required = ['no_show', *([by] if by is not None else []), *(factor for factor in factors if factor != 'waiting_time')]
+    missing = [column for column in required if column not in df.columns]
+    if 'waiting_time' in factors and 'days_waiting' not in df.columns:
+        missing += [column for column in ['scheduled_day', 'appointment_day'] if column not in df.columns]
+    if missing:
+        raise KeyError(f"*** Error ***   > Missing columns for the tests: {missing}")
+
+    no_show = _no_show_to_int8(df['no_show'])
+
+    if by is None:
+        group_codes, groups = np.zeros(len(df), dtype=np.int32), pd.Index([])
+    else:
+        group_codes, groups = _factorize(df[by])
+
+    codes, levels = {}, {}
+    for factor in factors:
+        if factor == 'waiting_time':
+            codes[factor], levels[factor] = _waiting_time_codes(df, WAITING_TIME_BINS if waiting_bins is None else waiting_bins)
+        else:
+            codes[factor], levels[factor] = _factorize(df[factor])
+
+    # One slot per level plus one for missing values, and a last single slot counting the rows of each group
+    sizes = [len(levels[factor]) + 1 for factor in factors] + [1]
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    width = int(sum(sizes))
+    counts = np.zeros((len(groups) + 1) * width * 2, dtype=np.int64)
+
+    for start in range(0, len(df), _CHUNK_ROWS):
+
+        stop = min(start + _CHUNK_ROWS, len(df))
+        base = group_codes[start:stop].astype(np.int64) * (2 * width) + no_show[start:stop]
+        stacked = np.concatenate([base + 2 * (offsets[position] + codes[factor][start:stop])
+                                  for position, factor in enumerate(factors)] + [base + 2 * offsets[-1]])
+        counts += np.bincount(stacked, minlength=len(counts))
+
+    counts = counts.reshape(len(groups) + 1, width, 2)
+    tables = {factor: counts[:, offsets[position]:offsets[position] + len(levels[factor])]
+              for position, factor in enumerate(factors)}
+
+    return groups, levels, tables, counts[:, offsets[-1]]
+
+def _factorize(series):
+
+    # Sorted levels, missing values get the code after the last level
+    codes, labels = pd.factorize(series, sort=True)
+    codes = np.where(codes < 0, len(labels), codes).astype(np.int32)
+
+    return codes, pd.Index(labels)
+
+def _waiting_time_codes(df, bins):
+
+    bins = np.asarray(bins, dtype=np.int64)
+
+    if 'days_waiting' in df.columns:
+        days = df['days_waiting'].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(days)
+        days = np.where(valid, days, -1).astype(np.int64)
+    else:
+        # Calendar days like compute_no_show_features, NaT is the smallest int64
+        appointment_day = _local_nanoseconds(df['appointment_day'])
+        scheduled_day = _local_nanoseconds(df['scheduled_day'])
+        valid = (appointment_day != np.iinfo(np.int64).min) & (scheduled_day != np.iinfo(np.int64).min)
+        days = appointment_day // _NANOSECONDS_PER_DAY - scheduled_day // _NANOSECONDS_PER_DAY
+
+    # Waits before the first edge (booked after the appointment) are missing
+    codes = np.searchsorted(bins, days, side='right') - 1
+    codes = np.where(valid & (codes >= 0), codes, len(bins)).astype(np.int32)
+
+    labels = [str(low) if high - 1 == low else f'{low}-{high - 1}' for low, high in zip(bins[:-1], bins[1:])] + [f'{bins[-1]}+']
+
+    return codes, pd.Index(labels, name='waiting_time')
+
+# Function for Pearson's chi-square of tables (..., levels, 2), the empty levels and outcomes not counting in the degrees of freedom
+def _chi_square(tables):
+
+    tables = tables.astype(np.float64)
+    rows = tables.sum(-1)
+    outcomes = tables.sum(-2)
+    n = rows.sum(-1)
+
+    expected = rows[..., :, None] * outcomes[..., None, :] / np.maximum(n, 1)[..., None, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        chi2 = np.where(expected > 0, (tables - expected) ** 2 / expected, 0).sum((-2, -1))
+
+    dof = np.maximum(((rows > 0).sum(-1) - 1) * ((outcomes > 0).sum(-1) - 1), 0)
+
+    # With 2 outcomes min(levels - 1, outcomes - 1) is 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cramers_v = np.where(dof > 0, np.sqrt(chi2 / n), np.nan)
+
+    return chi2, dof, cramers_v
+
+def _rate_difference(tables):
+
+    if tables.shape[-2] != 2:
+        return np.full(tables.shape[:-2], np.nan)
+
+    rows = tables.sum(-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = tables[..., 1] / rows
+
+    return rates[..., 1] - rates[..., 0]
+
+def _table_statistics(tables):
+
+    chi2, dof, cramers_v = _chi_square(tables)
+    rows = tables.sum((-2, -1))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        no_show_rate = tables[..., 1].sum(-1) / rows
+
+    return {'levels': (tables.sum(-1) > 0).sum(-1), 'rows': rows, 'no_show_rate': no_show_rate,
+            'chi2': np.where(dof > 0, chi2, np.nan), 'dof': dof,
+            'p_value': np.where(dof > 0, special.chdtrc(np.maximum(dof, 1), chi2), np.nan),
+            'cramers_v': cramers_v, 'rate_difference': _rate_difference(tables)}
+
+def _bonferroni(p_values):
+
+    return np.minimum(p_values * np.count_nonzero(~np.isnan(p_values)), 1)
+
+def _benjamini_hochberg(p_values):
+
+    adjusted = np.full(len(p_values), np.nan)
+    tested = np.flatnonzero(~np.isnan(p_values))
+    order = tested[np.argsort(p_values[tested], kind='stable')]
+
+    # p * m / rank, made monotonic from the largest p-value down
+    scaled = p_values[order] * len(order) / np.arange(1, len(order) + 1)
+    adjusted[order] = np.minimum(np.minimum.accumulate(scaled[::-1])[::-1], 1)
+
+    return adjusted
+
+# Function for the bootstrap intervals and permutation p-values of every test, the resamples spread over a process pool
+def _resample_tests(blocks, n_resamples, confidence, n_jobs, random_state):
+
+    sizes = [min(_RESAMPLES_PER_TASK, n_resamples - start) for start in range(0, n_resamples, _RESAMPLES_PER_TASK)]
+    seeds = np.random.SeedSequence(random_state).spawn(len(sizes))
+    max_workers = min(n_jobs or os.cpu_count(), len(sizes))
+
+    if max_workers == 1:
+        outputs = list(map(_resample_blocks, repeat(blocks), sizes, seeds))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            outputs = list(executor.map(_resample_blocks, repeat(blocks), sizes, seeds))
+
+    # Per block: the resampled rate differences and Cramer's V of every task, and the permutation exceedances
+    differences = np.concatenate([np.concatenate([output[block][0] for output in outputs]) for block in range(len(blocks))], axis=1)
+    cramers_v = np.concatenate([np.concatenate([output[block][1] for output in outputs]) for block in range(len(blocks))], axis=1)
+    exceeding = np.concatenate([sum(output[block][2] for output in outputs) for block in range(len(blocks))])
+
+    tail = (1 - confidence) / 2
+    result = {'permutation_p_value': (exceeding + 1) / (n_resamples + 1)}
+    for name, values in (('rate_difference', differences), ('cramers_v', cramers_v)):
+        result[f'{name}_low'], result[f'{name}_high'] = _percentiles(values, [tail, 1 - tail])
+
+    # Tests without degrees of freedom have no p-value
+    result['permutation_p_value'][np.concatenate([_chi_square(block)[1] for block in blocks]) == 0] = np.nan
+
+    return result
+
+def _percentiles(values, quantiles):
+
+    bounds = np.full((len(quantiles), values.shape[1]), np.nan)
+    defined = ~np.isnan(values).all(0)
+    if defined.any():
+        bounds[:, defined] = np.nanquantile(values[:, defined], quantiles, axis=0)
+
+    return bounds
+
+def _resample_blocks(blocks, n_resamples, seed):
+
+    rng = np.random.default_rng(seed)
+    output = []
+
+    for tables in blocks:
+
+        tables = tables.astype(np.int64)
+        rows = tables.sum(-1)
+        no_shows = tables[..., 1]
+        observed = _chi_square(tables)[0]
+
+        # Stratified bootstrap: the rows of each level drawn with replacement, their no-shows are binomial
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = np.where(rows > 0, no_shows / np.maximum(rows, 1), 0)
+        drawn = rng.binomial(rows, rates, size=(n_resamples, *rows.shape))
+        bootstrap = np.stack([rows - drawn, drawn], axis=-1)
+
+        # Permutation: the outcomes shuffled over the rows of the table, level by level without replacement
+        remaining_no_shows = np.repeat(no_shows.sum(-1)[None], n_resamples, axis=0)
+        remaining_rows = np.repeat(rows.sum(-1)[None], n_resamples, axis=0)
+        permuted = np.empty((n_resamples, *rows.shape), dtype=np.int64)
+        for level in range(rows.shape[-1] - 1):
+            permuted[..., level] = rng.hypergeometric(remaining_no_shows, remaining_rows - remaining_no_shows,
+                                                      np.broadcast_to(rows[:, level], remaining_rows.shape))
+            remaining_no_shows -= permuted[..., level]
+            remaining_rows -= rows[:, level]
+        permuted[..., -1] = remaining_no_shows
+        permuted_chi2 = _chi_square(np.stack([rows - permuted, permuted], axis=-1))[0]
+
+        # Relative tolerance so a resample equal to the observed table counts as at least as extreme
+        exceeding = (permuted_chi2 >= observed * (1 - 1e-9)).sum(0)
+
+        output.append((_rate_difference(bootstrap), _chi_square(bootstrap)[2], exceeding))
+
+    return output
@@ -0,0 +1,262 @@
+# instrumentation.py for tracing the wall time, CPU time, rows and memory of the data_loader, data_cleaning and eda calls
+
+import contextlib
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import pandas as pd
+
+# Trace recording the calls, None when instrumentation is off (see InstrumentationTrace)
+_ACTIVE = None
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+class InstrumentationTrace:
+    """
+    Records every instrumented call made while it is active, as a structured trace.
+
+    Functions decorated with instrument() (the public functions of data_loader, data_cleaning
+    and eda, and CleaningPipeline.run) add one event per call: wall and CPU seconds, rows and
+    columns of the DataFrame/Series received and returned, the parent call and the time spent
+    per column. With memory=True the peak memory allocated during each call is also recorded
+    with tracemalloc, which makes the traced calls several times slower. When no trace is active
+    the decorated functions only pay one global lookup per call.
+
+    Only calls from the thread that entered the trace are recorded.
+
+    Args:
+        name (str): Name of the run, stored in the trace.
+        memory (bool): Record the peak bytes allocated per call with tracemalloc.
+
+    Example:
+        with InstrumentationTrace('02-cleaning', memory=True) as trace:
+            df_patients.columns = normalize_headers_string_format(df_patients.columns)
+            normalize_df_string_format(df_patients)
+        trace.save('reports/traces/02-cleaning.json')
+        print(trace.summary(top=10))
+    """
+
+    def __init__(self, name='run', memory=False):
+
+        self.name = name
+        self.memory = memory
+        self.events = []
+        self.started = None
+        self.wall_seconds = 0.0
+        self._stack = []
+        self._thread = None
+        self._start = None
+        self._started_tracing = False
+
+    def __enter__(self):
+
+        global _ACTIVE
+
+        if _ACTIVE is not None:
+            raise ValueError(f"*** Error ***   > The trace '{_ACTIVE.name}' is already active, traces cannot be nested.")
+
+        self.events = []
+        self._stack = []
+        self._thread = threading.get_ident()
+        self._started_tracing = self.memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+        self.started = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self._start = time.perf_counter()
+        _ACTIVE = self
+
+        return self
+
+    def __exit__(self, *exc_info):
+
+        global _ACTIVE
+
+        _ACTIVE = None
+        self.wall_seconds = time.perf_counter() - self._start
+
+        if self._started_tracing:
+            tracemalloc.stop()
+
+        return False
+
+    def _call(self, function, name, args, kwargs):
+
+        parent = self._stack[-1] if self._stack else None
+        event = {'id': len(self.events), 'parent': parent['id'] if parent else None, 'depth': len(self._stack),
+                 'function': name, 'start': time.perf_counter() - self._start, 'wall_seconds': None,
+                 'cpu_seconds': None, **_shape('in', _first_frame(args, kwargs)), 'rows_out': None,
+                 'columns_out': None, 'peak_bytes': None, 'column_seconds': {}, 'error': None}
+        self.events.append(event)
+        self._stack.append(event)
+
+        if self.memory:
+            base, outer_peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            event['_child_peak'] = 0
+
+        wall = time.perf_counter()
+        cpu = time.process_time()
+
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as error:
+            event['error'] = f"{type(error).__name__}: {error}"
+            raise
+        finally:
+            event['wall_seconds'] = time.perf_counter() - wall
+            event['cpu_seconds'] = time.process_time() - cpu
+            self._stack.pop()
+
+            # A nested call resets the peak: its own peak, and the one before it, are carried to the parent
+            if self.memory:
+                peak = max(tracemalloc.get_traced_memory()[1], event.pop('_child_peak'))
+                event['peak_bytes'] = max(peak - base, 0)
+                if parent is not None:
+                    parent['_child_peak'] = max(parent['_child_peak'], peak, outer_peak)
+
+        event.update(_shape('out', result[0] if isinstance(result, tuple) and result else result))
+
+        return result
+
+    # Function for the trace as a JSON serializable dict
+    def to_dict(self):
+
+        return {'name': self.name, 'started': self.started, 'wall_seconds': self.wall_seconds, 'memory': self.memory,
+                'events': [{key: value for key, value in event.items() if not key.startswith('_')} for event in self.events]}
+
+    def save(self, path):
+
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=1)
+
+        return path
+
+    def summary(self, top=None):
+
+        return summarize_trace(self, top=top)
+
+# Function for the decorator: records the calls of func while an InstrumentationTrace is active
+def instrument(func):
+
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+
+        trace = _ACTIVE
+        if trace is None or trace._thread != threading.get_ident():
+            return func(*args, **kwargs)
+
+        return trace._call(func, name, args, kwargs)
+
+    return wrapper
+
+# Function for timing the work on one column inside an instrumented call, e.g. with column_timer(column): ...
+def column_timer(column):
+
+    trace = _ACTIVE
+    if trace is None or not trace._stack or trace._thread != threading.get_ident():
+        return _NULL_CONTEXT
+
+    return _ColumnTimer(trace._stack[-1], column)
+
+class _ColumnTimer:
+
+    def __init__(self, event, column):
+
+        self.event = event
+        self.column = str(column)
+
+    def __enter__(self):
+
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+
+        seconds = self.event['column_seconds']
+        seconds[self.column] = seconds.get(self.column, 0.0) + time.perf_counter() - self.start
+
+        return False
+
+# Function for ranking the functions of a trace (or a saved JSON trace) by the time spent in them
+def summarize_trace(trace, top=None):
+    """
+    Aggregates the events of a trace per function, hottest first.
+
+    Args:
+        trace (InstrumentationTrace, dict or str): A trace, its to_dict() output or the path of a saved trace.
+        top (int, optional): Number of functions to keep, all by default.
+
+    Returns:
+        pd.DataFrame: Per function: calls, total and self wall seconds (without the instrumented calls
+            made inside), CPU seconds, share of the run's wall time, rows handled, largest peak
+            memory (MB, when recorded) and the column that took the longest, sorted by self time.
+    """
+    if isinstance(trace, InstrumentationTrace):
+        trace = trace.to_dict()
+    elif isinstance(trace, str):
+        with open(trace) as file:
+            trace = json.load(file)
+
+    columns = ['calls', 'wall_seconds', 'self_seconds', 'cpu_seconds', 'share', 'rows', 'peak_mb', 'hottest_column']
+    events = pd.DataFrame(trace['events'])
+    if events.empty:
+        return pd.DataFrame(columns=columns).rename_axis('function')
+
+    # Self time: the wall time minus the one of the direct instrumented children
+    children = events.dropna(subset=['parent']).groupby('parent')['wall_seconds'].sum()
+    events['self_seconds'] = events['wall_seconds'] - events['id'].map(children).fillna(0.0)
+
+    # Rows handled by a call: the ones it received, or the ones it returned for the loaders
+    events['rows'] = events[['rows_in', 'rows_out']].astype('float64').max(axis=1)
+
+    column_seconds = {}
+    for function, seconds in zip(events['function'], events['column_seconds']):
+        for column, value in seconds.items():
+            column_seconds.setdefault(function, {}).setdefault(column, 0.0)
+            column_seconds[function][column] += value
+
+    grouped = events.groupby('function')
+    summary = pd.DataFrame({'calls': grouped.size(),
+                            'wall_seconds': grouped['wall_seconds'].sum(),
+                            'self_seconds': grouped['self_seconds'].sum(),
+                            'cpu_seconds': grouped['cpu_seconds'].sum(),
+                            'rows': grouped['rows'].sum(min_count=1).astype('Int64')})
+    summary['share'] = summary['self_seconds'] / trace['wall_seconds'] if trace['wall_seconds'] else float('nan')
+    summary['peak_mb'] = grouped['peak_bytes'].max() / 2**20 if trace['memory'] else float('nan')
+    summary['hottest_column'] = [_hottest(column_seconds.get(function)) for function in summary.index]
+
+    summary = summary[columns].sort_values('self_seconds', ascending=False)
+
+    return summary if top is None else summary.head(top)
+
+def _hottest(seconds):
+
+    if not seconds:
+        return None
+
+    column = max(seconds, key=seconds.get)
+
+    return f"{column} ({seconds[column]:.3f} s)"
+
+def _first_frame(args, kwargs):
+
+    for value in (*args, *kwargs.values()):
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return value
+
+    return None
+
+def _shape(direction, value):
+
+    if isinstance(value, pd.DataFrame):
+        return {f'rows_{direction}': len(value), f'columns_{direction}': value.shape[1]}
+    if isinstance(value, pd.Series):
+        return {f'rows_{direction}': len(value), f'columns_{direction}': 1}
+
+    return {f'rows_{direction}': None, f'columns_{direction}': None}
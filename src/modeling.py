@@ -0,0 +1,177 @@
+# modeling.py for training and cross-validating no-show classifiers on the engineered features
+
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import average_precision_score, log_loss, roc_auc_score
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+# Default candidates: name -> (estimator, parameter grid)
+DEFAULT_CANDIDATES = {
+    'logistic_regression': (make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000)),
+                            {'logisticregression__C': [0.1, 1.0]}),
+    'gradient_boosting': (HistGradientBoostingClassifier(random_state=0),
+                          {'learning_rate': [0.05, 0.1], 'max_leaf_nodes': [31, 63]}),
+}
+
+# Set in every worker process by _open_shared_matrix
+_SHARED = {}
+
+# Function for cross-validating every candidate and parameter combination in a process pool
+def cross_validate_no_show_models(X, y, candidates=None, n_splits=5, n_jobs=None, random_state=0, work_dir=None):
+    """
+    Cross-validates no-show classifiers with folds and parameter candidates run in parallel.
+
+    X and y are written once to a .npy file that every worker opens memory-mapped, so each
+    task only receives the candidate, its parameters and the fold number. The rows are stored
+    fold by fold, followed by every fold but the last once more, so the training rows of any
+    fold (the folds after it, wrapping around) and its test rows are contiguous slices of the
+    memory map: workers fit and score on views of the shared file instead of copies.
+
+    Args:
+        X (np.ndarray): Feature matrix, e.g. from build_feature_matrix.
+        y (np.ndarray): Binary no-show target.
+        candidates (dict, optional): name -> (estimator, parameter grid or None), DEFAULT_CANDIDATES by default.
+        n_splits (int): Number of stratified folds.
+        n_jobs (int, optional): Worker processes, all cores by default.
+        random_state (int): Seed of the fold shuffling.
+        work_dir (str, optional): Directory for the shared memory-mapped files, a temporary one by default.
+
+    Returns:
+        tuple: Per fold results (scores, fit and score times, peak resident memory of the worker
+            during the fold, Linux only) and the mean scores per candidate and parameters, best ROC AUC first.
+    """
+    if candidates is None:
+        candidates = DEFAULT_CANDIDATES
+
+    tasks = []
+    for name, (estimator, grid) in candidates.items():
+        for params in ParameterGrid(grid or {}):
+            for fold in range(n_splits):
+                tasks.append((name, estimator, params, fold))
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+
+        x_path, y_path = os.path.join(tmp, 'X.npy'), os.path.join(tmp, 'y.npy')
+        bounds = _write_fold_major_matrix(X, y, x_path, y_path, n_splits, random_state)
+
+        max_workers = n_jobs or os.cpu_count()
+        start = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_open_shared_matrix,
+                                 initargs=(x_path, y_path, bounds)) as executor:
+            rows = list(executor.map(_run_fold, *zip(*tasks)))
+
+        elapsed = time.perf_counter() - start
+
+    results = pd.DataFrame(rows)
+    results.attrs['wall_time_s'] = elapsed
+
+    summary = (results.groupby(['candidate', 'params'], sort=False)
+                      [['roc_auc', 'average_precision', 'log_loss', 'fit_time_s']].mean()
+                      .sort_values('roc_auc', ascending=False))
+
+    print(f"> {len(tasks)} fits on {max_workers} workers in {elapsed:.2f} s")
+
+    return results, summary
+
+# Function for fitting the chosen candidate on the whole matrix
+def train_no_show_model(X, y, estimator, params=None):
+
+    model = clone(estimator).set_params(**(params or {}))
+
+    return model.fit(X, y)
+
+def _write_fold_major_matrix(X, y, x_path, y_path, n_splits, random_state, block=1 << 18):
+
+    X, y = np.asarray(X), np.asarray(y, dtype=np.int8)
+    splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    test_folds = [test_index for _, test_index in splitter.split(np.zeros(len(y)), y)]
+
+    # Folds 0..k-1, then folds 0..k-2 again: fold i trains on the next k-1 folds, one contiguous run
+    sizes = np.array([len(test_index) for test_index in test_folds])
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    order = np.concatenate(test_folds)
+    order = np.concatenate((order, order[:len(y) - sizes[-1]]))
+
+    shared = np.lib.format.open_memmap(x_path, mode='w+', dtype=np.float32, shape=(len(order), X.shape[1]))
+    for start in range(0, len(order), block):
+        shared[start:start + block] = X[order[start:start + block]]
+    shared.flush()
+    del shared
+    np.save(y_path, y[order])
+
+    return [(int(offsets[fold + 1]), int(offsets[fold + 1] + len(y) - sizes[fold]), int(offsets[fold]), int(offsets[fold + 1]))
+            for fold in range(n_splits)]
+
+def _open_shared_matrix(x_path, y_path, bounds):
+
+    # One thread per worker process, the parallelism comes from the pool
+    try:
+        from threadpoolctl import threadpool_limits
+        _SHARED['thread_limits'] = threadpool_limits(1)
+    except ImportError:
+        pass
+
+    _SHARED['X'] = np.load(x_path, mmap_mode='r')
+    _SHARED['y'] = np.load(y_path, mmap_mode='r')
+    _SHARED['bounds'] = bounds
+
+def _run_fold(name, estimator, params, fold):
+
+    X, y = _SHARED['X'], _SHARED['y']
+    train_start, train_stop, test_start, test_stop = _SHARED['bounds'][fold]
+
+    model = clone(estimator).set_params(**params)
+    _reset_peak_rss()
+
+    start = time.perf_counter()
+    model.fit(X[train_start:train_stop], y[train_start:train_stop])
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    probabilities = model.predict_proba(X[test_start:test_stop])[:, 1]
+    score_time = time.perf_counter() - start
+
+    y_test = np.asarray(y[test_start:test_stop])
+
+    return {'candidate': name,
+            'params': repr(params),
+            'fold': fold,
+            'roc_auc': roc_auc_score(y_test, probabilities),
+            'average_precision': average_precision_score(y_test, probabilities),
+            'log_loss': log_loss(y_test, probabilities, labels=[0, 1]),
+            'fit_time_s': fit_time,
+            'score_time_s': score_time,
+            'fold_peak_rss_mb': _peak_rss_mb(),
+            'worker_pid': os.getpid()}
+
+# Peak resident memory is reset before every fold, the pool reuses its processes (Linux only, NaN elsewhere)
+def _reset_peak_rss():
+
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+    except OSError:
+        pass
+
+def _peak_rss_mb():
+
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    return np.nan
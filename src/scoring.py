@@ -0,0 +1,233 @@
+# scoring.py for scoring new bookings with a trained no-show model, one by one or through a micro-batching server
+
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+
+from .cleaning_pipeline import CleaningPipeline
+from .data_cleaning import normalize_headers_string_format
+from .features import FEATURE_COLUMNS, compute_booking_features
+
+# Cleaning of the raw booking records, the 02-cleaning steps that touch the features
+SCORING_STEPS = ['normalize_df_string_format',
+                 ('standardize_gender_values', {'include': ['gender']}),
+                 ('replace_string_values_datetime', {'include': ['scheduled_day', 'appointment_day'],
+                                                     'frmt': "%Y_%m_%dT%H_%M_%SZ"})]
+
+class NoShowScoringServer:
+    """
+    Scores bookings as they are made, coalescing concurrent requests into vectorized batches.
+
+    Every request waits in a queue; the batching task takes the first waiting booking and keeps
+    collecting until max_batch_size bookings or max_latency_ms have passed, then cleans the whole
+    batch with one CleaningPipeline run, computes its features with compute_booking_features and
+    calls the model once. The pipeline and model run in a worker thread, so new requests keep
+    queueing for the next batch meanwhile.
+
+    The TCP protocol is one JSON object per line in both directions: a raw booking (the columns of
+    the Kaggle file, e.g. {"Patient Id": ..., "Scheduled Day": "2016-04-29T18:38:08Z", ...}) and
+    {"no_show_probability": p} or {"error": message}. Responses on a connection come in request
+    order, so clients may pipeline requests.
+
+    Args:
+        model: Fitted classifier with predict_proba, trained on build_feature_matrix(df, features).
+        state (pd.DataFrame, optional): Patient accumulators from build_patient_feature_state.
+        neighbourhood_rates (pd.Series, optional): Output of build_neighbourhood_no_show_rates.
+        features (list, optional): Feature columns of the model, FEATURE_COLUMNS by default.
+        max_batch_size (int): Most bookings scored together.
+        max_latency_ms (float): Longest time the first booking of a batch waits for others.
+        steps (list, optional): CleaningPipeline steps for the raw records, SCORING_STEPS by default.
+
+    Example:
+        server = NoShowScoringServer(model, state, rates, max_batch_size=256, max_latency_ms=5)
+        asyncio.run(server.serve_forever(port=8765))
+    """
+
+    def __init__(self, model, state=None, neighbourhood_rates=None, features=None, max_batch_size=256, max_latency_ms=5.0, steps=None):
+
+        if max_batch_size < 1:
+            raise ValueError("*** Error ***   > max_batch_size must be at least 1.")
+
+        self.model = model
+        self.state = state
+        self.neighbourhood_rates = neighbourhood_rates
+        self.features = list(FEATURE_COLUMNS if features is None else features)
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.pipeline = CleaningPipeline(SCORING_STEPS if steps is None else steps)
+        self.stats = {'requests': 0, 'batches': 0, 'errors': 0}
+        self._queue = None
+        self._batcher = None
+        self._server = None
+
+    # Function for scoring a batch of raw bookings in one vectorized pass
+    def score_bookings(self, bookings):
+
+        df = pd.DataFrame.from_records(bookings) if not isinstance(bookings, pd.DataFrame) else bookings.copy()
+        df.columns = normalize_headers_string_format(df.columns)
+        df = self.pipeline.run(df)
+
+        features = compute_booking_features(df, self.state, self.neighbourhood_rates)
+        matrix = np.ascontiguousarray(features[self.features].to_numpy(dtype=np.float32))
+
+        return self.model.predict_proba(matrix)[:, 1]
+
+    # Function for scoring one booking through the micro-batches
+    async def score(self, booking):
+
+        if self._queue is None:
+            self._start_batcher()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((booking, future))
+
+        return await future
+
+    async def start(self, host='127.0.0.1', port=8765):
+
+        self._start_batcher()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self, host='127.0.0.1', port=8765):
+
+        address = await self.start(host, port)
+        print(f"> Scoring bookings on {address[0]}:{address[1]} (batches of up to {self.max_batch_size}, "
+              f"{self.max_latency * 1000:g} ms max wait)")
+
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+            self._batcher = None
+            self._queue = None
+
+    def _start_batcher(self):
+
+        if self._batcher is None:
+            self._queue = asyncio.Queue()
+            self._batcher = asyncio.get_running_loop().create_task(self._batch_loop())
+
+    async def _batch_loop(self):
+
+        loop = asyncio.get_running_loop()
+
+        while True:
+
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_latency
+
+            while len(batch) < self.max_batch_size:
+
+                # Take what is already queued before waiting for more
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._run_batch(batch)
+
+    async def _run_batch(self, batch):
+
+        bookings = [booking for booking, _ in batch]
+        loop = asyncio.get_running_loop()
+
+        try:
+            results = list(await loop.run_in_executor(None, self.score_bookings, bookings))
+        except Exception:
+            # One bad booking must not fail the others: score them one at a time
+            results = await loop.run_in_executor(None, self._score_one_by_one, bookings)
+
+        self.stats['requests'] += len(batch)
+        self.stats['batches'] += 1
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                self.stats['errors'] += 1
+                future.set_exception(result)
+            else:
+                future.set_result(float(result))
+
+    def _score_one_by_one(self, bookings):
+
+        results = []
+
+        for booking in bookings:
+            try:
+                results.append(self.score_bookings([booking])[0])
+            except Exception as error:
+                results.append(error)
+
+        return results
+
+    async def _handle_connection(self, reader, writer):
+
+        responses = asyncio.Queue()
+        writer_task = asyncio.create_task(self._write_responses(responses, writer))
+
+        try:
+            while line := await reader.readline():
+                await responses.put(asyncio.ensure_future(self._respond(line)))
+        except ConnectionError:
+            pass
+        finally:
+            await responses.put(None)
+            await writer_task
+            writer.close()
+
+    async def _respond(self, line):
+
+        try:
+            booking = json.loads(line)
+            if not isinstance(booking, dict):
+                raise ValueError("a booking must be a JSON object")
+            return {'no_show_probability': await self.score(booking)}
+        except Exception as error:
+            return {'error': f"{type(error).__name__}: {error}"}
+
+    @staticmethod
+    async def _write_responses(responses, writer):
+
+        while (response := await responses.get()) is not None:
+
+            try:
+                writer.write(json.dumps(await response).encode() + b'\n')
+                await writer.drain()
+            except ConnectionError:
+                return
+
+# Function for running a scoring server until interrupted
+def serve_no_show_scores(model, state=None, neighbourhood_rates=None, host='127.0.0.1', port=8765, **kwargs):
+
+    server = NoShowScoringServer(model, state, neighbourhood_rates, **kwargs)
+
+    try:
+        asyncio.run(server.serve_forever(host, port))
+    except KeyboardInterrupt:
+        print("> Scoring server stopped")
+
+    return server.stats
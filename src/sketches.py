@@ -0,0 +1,239 @@
+# sketches.py for mergeable quantile summaries of numeric columns, fed chunk by chunk
+
+import numpy as np
+import pandas as pd
+
+class QuantileSketch:
+    """
+    Mergeable t-digest style quantile sketch with exact count, mean, variance, min and max.
+
+    Values are kept as (mean, weight) centroids sorted by value. While a column has at most
+    exact_limit distinct values (ages, flags, counts) every centroid is one distinct value and
+    the quantiles equal pandas' linear interpolation exactly; past that, the centroids are
+    merged with the t-digest k1 scale, small near the tails and large around the median, so the
+    sketch keeps about compression / 2 centroids whatever the number of rows.
+
+    Args:
+        compression (int): t-digest delta, higher is more accurate and larger.
+        exact_limit (int): Most distinct values kept without merging.
+
+    Example:
+        sketch = QuantileSketch()
+        for chunk in iter_dataset_from_zip(zip_path, filename, chunksize=100_000, sep='|'):
+            sketch.update(chunk['Age'])
+        q1, median, q3 = sketch.quantile([0.25, 0.5, 0.75])
+    """
+
+    def __init__(self, compression=400, exact_limit=1000):
+
+        self.compression = compression
+        self.exact_limit = exact_limit
+        self.means = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.count = 0
+        self.mean = np.nan
+        self.min = np.nan
+        self.max = np.nan
+        self.exact = True
+        self._m2 = 0.0
+
+    def update(self, values, weights=None):
+
+        values = np.asarray(values, dtype=np.float64).ravel()
+        weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=np.float64).ravel()
+
+        # Missing values are skipped, like pandas
+        valid = ~np.isnan(values)
+        if not valid.all():
+            values, weights = values[valid], weights[valid]
+
+        if not len(values) or not weights.sum():
+            return self
+
+        count = weights.sum()
+        mean = np.dot(values, weights) / count
+        m2 = np.dot(weights, (values - mean) ** 2)
+        self._combine_moments(count, mean, m2, values.min(), values.max())
+        self._add_centroids(values, weights, exact=True)
+
+        return self
+
+    def merge(self, other):
+
+        if other.count:
+            self._combine_moments(other.count, other.mean, other._m2, other.min, other.max)
+            self._add_centroids(other.means, other.weights, exact=other.exact)
+
+        return self
+
+    # Function for one or several quantiles, q in [0, 1]
+    def quantile(self, q):
+
+        q = np.asarray(q, dtype=np.float64)
+        if not self.count:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+
+        cumulative = np.cumsum(self.weights)
+
+        if self.exact:
+            # Linear interpolation between the ranks around (n - 1) * q, as pandas and NumPy
+            position = (self.count - 1) * q
+            lower = np.floor(position)
+            lower_value = self.means[np.searchsorted(cumulative, lower, side='right')]
+            upper_value = self.means[np.searchsorted(cumulative, np.ceil(position), side='right')]
+            result = lower_value + (position - lower) * (upper_value - lower_value)
+        else:
+            # Each centroid sits at the middle of its weight, the extremes are exact
+            centers = np.concatenate([[0.0], cumulative - self.weights / 2, [self.count]])
+            values = np.concatenate([[self.min], self.means, [self.max]])
+            result = np.interp(q * self.count, centers, values)
+
+        return float(result) if not q.ndim else result
+
+    @property
+    def std(self):
+
+        return np.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else np.nan
+
+    # Function for the lower and upper outlier bounds: Tukey fences (Q1/Q3 -/+ factor * IQR) or mean -/+ factor * std
+    def outlier_bounds(self, method='iqr', factor=None):
+
+        if method == 'iqr':
+            q1, q3 = self.quantile([0.25, 0.75])
+            factor = 1.5 if factor is None else factor
+            return q1 - factor * (q3 - q1), q3 + factor * (q3 - q1)
+
+        if method == 'sigma':
+            factor = 3 if factor is None else factor
+            return self.mean - factor * self.std, self.mean + factor * self.std
+
+        raise ValueError(f"*** Error ***   > Unknown outlier method '{method}', use 'iqr' or 'sigma'.")
+
+    # Function for the statistics matplotlib's Axes.bxp draws, whiskers at the last value inside the Tukey fences
+    def box_stats(self, label=None, whis=1.5, fliers=None):
+
+        q1, median, q3 = self.quantile([0.25, 0.5, 0.75])
+        low, high = self.outlier_bounds('iqr', whis)
+
+        inside = self.means[(self.means >= low) & (self.means <= high)]
+        whislo = inside.min() if len(inside) else q1
+        whishi = inside.max() if len(inside) else q3
+
+        return {'label': label, 'med': median, 'q1': q1, 'q3': q3, 'whislo': min(whislo, q1), 'whishi': max(whishi, q3),
+                'mean': self.mean, 'fliers': np.asarray([] if fliers is None else fliers, dtype=np.float64)}
+
+    def _combine_moments(self, count, mean, m2, minimum, maximum):
+
+        # Chan et al. parallel variance
+        if not self.count:
+            self.count, self.mean, self._m2, self.min, self.max = count, mean, m2, minimum, maximum
+            return
+
+        total = self.count + count
+        delta = mean - self.mean
+        self._m2 += m2 + delta ** 2 * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    def _add_centroids(self, means, weights, exact):
+
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+
+        # Equal values always share one centroid
+        means, inverse = np.unique(means, return_inverse=True)
+        weights = np.bincount(inverse.ravel(), weights=weights, minlength=len(means))
+
+        self.exact = self.exact and exact and len(means) <= self.exact_limit
+
+        if not self.exact and len(means) > self.compression:
+            means, weights = self._compress(means, weights)
+
+        self.means, self.weights = means, weights
+
+    def _compress(self, means, weights):
+
+        # t-digest k1 scale: centroids whose middle falls in the same unit of k are merged
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        bucket = np.floor(k - k[0]).astype(np.int64)
+
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        merged_weights = np.add.reduceat(weights, starts)
+        merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+
+        return merged_means, merged_weights
+
+# Function for sketching a column of a DataFrame, or of an iterable of chunks, overall or per group
+def build_quantile_sketches(data, column, by=None, compression=400):
+    """
+    Builds quantile sketches of a numeric column in one pass over the data.
+
+    Args:
+        data (pd.DataFrame or iterable): DataFrame or chunks, e.g. from iter_dataset_from_zip.
+        column (str): Numeric column to sketch.
+        by (str, optional): Grouping column, one sketch per group.
+        compression (int): t-digest delta of every sketch.
+
+    Returns:
+        QuantileSketch or dict: The sketch of the column, or {group: sketch} with by.
+    """
+    sketches = {}
+
+    for chunk in ([data] if isinstance(data, pd.DataFrame) else data):
+
+        if by is None:
+            sketches.setdefault(None, QuantileSketch(compression)).update(chunk[column])
+            continue
+
+        codes, groups = pd.factorize(chunk[by])
+        values = chunk[column].to_numpy(dtype=np.float64)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(groups) + 1))
+
+        for position, group in enumerate(groups):
+            sketches.setdefault(group, QuantileSketch(compression)).update(values[order[bounds[position]:bounds[position + 1]]])
+
+    if by is None:
+        return sketches.get(None, QuantileSketch(compression))
+
+    return sketches
+
+# Function for the rows outside the IQR (Tukey) or 3-sigma bounds of a column
+def find_outliers(data, column=None, method='iqr', factor=None, sketch=None):
+    """
+    Returns the outlier rows of a Series, a DataFrame column or the chunks of a streamed dataset.
+
+    The bounds come from a QuantileSketch (built here in a first pass when not given, so an
+    iterable of chunks needs the sketch), then one pass keeps the rows outside them.
+
+    Args:
+        data (pd.Series, pd.DataFrame or iterable): Values, or rows with column.
+        column (str, optional): Column of the DataFrame or chunks.
+        method (str): 'iqr' for Q1 - factor * IQR / Q3 + factor * IQR (factor 1.5 by default),
+            'sigma' for mean -/+ factor * std (factor 3 by default).
+        factor (float, optional): Width of the bounds.
+        sketch (QuantileSketch, optional): Sketch of the whole column.
+
+    Returns:
+        pd.Series or pd.DataFrame: The outliers, in the order of the data.
+    """
+    is_frame = isinstance(data, (pd.Series, pd.DataFrame))
+
+    if sketch is None:
+        if not is_frame:
+            raise ValueError("*** Error ***   > An iterable of chunks needs the sketch of the column, see build_quantile_sketches.")
+        sketch = QuantileSketch().update(data if column is None else data[column])
+
+    low, high = sketch.outlier_bounds(method, factor)
+    outliers = []
+
+    for chunk in ([data] if is_frame else data):
+
+        values = chunk if column is None else chunk[column]
+        outliers.append(chunk[((values < low) | (values > high)).to_numpy()])
+
+    return pd.concat(outliers) if len(outliers) > 1 else outliers[0]
@@ -0,0 +1,348 @@
+# validation.py for checking the cleaned patients data against declarative rules and repairing the violations in bulk
+
+import numpy as np
+import pandas as pd
+
+from .data_cleaning import _whole_number_mask
+from .duplicates import DuplicateIndex
+from .features import _local_nanoseconds
+from .sketches import QuantileSketch
+
+# Rules of the cleaned patients frame (02-cleaning): the -1 age is imputed with the mean age like the notebook,
+# bookings made after their appointment day and repeated appointments are dropped
+PATIENT_RULES = [('range', {'column': 'age', 'min': 0, 'max': 115, 'repair': 'impute', 'fill': 'mean'}),
+                 ('integer', {'column': 'age'}),
+                 ('allowed', {'column': 'gender', 'values': ['female', 'male']}),
+                 ('allowed', {'column': 'handcap', 'values': [0, 1, 2, 3, 4]}),
+                 ('order', {'before': 'scheduled_day', 'after': 'appointment_day', 'unit': 'D', 'repair': 'drop'}),
+                 ('unique', {'column': 'appointment_id', 'repair': 'drop'})]
+
+# Repairs each kind of rule accepts, None only flags the rows
+_REPAIRS = {'range': ('clip', 'impute', 'drop'),
+            'allowed': ('impute', 'drop'),
+            'integer': ('impute', 'drop'),
+            'order': ('drop',),
+            'unique': ('drop',)}
+
+_REPAIRED = {'clip': 'clipped', 'impute': 'imputed', 'drop': 'dropped'}
+
+class ValidationRules:
+    """
+    Declarative validation rules, evaluated in one vectorized pass into a violation bitmap.
+
+    Every rule is compiled once into a vectorized check of its columns and gets a bit: row i
+    violates rule k when bit k of violations[i] is set, so the result of the whole rule set is
+    one unsigned integer per row (uint8 up to 8 rules). Missing values violate no rule. The
+    repairs are applied in bulk from the bitmap: clipped or imputed columns are assigned once,
+    and the rows of every 'drop' rule are removed together. Rules see the values before any
+    repair.
+
+    Kinds of rules, as (kind, kwargs) tuples:
+
+    - 'range': 'column' within 'min' and/or 'max', or outside the 'outliers' bounds ('iqr' or
+      'sigma', with an optional 'factor') of a QuantileSketch given as 'sketch' (built from
+      the frame otherwise, chunks need it). Repairs: 'clip', 'impute', 'drop'.
+    - 'allowed': 'column' in 'values'. Repairs: 'impute', 'drop'.
+    - 'integer': 'column' holds whole numbers. Repairs: 'impute', 'drop'.
+    - 'order': 'before' <= 'after' for date columns, compared per 'unit' (e.g. 'D' for calendar
+      days) when given. Repair: 'drop'.
+    - 'unique': no repeated value of 'column' (or of the 'columns' together), the first
+      occurrence is valid. Repair: 'drop'.
+
+    Every rule takes an optional 'name' and 'repair'. 'impute' fills with 'fill': a value, or
+    'mean', 'median' (numbers, the default) or 'mode' (the default otherwise) of the valid
+    values, cast to the column dtype. On chunks the statistics are the chunk's, a value gives
+    the same repairs whatever the chunking.
+
+    Args:
+        rules (list): (kind, kwargs) tuples, see PATIENT_RULES.
+
+    Example:
+        rules = ValidationRules(PATIENT_RULES)
+        violations = rules.evaluate(df_patients)
+        rules.violation_index(violations)['range:age']
+        df_patients = rules.repair(df_patients, violations)
+        print(rules.report)
+    """
+
+    def __init__(self, rules):
+
+        self.rules = [_compile_rule(kind, kwargs) for kind, kwargs in rules]
+
+        names = [rule['name'] for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError(f"*** Error ***   > Rule names have to be unique: {names}")
+        if len(self.rules) > 64:
+            raise ValueError("*** Error ***   > At most 64 rules fit in the violation bitmap.")
+
+        self.dtype = np.min_scalar_type(1 << max(len(self.rules) - 1, 0))
+        self._counts = {}
+
+    @property
+    def report(self):
+
+        rows = [[rule['kind'], ', '.join(rule['columns']), rule['repair'], *self._counts.get(rule['name'], [0, 0, 0])]
+                for rule in self.rules]
+
+        return pd.DataFrame(rows, index=pd.Index([rule['name'] for rule in self.rules], name='rule'),
+                            columns=['kind', 'columns', 'repair', 'violations', 'repaired', 'dropped'])
+
+    # Function for the violation bitmap of a DataFrame
+    def evaluate(self, df):
+        """
+        Evaluates every rule over the rows of df.
+
+        Args:
+            df (pd.DataFrame): Rows to check.
+
+        Returns:
+            pd.Series: 'violations' bitmap indexed like df, bit k set when the row violates rule k.
+        """
+        self._counts = {}
+
+        return self._evaluate(df)
+
+    # Function for the rows violating each rule, from a bitmap of evaluate
+    def violation_index(self, violations):
+
+        bits = violations.to_numpy()
+
+        return {rule['name']: violations.index[(bits >> position) & 1 == 1] for position, rule in enumerate(self.rules)}
+
+    # Function for applying the repairs of the rules to the violating rows
+    def repair(self, df, violations=None):
+        """
+        Repairs df in bulk: clipped and imputed columns are assigned back, rows to drop are removed at once.
+
+        Args:
+            df (pd.DataFrame): Rows to repair, modified in place.
+            violations (pd.Series, optional): Bitmap of evaluate(df), evaluated here by default.
+
+        Returns:
+            pd.DataFrame: Repaired rows, without the dropped ones.
+        """
+        if violations is None:
+            violations = self.evaluate(df)
+
+        return self._repair(df, violations)
+
+    # Function for validating streamed chunks, the uniqueness rules spanning every chunk seen so far
+    def validate_chunks(self, chunks, repair=True):
+        """
+        Evaluates (and repairs) chunk by chunk, e.g. the chunks of iter_dataset_from_zip.
+
+        A value repeated in a later chunk violates a 'unique' rule like in the concatenated frame:
+        the values seen are kept as 64-bit hashes in a DuplicateIndex. The counts of the report
+        add up over the chunks.
+
+        Args:
+            chunks (iterable): DataFrames to validate.
+            repair (bool): Yields the repaired chunks; False yields them as is.
+
+        Yields:
+            tuple: The chunk and its violation bitmap.
+        """
+        self._counts = {}
+        seen = {rule['name']: DuplicateIndex(columns=rule['columns'], key=None) for rule in self.rules if rule['kind'] == 'unique'}
+
+        for chunk in chunks:
+
+            violations = self._evaluate(chunk, seen)
+
+            yield (self._repair(chunk, violations) if repair else chunk), violations
+
+    def _evaluate(self, df, seen=None):
+
+        missing = sorted({column for rule in self.rules for column in rule['columns'] if column not in df.columns})
+        if missing:
+            raise KeyError(f"*** Error ***   > Missing columns for the rules: {missing}")
+
+        violations = np.zeros(len(df), dtype=self.dtype)
+
+        for position, rule in enumerate(self.rules):
+
+            if rule['kind'] == 'unique' and seen is not None:
+                mask = (seen[rule['name']].update(df) == 'duplicate').to_numpy()
+            else:
+                mask = _CHECKS[rule['kind']](df, rule, seen is not None)
+
+            violations |= mask.astype(self.dtype) << self.dtype.type(position)
+            self._counts.setdefault(rule['name'], [0, 0, 0])[0] += int(np.count_nonzero(mask))
+
+        return pd.Series(violations, index=df.index, name='violations')
+
+    def _repair(self, df, violations):
+
+        bits = violations.to_numpy()
+        drop = np.zeros(len(df), dtype=bool)
+
+        for position, rule in enumerate(self.rules):
+
+            mask = (bits >> position) & 1 == 1
+            if rule['repair'] is None or not mask.any():
+                continue
+
+            counts = self._counts.setdefault(rule['name'], [0, 0, 0])
+
+            if rule['repair'] == 'drop':
+                drop |= mask
+                counts[2] += int(np.count_nonzero(mask))
+            else:
+                column = rule['columns'][0]
+                df[column] = _repair_series(df[column], mask, rule)
+                counts[1] += int(np.count_nonzero(mask))
+
+        return df[~drop] if drop.any() else df
+
+def _compile_rule(kind, kwargs):
+
+    if kind not in _REPAIRS:
+        raise ValueError(f"*** Error ***   > '{kind}' is not a rule kind: {list(_REPAIRS)}")
+
+    rule = dict(kwargs, kind=kind, repair=kwargs.get('repair'))
+
+    if kind == 'order':
+        rule['columns'] = [kwargs['before'], kwargs['after']]
+    elif kind == 'unique' and 'columns' in kwargs:
+        rule['columns'] = list(kwargs['columns'])
+    else:
+        rule['columns'] = [kwargs['column']]
+
+    if rule['repair'] is not None and rule['repair'] not in _REPAIRS[kind]:
+        raise ValueError(f"*** Error ***   > '{rule['repair']}' is not a repair of '{kind}' rules: {list(_REPAIRS[kind])}")
+
+    if kind == 'range' and kwargs.get('min') is None and kwargs.get('max') is None and kwargs.get('outliers') is None:
+        raise ValueError(f"*** Error ***   > The range rule on {rule['columns'][0]} needs a 'min', a 'max' or 'outliers'.")
+
+    separator = '<=' if kind == 'order' else '+'
+    rule.setdefault('name', f"{kind}:{separator.join(rule['columns'])}")
+
+    return rule
+
+def _range_bounds(series, rule, chunked):
+
+    if rule.get('outliers') is None:
+        return rule.get('min'), rule.get('max')
+
+    sketch = rule.get('sketch')
+    if sketch is None:
+        if chunked:
+            raise ValueError("*** Error ***   > Outlier bounds of chunks need the sketch of the column, see build_quantile_sketches.")
+        sketch = QuantileSketch().update(series)
+
+    return sketch.outlier_bounds(rule['outliers'], rule.get('factor'))
+
+def _check_range(df, rule, chunked):
+
+    series = df[rule['columns'][0]]
+    low, high = _range_bounds(series, rule, chunked)
+    mask = np.zeros(len(series), dtype=bool)
+
+    if low is not None:
+        mask |= (series < low).to_numpy(dtype=bool, na_value=False)
+    if high is not None:
+        mask |= (series > high).to_numpy(dtype=bool, na_value=False)
+
+    return mask
+
+def _check_allowed(df, rule, chunked):
+
+    series = df[rule['columns'][0]]
+
+    return (~series.isin(list(rule['values'])) & series.notna()).to_numpy(dtype=bool, na_value=False)
+
+def _check_integer(df, rule, chunked):
+
+    series = df[rule['columns'][0]]
+
+    if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_integer_dtype(series.dtype):
+        return np.zeros(len(series), dtype=bool)
+
+    # Text that is not a number is not whole either
+    numeric = series if pd.api.types.is_float_dtype(series.dtype) else pd.to_numeric(series, errors='coerce')
+    values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+    mask = ~_whole_number_mask(values)
+
+    if numeric is not series:
+        mask |= np.isnan(values) & series.notna().to_numpy()
+
+    return mask
+
+def _check_order(df, rule, chunked):
+
+    # Wall clock nanoseconds like the features, NaT is the smallest int64
+    before = _local_nanoseconds(df[rule['columns'][0]])
+    after = _local_nanoseconds(df[rule['columns'][1]])
+    valid = (before != np.iinfo(np.int64).min) & (after != np.iinfo(np.int64).min)
+
+    step = pd.Timedelta(1, unit=rule['unit']).value if rule.get('unit') else 1
+
+    return valid & (after // step < before // step)
+
+def _check_unique(df, rule, chunked):
+
+    return df.duplicated(subset=rule['columns'], keep='first').to_numpy()
+
+_CHECKS = {'range': _check_range,
+           'allowed': _check_allowed,
+           'integer': _check_integer,
+           'order': _check_order,
+           'unique': _check_unique}
+
+def _repair_series(series, mask, rule):
+
+    if rule['repair'] == 'clip':
+        low, high = _range_bounds(series, rule, chunked=False)
+        return series.clip(low, high)
+
+    fill = rule.get('fill', 'median' if pd.api.types.is_numeric_dtype(series.dtype) else 'mode')
+    valid = series[~mask].dropna()
+
+    if fill == 'mean':
+        value = valid.mean()
+    elif fill == 'median':
+        value = valid.median()
+    elif fill == 'mode':
+        value = valid.mode().iloc[0] if len(valid) else np.nan
+    else:
+        value = fill
+
+    if rule['kind'] == 'integer' and isinstance(value, float):
+        value = round(value)
+
+    # Truncated for integer columns, like df.loc[99832, 'age'] = average_age.astype('int') in 02-cleaning
+    if pd.api.types.is_integer_dtype(series.dtype) and not pd.isna(value):
+        value = np.asarray(value).astype(series.dtype).item()
+
+    return series.mask(mask, value)
+
+# Function for checking (and repairing) a DataFrame against the rules, PATIENT_RULES by default
+def validate_dataset(df, rules=None, repair=True):
+    """
+    Evaluates the rules over df, prints the violations and applies the repairs.
+
+    Args:
+        df (pd.DataFrame): Cleaned patients data.
+        rules (list or ValidationRules, optional): Rules, PATIENT_RULES by default.
+        repair (bool): Applies the repairs of the rules.
+
+    Returns:
+        tuple: The repaired DataFrame (df itself without repairs) and the violation bitmap indexed like df.
+    """
+    if not isinstance(rules, ValidationRules):
+        rules = ValidationRules(PATIENT_RULES if rules is None else rules)
+
+    violations = rules.evaluate(df)
+    if repair:
+        df = rules.repair(df, violations)
+
+    for name, row in rules.report.iterrows():
+
+        if not row['violations']:
+            continue
+
+        print(f"*** Warning ***   > {row['violations']} rows violate [{name}]")
+        if row['repaired'] or row['dropped']:
+            print(f"> {row['repaired'] or row['dropped']} rows {_REPAIRED[row['repair']]}\n")
+
+    return df, violations
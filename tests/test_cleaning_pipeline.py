@@ -0,0 +1,32 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src import cleaning_pipeline
+from src.cleaning_pipeline import CleaningPipeline
+
+_run_shared_partition = cleaning_pipeline._run_shared_partition
+
+# Worker that fails on the partition holding the 'broken' row, the others run normally
+def _failing_partition(name, sizes, steps, column_spec):
+
+    if (cleaning_pipeline._load_shared_object(name, sizes)['name'] == 'broken').any():
+        raise ValueError("broken partition")
+
+    return _run_shared_partition(name, sizes, steps, column_spec)
+
+def _shared_blocks():
+
+    return set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()
+
+def test_failed_partition_leaves_no_shared_memory(monkeypatch):
+
+    df = pd.DataFrame({'name': ['Centro', 'Bonfim', 'Itararé', 'broken'] * 25})
+    monkeypatch.setattr(cleaning_pipeline, '_run_shared_partition', _failing_partition)
+    before = _shared_blocks()
+
+    with pytest.raises(ValueError, match='broken partition'):
+        CleaningPipeline(['normalize_df_string_format']).run_partitioned(df, n_jobs=2, partitions=4, partition_by='name')
+
+    assert _shared_blocks() == before
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from src.data_cleaning import compact_dtypes
+from src.data_quality import profile_data_quality
+
+def test_compact_dtypes_with_a_profile_gives_every_chunk_the_same_dtypes():
+
+    df = pd.DataFrame({'sms_received': [0, 1, 0, 1, 2, 0],
+                       'age': [4.0, 37.0, 61.0, np.nan, 15.0, 80.0],
+                       'gender': ['F', 'M', 'F', 'F', 'M', 'F'],
+                       'distance_km': [0.5, 2.25, 1.75, 0.1, 3.5, 1.0],
+                       'appointment_day': pd.to_datetime(['2016-04-29', '2016-04-29', '2016-05-02', '2016-05-02',
+                                                          '2016-05-03 08:30', '2016-05-03'], format='ISO8601', utc=True)})
+    chunks = [df.iloc[:3].copy(), df.iloc[3:].copy()]
+    whole, _ = compact_dtypes(df.copy())
+
+    # Inferred chunk by chunk the first chunk holds only 0/1 flags, no missing age, floats float32 holds
+    # exactly and midnight-only days
+    first, _ = compact_dtypes(chunks[0].copy())
+    assert first['sms_received'].dtype == bool
+    assert first['distance_km'].dtype == np.float32
+    assert isinstance(first['appointment_day'].dtype, pd.ArrowDtype)
+
+    profile = profile_data_quality(chunks)
+    compacted = [compact_dtypes(chunk, profile=profile)[0] for chunk in chunks]
+
+    for chunk in compacted:
+        assert chunk.drop(columns='gender').dtypes.equals(whole.drop(columns='gender').dtypes)
+        assert isinstance(chunk['gender'].dtype, pd.CategoricalDtype)
+
+    stacked = pd.concat(compacted, ignore_index=True)
+    stacked['gender'] = pd.api.types.union_categoricals([chunk['gender'] for chunk in compacted])
+    pd.testing.assert_frame_equal(stacked, whole, check_categorical=False)
@@ -0,0 +1,97 @@
+import tracemalloc
+import zipfile
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import MEMBER, write_synthetic_zip
+from src import (convert_integer_to_boolean, normalize_df_string_format, normalize_headers_string_format,
+                 standardize_gender_values)
+from src.data_loader import (iter_dataset_from_zip, load_dataset_from_csv, load_dataset_from_zip,
+                             load_datasets_from_sources)
+
+def rename_headers(df):
+
+    df.columns = normalize_headers_string_format(df.columns)
+
+    return df
+
+TRANSFORMS = [rename_headers,
+              (normalize_df_string_format, {}),
+              (convert_integer_to_boolean, {'include': ['scholarship', 'hipertension', 'diabetes',
+                                                        'alcoholism', 'handcap', 'sms_received']}),
+              (standardize_gender_values, {'include': ['gender']})]
+
+def test_same_named_sources_get_unique_labels(tmp_path):
+
+    for folder, ids in (('2016', [1, 2]), ('2017', [3])):
+        (tmp_path / folder).mkdir()
+        pd.DataFrame({'PatientId': ids}).to_csv(tmp_path / folder / 'extract.csv', index=False)
+
+    df, report = load_datasets_from_sources(str(tmp_path / '*' / 'extract.csv'), n_jobs=1)
+
+    assert (report['status'] == 'loaded').all()
+    assert df['source'].cat.categories.tolist() == ['2016/extract.csv', '2017/extract.csv']
+    assert df['source'].tolist() == ['2016/extract.csv', '2016/extract.csv', '2017/extract.csv']
+    assert df['patientid'].tolist() == [1, 2, 3]
+
+@pytest.mark.parametrize('arrow', [False, True])
+def test_cache_hit_has_the_dtypes_of_a_miss(tmp_path, arrow):
+
+    path = tmp_path / 'extract.csv'
+    pd.DataFrame({'PatientId': [1.0, 2.0], 'Gender': ['F', 'M'], 'Age': [30, 41],
+                  'AppointmentDay': ['2016-04-29', '2016-05-02']}).to_csv(path, index=False)
+    cache_dir = tmp_path / 'cache'
+
+    miss = load_dataset_from_csv(str(path), cache_dir=str(cache_dir), arrow=arrow)
+    hit = load_dataset_from_csv(str(path), cache_dir=str(cache_dir), arrow=arrow)
+
+    assert len(list(cache_dir.iterdir())) == 1
+    assert hit.dtypes.equals(miss.dtypes)
+    pd.testing.assert_frame_equal(hit, miss)
+
+def test_streamed_chunks_match_the_full_load(tmp_path):
+
+    zip_path = str(tmp_path / 'extract.zip')
+    write_synthetic_zip(zip_path, 2_500, quirks=False)
+
+    df = load_dataset_from_zip(zip_path, MEMBER, sep='|', keep_default_na=False)
+    for step in TRANSFORMS:
+        func, kwargs = step if isinstance(step, tuple) else (step, {})
+        df = func(df, **kwargs)
+
+    chunks = list(iter_dataset_from_zip(zip_path, MEMBER, chunksize=1_000, transforms=TRANSFORMS,
+                                        sep='|', keep_default_na=False))
+
+    assert [len(chunk) for chunk in chunks] == [1_000, 1_000, 500]
+    pd.testing.assert_frame_equal(pd.concat(chunks), df)
+
+def test_streaming_a_member_larger_than_the_budget_stays_within_it(tmp_path):
+
+    budget_mb = 4
+    zip_path = str(tmp_path / 'extract.zip')
+    write_synthetic_zip(zip_path, 160_000, quirks=False)
+    with zipfile.ZipFile(zip_path) as z:
+        assert z.getinfo(MEMBER).file_size / 2**20 > 3 * budget_mb
+
+    rows = 0
+    tracemalloc.start()
+    try:
+        for chunk in iter_dataset_from_zip(zip_path, MEMBER, chunksize=2_000, transforms=TRANSFORMS,
+                                           sep='|', keep_default_na=False):
+            rows += len(chunk)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+    assert rows == 160_000
+    assert peak_mb < budget_mb
+
+def test_arrow_is_rejected_for_chunked_excel_members(tmp_path):
+
+    zip_path = str(tmp_path / 'extract.zip')
+    with zipfile.ZipFile(zip_path, 'w') as z:
+        z.writestr('extract.xlsx', b'')
+
+    with pytest.raises(ValueError):
+        load_dataset_from_zip(zip_path, 'extract.xlsx', chunksize=10, arrow=True)
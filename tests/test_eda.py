@@ -0,0 +1,13 @@
+import numpy as np
+from matplotlib import cbook
+
+from src.eda import _box_stats
+
+def test_box_stats_of_values_match_matplotlib():
+
+    values = np.random.default_rng(0).lognormal(size=20_000)
+    stats, expected = _box_stats(values, 'age'), cbook.boxplot_stats(values)[0]
+
+    for key in ('med', 'q1', 'q3', 'whislo', 'whishi', 'mean'):
+        assert stats[key] == expected[key]
+    np.testing.assert_array_equal(np.sort(stats['fliers']), np.sort(expected['fliers']))
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import make_appointments
+from src.features import (HISTORY_COLUMNS, build_patient_feature_state, compute_no_show_features,
+                          load_patient_feature_state, save_patient_feature_state, update_patient_feature_state)
+
+def test_update_matches_full_recompute_on_a_new_day(tmp_path):
+
+    df = make_appointments(400, 7, 40)
+    last_day = df['appointment_day'].max()
+    history, batch = df[df['appointment_day'] < last_day], df[df['appointment_day'] == last_day]
+
+    path = str(tmp_path / 'patient_state.npz')
+    save_patient_feature_state(build_patient_feature_state(history), path)
+    state, features = update_patient_feature_state(load_patient_feature_state(path), batch)
+
+    assert len(batch) and len(history)
+    pd.testing.assert_frame_equal(features, compute_no_show_features(df).loc[batch.index, HISTORY_COLUMNS])
+    pd.testing.assert_frame_equal(state, build_patient_feature_state(df).loc[state.index])
+
+def test_features_do_not_see_later_outcomes():
+
+    df = make_appointments(400, 7, 40)
+    df['neighbourhood'] = np.random.default_rng(1).choice(['CENTRO', 'ITARARÉ', 'BONFIM'], len(df))
+    last_day = df['appointment_day'].max()
+    earlier = (df['appointment_day'] < last_day).to_numpy()
+
+    changed = df.copy()
+    changed.loc[~earlier, 'no_show'] = np.where(changed.loc[~earlier, 'no_show'] == 'yes', 'no', 'yes')
+
+    features = compute_no_show_features(df).drop(columns='no_show')
+    pd.testing.assert_frame_equal(compute_no_show_features(changed).drop(columns='no_show')[earlier], features[earlier])
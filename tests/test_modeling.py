@@ -0,0 +1,23 @@
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+
+from src.modeling import _write_fold_major_matrix
+
+def test_fold_major_matrix_slices_hold_the_stratified_folds(tmp_path):
+
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((1_003, 3)).astype(np.float32)
+    X[:, 0] = np.arange(len(X))
+    y = (rng.random(len(X)) < 0.2).astype(np.int8)
+
+    x_path, y_path = str(tmp_path / 'X.npy'), str(tmp_path / 'y.npy')
+    bounds = _write_fold_major_matrix(X, y, x_path, y_path, n_splits=4, random_state=0, block=100)
+    shared, shared_y = np.load(x_path, mmap_mode='r'), np.load(y_path, mmap_mode='r')
+
+    splitter = StratifiedKFold(n_splits=4, shuffle=True, random_state=0)
+    for (train_index, test_index), (train_start, train_stop, test_start, test_stop) in zip(splitter.split(X, y), bounds):
+        train, test = shared[train_start:train_stop], shared[test_start:test_stop]
+        assert isinstance(train, np.memmap)
+        np.testing.assert_array_equal(np.sort(train[:, 0]), train_index)
+        np.testing.assert_array_equal(np.sort(test[:, 0]), test_index)
+        np.testing.assert_array_equal(shared_y[train_start:train_stop], y[train[:, 0].astype(int)])